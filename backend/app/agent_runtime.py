@@ -0,0 +1,283 @@
+# app/agent_runtime.py
+"""
+Agent runtime.
+
+An agent is an `async def run(ctx) -> AgentOutput` registered under a name
+with @register. A tick runs the requested agents concurrently on the event
+loop and persists what they produced:
+
+- each agent gets its own timeout (Agent.timeout_s); a run that misses it is
+  recorded as 'timeout' and contributes nothing. DB reads go through
+  ctx.read() in the threadpool; a thread can't be interrupted, so a timed-out
+  read finishes in the background and its result is dropped.
+- at most `concurrency` agents run at once across all ticks, and at most
+  `max_pending` ticks may be in progress; past that tick() raises AgentBusy
+  (429 on the API) instead of queueing without bound. An agent that is
+  already running for another tick isn't started twice: the second tick
+  waits for it and records 'joined'.
+- results are cached per agent against the state fingerprint (latest
+  event_log id: every write that changes stock, orders or the sim day
+  records an event). Most of those events are write-behind, so the
+  fingerprint is read only after the event writer has flushed what was
+  emitted before the tick; if it can't within AGENT_EVENT_FLUSH_S the tick
+  gets a one-off fingerprint and nothing is served from cache. While the
+  fingerprint is unchanged and the entry is younger than cache_ttl_s, the
+  agent isn't run again and its OPEN proposals stand ('cached').
+- a fresh run supersedes the agent's previous OPEN proposals and inserts
+  its new ones in the same transaction as its agent_run row, which records
+  duration, rows read and proposal count so a slow agent shows up there.
+  That transaction also touches the proposal cache, whose listing carries
+  the planner's persisted proposal ids.
+
+Built-in agents live in app/agents.py.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from sqlalchemy import JSON, bindparam, text
+from starlette.concurrency import run_in_threadpool
+
+from app.db import engine
+from app.event_writer import EventEmitter, emitter
+from app.llm import LLMBackend, make_backend
+from app.proposal_cache import proposal_cache
+
+log = logging.getLogger(__name__)
+
+AGENT_TIMEOUT_S = float(os.getenv("AGENT_TIMEOUT_S", "30"))
+AGENT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", "4"))
+AGENT_MAX_PENDING = int(os.getenv("AGENT_MAX_PENDING", "2"))
+AGENT_CACHE_TTL_S = float(os.getenv("AGENT_CACHE_TTL_S", "300"))
+AGENT_INTERVAL_S = float(os.getenv("AGENT_INTERVAL_S", "0"))
+AGENT_EVENT_FLUSH_S = float(os.getenv("AGENT_EVENT_FLUSH_S", "1"))
+
+
+@dataclass
+class AgentOutput:
+    """proposals: dicts with kind, item_id, qty, reason and payload (all but kind optional)."""
+    proposals: list[dict] = field(default_factory=list)
+    rows_read: int = 0
+
+
+@dataclass
+class Agent:
+    name: str
+    run: Callable[["AgentContext"], Awaitable[AgentOutput]]
+    description: str = ""
+    timeout_s: float = AGENT_TIMEOUT_S
+    cacheable: bool = True
+
+
+registry: dict[str, Agent] = {}
+
+
+def register(name: str, *, description: str = "", timeout_s: float = AGENT_TIMEOUT_S, cacheable: bool = True):
+    """Decorator: add an `async def run(ctx)` to the registry under `name`."""
+    def deco(fn):
+        doc = (fn.__doc__ or "").strip().splitlines()
+        registry[name] = Agent(name, fn, description or (doc[0] if doc else ""), timeout_s, cacheable)
+        return fn
+    return deco
+
+
+class AgentBusy(RuntimeError):
+    """Too many ticks in progress; try again later."""
+
+
+class AgentContext:
+    """What an agent run can use: the LLM backend, DB reads, and reads shared with the other agents of its tick."""
+
+    def __init__(self, runtime: "AgentRuntime", tick_id: str, fingerprint: str, shared: dict):
+        self.tick_id = tick_id
+        self.fingerprint = fingerprint
+        self.llm = runtime.llm
+        self._bind = runtime.bind
+        self._shared = shared
+
+    async def read(self, fn, *args):
+        """fn(conn, *args) on a sync connection in the threadpool."""
+        def _read():
+            with self._bind.connect() as conn:
+                return fn(conn, *args)
+        return await run_in_threadpool(_read)
+
+    async def shared(self, key: str, fn, *args):
+        """Like read(), but agents of the same tick asking for the same key share one read."""
+        if key not in self._shared:
+            self._shared[key] = asyncio.ensure_future(self.read(fn, *args))
+        return await asyncio.shield(self._shared[key])
+
+
+_INSERT_RUN = text("""
+    INSERT INTO agent_run (tick_id, agent, status, duration_ms, rows_read, proposals, error)
+    VALUES (:tick_id, :agent, :status, :duration_ms, :rows_read, :proposals, :error)
+    RETURNING id
+""")
+
+_INSERT_PROPOSAL = text("""
+    INSERT INTO agent_proposal (run_id, agent, kind, item_id, qty, reason, payload_json)
+    VALUES (:run_id, :agent, :kind, :item_id, :qty, :reason, :payload)
+""").bindparams(bindparam("payload", type_=JSON))
+
+
+class AgentRuntime:
+    def __init__(
+        self,
+        agents: dict[str, Agent] | None = None,
+        bind=None,
+        llm: LLMBackend | None = None,
+        concurrency: int = AGENT_CONCURRENCY,
+        max_pending: int = AGENT_MAX_PENDING,
+        cache_ttl_s: float = AGENT_CACHE_TTL_S,
+        events: EventEmitter | None = None,
+    ):
+        self.agents = registry if agents is None else agents
+        self.bind = bind if bind is not None else engine
+        self._llm = llm
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.cache_ttl_s = cache_ttl_s
+        self.events = emitter if events is None else events
+        self._slots: asyncio.Semaphore | None = None
+        self._pending = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+        # agent -> (fingerprint, monotonic time, proposals, rows_read)
+        self._cache: dict[str, tuple[str, float, int, int]] = {}
+
+    @property
+    def llm(self) -> LLMBackend:
+        if self._llm is None:
+            self._llm = make_backend()
+        return self._llm
+
+    def _fingerprint(self) -> str:
+        if not self.events.flush(timeout=AGENT_EVENT_FLUSH_S):
+            return f"unflushed-{uuid.uuid4().hex[:12]}"     # events still queued: matches no cache entry
+        with self.bind.connect() as conn:
+            return str(conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM event_log")).scalar_one())
+
+    async def tick(self, names=None) -> dict:
+        """Run `names` (default: every registered agent) once; returns the tick id and one entry per agent."""
+        names = list(self.agents) if names is None else list(dict.fromkeys(names))
+        unknown = [n for n in names if n not in self.agents]
+        if unknown:
+            raise KeyError(f"unknown agent(s): {', '.join(unknown)}")
+        if self._pending >= self.max_pending:
+            raise AgentBusy(f"{self._pending} agent ticks already in progress")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+
+        self._pending += 1
+        try:
+            tick_id = uuid.uuid4().hex[:12]
+            fingerprint = await run_in_threadpool(self._fingerprint)
+            shared: dict = {}
+            results = await asyncio.gather(*(
+                self._run_once(self.agents[n], AgentContext(self, tick_id, fingerprint, shared)) for n in names
+            ))
+            runs = await run_in_threadpool(self._persist, tick_id, results)
+        finally:
+            self._pending -= 1
+        return {"tick_id": tick_id, "fingerprint": fingerprint, "runs": runs}
+
+    async def _run_once(self, agent: Agent, ctx: AgentContext) -> dict:
+        cached = self._cache.get(agent.name)
+        if (agent.cacheable and cached and cached[0] == ctx.fingerprint
+                and time.monotonic() - cached[1] < self.cache_ttl_s):
+            return _result(agent.name, "cached", 0.0, rows_read=cached[3], proposals=cached[2])
+
+        running = self._inflight.get(agent.name)
+        if running is not None:
+            t0 = time.perf_counter()
+            first = await asyncio.shield(running)
+            return _result(agent.name, "joined", _ms(t0), rows_read=first["rows_read"], proposals=first["proposals"])
+
+        fut = asyncio.ensure_future(self._run(agent, ctx))
+        self._inflight[agent.name] = fut
+        try:
+            result = await asyncio.shield(fut)
+        finally:
+            self._inflight.pop(agent.name, None)
+        if result["status"] == "ok" and agent.cacheable:
+            self._cache[agent.name] = (ctx.fingerprint, time.monotonic(), result["proposals"], result["rows_read"])
+        return result
+
+    async def _run(self, agent: Agent, ctx: AgentContext) -> dict:
+        async with self._slots:
+            t0 = time.perf_counter()
+            try:
+                out = await asyncio.wait_for(agent.run(ctx), agent.timeout_s)
+            except asyncio.TimeoutError:
+                return _result(agent.name, "timeout", _ms(t0), error=f"exceeded {agent.timeout_s}s")
+            except Exception as e:
+                log.exception("agent %s failed", agent.name)
+                return _result(agent.name, "error", _ms(t0), error=f"{type(e).__name__}: {e}")
+        result = _result(agent.name, "ok", _ms(t0), rows_read=out.rows_read, proposals=len(out.proposals))
+        result["rows"] = out.proposals
+        return result
+
+    def _persist(self, tick_id: str, results: list[dict]) -> list[dict]:
+        """One agent_run row per agent; fresh proposals replace the agent's OPEN ones, all in one transaction."""
+        runs = []
+        version = None
+        with self.bind.begin() as conn:
+            for r in results:
+                rows = r.pop("rows", None)
+                r["run_id"] = conn.execute(_INSERT_RUN, {**r, "tick_id": tick_id}).scalar_one()
+                if rows is not None:
+                    conn.execute(text("UPDATE agent_proposal SET status = 'SUPERSEDED' WHERE agent = :a AND status = 'OPEN'"),
+                                 {"a": r["agent"]})
+                    if rows:
+                        conn.execute(_INSERT_PROPOSAL, [
+                            {"run_id": r["run_id"], "agent": r["agent"], "kind": p["kind"],
+                             "item_id": p.get("item_id"), "qty": p.get("qty"), "reason": p.get("reason"),
+                             "payload": p.get("payload")}
+                            for p in rows
+                        ])
+                    # /agents/planner/proposals serves the persisted ids
+                    version = version or proposal_cache.touch(conn)
+                runs.append(r)
+        proposal_cache.mark_dirty((), version)
+        return runs
+
+    async def aclose(self) -> None:
+        """Release the LLM backend's connections; the next call that needs it opens new ones."""
+        if self._llm is not None:
+            await self._llm.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "agents": sorted(self.agents),
+            "pending_ticks": self._pending,
+            "running": sorted(self._inflight),
+            "cached": sorted(self._cache),
+        }
+
+
+def _ms(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 3)
+
+
+def _result(agent: str, status: str, duration_ms: float, rows_read: int = 0, proposals: int = 0,
+            error: str | None = None) -> dict:
+    return {"agent": agent, "status": status, "duration_ms": duration_ms,
+            "rows_read": rows_read, "proposals": proposals, "error": error}
+
+
+async def run_periodically(runtime: AgentRuntime, interval: float = AGENT_INTERVAL_S) -> None:
+    """Lifespan task: tick every registered agent every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await runtime.tick()
+            log.info("agent tick %s: %s", result["tick_id"],
+                     {r["agent"]: (r["status"], r["duration_ms"]) for r in result["runs"]})
+        except AgentBusy:
+            log.info("agent tick skipped: previous ticks still running")
+        except Exception:
+            log.exception("agent tick failed")
@@ -0,0 +1,111 @@
+# app/agents.py
+"""
+Built-in agents and the process-wide runtime that runs them.
+
+- planner: the reorder-point rule from app/planning.py over the whole
+  catalog, one REORDER proposal per item to buy.
+- buyer: for the same reorder needs, picks a supplier and has the LLM
+  backend draft a request for quote, one RFQ proposal each (at most
+  BUYER_MAX_DRAFTS per run).
+- mrp: explodes finished-good demand through the BOM (app/mrp.py) and
+  proposes the planned orders that have to be released today, components
+  and raw materials included, as REORDER proposals, except for items the
+  planner already proposes to reorder: one REORDER per item per tick.
+
+All three read the catalog and the planner's needs through
+ctx.shared("items"), so a tick running them loads it once.
+"""
+import asyncio
+import os
+
+from sqlalchemy import text
+
+from app import mrp, planning
+from app.agent_runtime import AgentContext, AgentOutput, AgentRuntime, register
+
+BUYER_MAX_DRAFTS = int(os.getenv("BUYER_MAX_DRAFTS", "50"))
+
+BUYER_SYSTEM = (
+    "You are a purchasing assistant. Write a short, polite request for quote "
+    "to the supplier. Plain text, no placeholders."
+)
+
+
+def _plan(conn):
+    items = planning.load_item_arrays(conn, use_forecast=True)
+    return items, planning.to_proposals(items, planning.plan(items))
+
+
+@register("planner")
+async def planner(ctx: AgentContext) -> AgentOutput:
+    """Reorder-point proposals for the whole catalog."""
+    items, needs = await ctx.shared("items", _plan)
+    return AgentOutput(
+        proposals=[
+            {"kind": "REORDER", "item_id": p["item_id"], "qty": p["suggested_qty"], "reason": p["reason"],
+             "payload": {"sku": p["sku"], "name": p["name"]}}
+            for p in needs
+        ],
+        rows_read=len(items),
+    )
+
+
+def _suppliers(conn) -> list:
+    return conn.execute(text("""
+        SELECT id, name, reliability, avg_lead_days
+        FROM supplier
+        ORDER BY reliability DESC, avg_lead_days, id
+    """)).all()
+
+
+@register("buyer")
+async def buyer(ctx: AgentContext) -> AgentOutput:
+    """Requests for quote, drafted by the LLM backend, for the items that need reordering."""
+    (items, needs), suppliers = await asyncio.gather(ctx.shared("items", _plan), ctx.read(_suppliers))
+    needs = needs[:BUYER_MAX_DRAFTS]
+    # no item-supplier link yet: every RFQ goes to the most reliable supplier
+    best = suppliers[0] if suppliers else None
+    to = best.name if best else "our usual supplier"
+
+    prompts = [
+        f"To: {to}\nItem: {p['sku']} ({p['name']})\nQuantity: {p['suggested_qty']}\n"
+        f"Ask for unit price and earliest delivery date."
+        for p in needs
+    ]
+    bodies = await asyncio.gather(*(ctx.llm.complete(BUYER_SYSTEM, prompt) for prompt in prompts))
+    return AgentOutput(
+        proposals=[
+            {"kind": "RFQ", "item_id": p["item_id"], "qty": p["suggested_qty"],
+             "reason": f"request quote from {to}: {p['reason']}",
+             "payload": {"sku": p["sku"], "supplier_id": best.id if best else None, "supplier": to,
+                         "subject": f"RFQ: {p['suggested_qty']} x {p['sku']}", "body": body}}
+            for p, body in zip(needs, bodies)
+        ],
+        rows_read=len(items) + len(suppliers),
+    )
+
+
+def _mrp_due_now(conn, items):
+    _, result = mrp.plan_mrp(conn, items=items)
+    return mrp.planned_orders(items, result, release_within_days=result.bucket_days)
+
+
+@register("mrp")
+async def mrp_agent(ctx: AgentContext) -> AgentOutput:
+    """Planned orders from the BOM explosion whose release is due now, for items the planner leaves alone."""
+    items, needs = await ctx.shared("items", _plan)
+    orders = await ctx.read(_mrp_due_now, items)
+    covered = {p["item_id"] for p in needs}
+    return AgentOutput(
+        proposals=[
+            {"kind": "REORDER", "item_id": o["item_id"], "qty": o["qty"],
+             "reason": f"MRP level {o['level']}: needed in {o['due_in_days']} d"
+                       + (", release is late" if o["late"] else ""),
+             "payload": {"sku": o["sku"], "due_in_days": o["due_in_days"], "late": o["late"]}}
+            for o in orders if o["item_id"] not in covered
+        ],
+        rows_read=len(items),
+    )
+
+
+runtime = AgentRuntime()
@@ -0,0 +1,195 @@
+# app/allocation.py
+"""
+Stock allocation for open sales order lines.
+
+item.allocated is stock reserved for sales order lines; what can still be
+promised or shipped freely is on_hand - allocated. allocate() walks open
+lines (allocated_qty + shipped_qty < qty on 'Open' orders) by customer
+priority, then ship_by, then order and line id, and reserves as much of each
+line as the item still has available. Lines may end up partially allocated.
+ship_order() sends what an order has allocated: on_hand and allocated go
+down together, the lines move the quantity from allocated_qty to
+shipped_qty, and the order is Closed once every line has shipped in full.
+
+Concurrency: each batch of lines is one transaction that locks what it
+reads before deciding. On SQLite that means taking the database write lock
+up front (BEGIN IMMEDIATE). On Postgres the batch claims its lines with
+FOR UPDATE SKIP LOCKED, so parallel allocators split the backlog, and
+locks the items in id order. The writes are still guarded
+(on_hand - allocated >= qty, allocated_qty + shipped_qty <= qty) and the batch
+rolls back if a guard ever misses, so nothing can be oversold even if the
+locking assumptions are broken.
+
+The same guard protects OUT movements: TAKE_AVAILABLE only takes stock
+that isn't reserved.
+"""
+from collections import defaultdict
+
+from sqlalchemy import bindparam, text
+
+from app import queries
+from app.db import ID_CHUNK, begin_immediate, engine, for_update
+
+ALLOCATION_BATCH = 5_000  # lines per transaction
+
+# An OUT of :q from item :id; matches no row if it would dip into reserved stock.
+TAKE_AVAILABLE = text("""
+    UPDATE item SET on_hand = on_hand - :q
+    WHERE id = :id AND on_hand - allocated >= :q
+""")
+
+# A shipment of :q reserved units of item :id: both columns go down in one step.
+SHIP_ALLOCATED = text("""
+    UPDATE item SET on_hand = on_hand - :q, allocated = allocated - :q
+    WHERE id = :id AND allocated >= :q AND on_hand >= :q
+""")
+
+
+class AllocationConflict(RuntimeError):
+    """A guarded write matched fewer rows than planned; the batch was rolled back."""
+
+
+def _open_lines(conn, after: tuple | None, limit: int) -> list:
+    keyset = "AND (c.priority, o.ship_by, o.id, l.id) > (:p, :s, :o, :l)" if after else ""
+    params = {"limit": limit}
+    if after:
+        params.update(zip(("p", "s", "o", "l"), after))
+    return conn.execute(text(f"""
+        SELECT l.id, l.item_id, l.qty - l.shipped_qty - l.allocated_qty AS need,
+               c.priority, o.ship_by, o.id AS so_id
+        FROM sales_order_line l
+        JOIN sales_order o ON o.id = l.so_id
+        JOIN customer c ON c.id = o.customer_id
+        WHERE o.status = 'Open' AND l.allocated_qty + l.shipped_qty < l.qty {keyset}
+        ORDER BY c.priority, o.ship_by, o.id, l.id
+        LIMIT :limit
+        {for_update(conn, of="l", skip_locked=True)}
+    """), params).all()
+
+
+def _available(conn, item_ids) -> dict[int, int]:
+    stmt = text(f"""
+        SELECT id, on_hand - allocated FROM item
+        WHERE id IN :ids
+        ORDER BY id
+        {for_update(conn)}
+    """).bindparams(bindparam("ids", expanding=True))
+    ids = sorted(item_ids)
+    out: dict[int, int] = {}
+    for i in range(0, len(ids), ID_CHUNK):
+        out.update(conn.execute(stmt, {"ids": ids[i:i + ID_CHUNK]}).all())
+    return out
+
+
+def _check(result, expected: int, what: str) -> None:
+    if result.context.dialect.supports_sane_multi_rowcount and result.rowcount != expected:
+        raise AllocationConflict(f"{what}: updated {result.rowcount} of {expected} rows")
+
+
+def allocate_batch(conn, after: tuple | None = None, limit: int = ALLOCATION_BATCH) -> tuple[dict, tuple | None]:
+    """
+    Allocate the next `limit` open lines after keyset `after` in one
+    transaction. Returns (stats, keyset of the last line seen or None when
+    there were no lines left).
+    """
+    begin_immediate(conn)
+    lines = _open_lines(conn, after, limit)
+    if not lines:
+        return {"lines": 0, "allocated_lines": 0, "allocated_qty": 0}, None
+
+    available = _available(conn, {line.item_id for line in lines})
+    line_updates, per_item = [], defaultdict(int)
+    for line in lines:  # priority order
+        q = min(line.need, available.get(line.item_id, 0))
+        if q > 0:
+            available[line.item_id] -= q
+            per_item[line.item_id] += q
+            line_updates.append({"id": line.id, "q": q})
+
+    if line_updates:
+        _check(conn.execute(text("""
+            UPDATE sales_order_line SET allocated_qty = allocated_qty + :q
+            WHERE id = :id AND allocated_qty + shipped_qty + :q <= qty
+        """), line_updates), len(line_updates), "sales_order_line")
+        _check(conn.execute(text("""
+            UPDATE item SET allocated = allocated + :q
+            WHERE id = :id AND on_hand - allocated >= :q
+        """), [{"id": i, "q": q} for i, q in per_item.items()]), len(per_item), "item")
+
+    last = lines[-1]
+    stats = {
+        "lines": len(lines),
+        "allocated_lines": len(line_updates),
+        "allocated_qty": sum(per_item.values()),
+        "items": sorted(per_item),
+    }
+    return stats, (last.priority, last.ship_by, last.so_id, last.id)
+
+
+def allocate(bind=None, batch: int = ALLOCATION_BATCH) -> dict:
+    """Run allocation over the whole open backlog, `batch` lines per transaction."""
+    bind = bind if bind is not None else engine
+    totals = {"lines": 0, "allocated_lines": 0, "allocated_qty": 0, "batches": 0}
+    items: set[int] = set()
+    after = None
+    while True:
+        with bind.begin() as conn:
+            stats, after = allocate_batch(conn, after, batch)
+        if after is None:
+            break
+        totals["batches"] += 1
+        items.update(stats.pop("items"))
+        for k, v in stats.items():
+            totals[k] += v
+        if stats["lines"] < batch:
+            break
+    totals["items"] = sorted(items)
+    return totals
+
+
+def ship_order(conn, so_id: int) -> dict | None:
+    """
+    Ship everything sales order `so_id` has allocated, with one OUT movement
+    per item; None if there is no such order. Raises AllocationConflict (and
+    the caller's transaction rolls back) if a guarded write misses.
+    """
+    begin_immediate(conn)
+    status = conn.execute(text(f"SELECT status FROM sales_order WHERE id = :so{for_update(conn)}"),
+                          {"so": so_id}).scalar()
+    if status is None:
+        return None
+    lines = conn.execute(text(f"""
+        SELECT id, item_id, allocated_qty FROM sales_order_line
+        WHERE so_id = :so AND allocated_qty > 0
+        ORDER BY id
+        {for_update(conn)}
+    """), {"so": so_id}).all()
+
+    per_item = defaultdict(int)
+    for line in lines:
+        per_item[line.item_id] += line.allocated_qty
+    if lines:
+        _check(conn.execute(text("""
+            UPDATE sales_order_line
+            SET allocated_qty = allocated_qty - :q, shipped_qty = shipped_qty + :q
+            WHERE id = :id AND allocated_qty >= :q
+        """), [{"id": line.id, "q": line.allocated_qty} for line in lines]), len(lines), "sales_order_line")
+        shipments = [{"id": i, "q": q} for i, q in sorted(per_item.items())]  # items in id order
+        _check(conn.execute(SHIP_ALLOCATED, shipments), len(shipments), "item")
+        conn.execute(queries.INSERT_MOVEMENT, [
+            {"item": i, "t": "OUT", "q": q, "n": f"SO-{so_id} shipment"} for i, q in sorted(per_item.items())
+        ])
+        if conn.execute(text("""
+            UPDATE sales_order SET status = 'Closed'
+            WHERE id = :so AND NOT EXISTS (
+                SELECT 1 FROM sales_order_line WHERE so_id = :so AND shipped_qty < qty
+            )
+        """), {"so": so_id}).rowcount:
+            status = "Closed"
+    return {
+        "so_id": so_id,
+        "status": status,
+        "lines": len(lines),
+        "shipped_qty": sum(per_item.values()),
+        "items": sorted(per_item),
+    }
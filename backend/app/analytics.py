@@ -0,0 +1,152 @@
+# app/analytics.py
+"""
+Time-bucketed movement totals.
+
+movement_rollup holds IN / OUT / ADJUST quantities and movement counts per
+item per bucket, precomputed for three grains: day, week (ISO, starting
+Monday) and month. qty_out_sim is the part of qty_out shipped by the
+simulation (app/simulation.py notes every movement "SIM ..."), kept apart
+so demand forecasting can leave it out. A dashboard asks for buckets in a date range and reads
+one row per item per bucket instead of every raw movement.
+
+The table is maintained like stock_snapshot (app/snapshots.py): rollup()
+folds movements past its own rollup_checkpoint row (and any that commit
+late into its rollup_gap ranges) in chunks, and queries add the few
+movements that arrived since the last rollup.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy import bindparam, text
+
+from app.db import ID_CHUNK
+from app.queries import ts_param
+from app.snapshots import GAP_MOVEMENTS, ROLLUP_CHUNK, claim_movements, day_of, day_start, run_chunks
+
+CHECKPOINT = "movement_rollup"
+GRAINS = ("day", "week", "month")
+SIM_NOTE = "SIM "
+
+
+def bucket_of(day: date, grain: str) -> date:
+    """First day of the bucket that `day` falls in."""
+    if grain == "week":
+        return day - timedelta(days=day.weekday())
+    if grain == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _aggregate(rows, grains=GRAINS) -> dict[tuple[str, int, date], list[int]]:
+    """
+    (grain, item_id, bucket) -> [qty_in, qty_out, qty_adjust, moves, qty_out_sim]
+    for (item_id, ts, move_type, qty, note) rows.
+    """
+    out: dict[tuple[str, int, date], list[int]] = defaultdict(lambda: [0, 0, 0, 0, 0])
+    slot = {"IN": 0, "OUT": 1, "ADJUST": 2}
+    for item_id, ts, move_type, qty, note in rows:
+        day = day_of(ts)
+        sim = move_type == "OUT" and note is not None and note.startswith(SIM_NOTE)
+        for grain in grains:
+            acc = out[(grain, item_id, bucket_of(day, grain))]
+            acc[slot[move_type]] += qty
+            acc[3] += 1
+            if sim:
+                acc[4] += qty
+    return out
+
+
+_UPSERT = text("""
+    INSERT INTO movement_rollup (grain, item_id, bucket, qty_in, qty_out, qty_adjust, moves, qty_out_sim)
+    VALUES (:g, :id, :b, :qin, :qout, :qadj, :n, :qsim)
+    ON CONFLICT(grain, item_id, bucket) DO UPDATE SET
+        qty_in = movement_rollup.qty_in + :qin,
+        qty_out = movement_rollup.qty_out + :qout,
+        qty_adjust = movement_rollup.qty_adjust + :qadj,
+        moves = movement_rollup.moves + :n,
+        qty_out_sim = movement_rollup.qty_out_sim + :qsim
+""")
+
+
+def rollup_chunk(conn, limit: int = ROLLUP_CHUNK) -> tuple[int, int]:
+    """Apply up to `limit` movements past the checkpoint, and any late ones; returns (applied, new checkpoint)."""
+    rows, last_id = claim_movements(conn, CHECKPOINT, limit)
+    if not rows:
+        return 0, last_id
+    groups = _aggregate((r.item_id, r.ts, r.move_type, r.qty, r.note) for r in rows)
+    conn.execute(_UPSERT, [
+        {"g": g, "id": item_id, "b": bucket, "qin": qin, "qout": qout, "qadj": qadj, "n": n, "qsim": qsim}
+        for (g, item_id, bucket), (qin, qout, qadj, n, qsim) in groups.items()
+    ])
+    return len(rows), last_id
+
+
+def rollup(bind=None, chunk: int = ROLLUP_CHUNK) -> dict:
+    """Catch movement_rollup up with item_movement."""
+    return run_chunks(rollup_chunk, bind, chunk)
+
+
+def _summary_stmt(filter_items: bool):
+    items = "AND item_id IN :ids" if filter_items else ""
+    tail_items = "AND m.item_id IN :ids" if filter_items else ""
+    stmt = text(f"""
+        WITH cp AS (
+            SELECT COALESCE(MAX(last_id), 0) AS last_id FROM rollup_checkpoint WHERE name = :cp
+        )
+        SELECT 'rollup' AS kind, item_id, bucket AS at, qty_in, qty_out, qty_adjust, moves, NULL AS move_type
+        FROM movement_rollup
+        WHERE grain = :g AND bucket >= :start AND bucket <= :end {items}
+        UNION ALL
+        SELECT 'tail', m.item_id, m.ts, m.qty, 0, 0, 1, m.move_type
+        FROM item_movement m, cp
+        WHERE m.id > cp.last_id AND m.ts >= :ts_from AND m.ts < :ts_until {tail_items}
+        UNION ALL  -- gaps lie below the checkpoint: the two tails never overlap
+        SELECT 'tail', m.item_id, m.ts, m.qty, 0, 0, 1, m.move_type
+        FROM {GAP_MOVEMENTS}
+        WHERE m.ts >= :ts_from AND m.ts < :ts_until {tail_items}
+    """).bindparams(ts_param("ts_from"), ts_param("ts_until"))
+    return stmt.bindparams(bindparam("ids", expanding=True)) if filter_items else stmt
+
+
+def movement_summary(conn, grain: str, start: date, end: date, item_ids=None) -> list[dict]:
+    """
+    Totals per (item, bucket) for buckets starting in [bucket_of(start), end],
+    ordered by item then bucket. `item_ids=None` means every item.
+    """
+    start = bucket_of(start, grain)
+    # the last bucket may run past `end`; count its movements up to the bucket's end
+    last = bucket_of(end, grain)
+    if grain == "week":
+        until = last + timedelta(days=7)
+    elif grain == "month":
+        until = (last + timedelta(days=32)).replace(day=1)
+    else:
+        until = last + timedelta(days=1)
+    params = {"cp": CHECKPOINT, "g": grain, "start": start, "end": last,
+              "ts_from": day_start(start), "ts_until": day_start(until)}
+
+    if item_ids is None:
+        batches = [None]
+    else:
+        ids = sorted(set(item_ids))
+        batches = [ids[i:i + ID_CHUNK] for i in range(0, len(ids), ID_CHUNK)]
+
+    totals: dict[tuple[int, date], list[int]] = {}
+    tail = []
+    for batch in batches:
+        stmt = _summary_stmt(batch is not None)
+        for kind, item_id, at, qin, qout, qadj, n, move_type in conn.execute(stmt, {**params, "ids": batch} if batch else params):
+            if kind == "rollup":
+                totals[(item_id, day_of(at))] = [qin, qout, qadj, n]
+            else:
+                tail.append((item_id, at, move_type, qin, None))
+    for (_, item_id, bucket), acc in _aggregate(tail, (grain,)).items():
+        cur = totals.setdefault((item_id, bucket), [0, 0, 0, 0])
+        for i in range(4):
+            cur[i] += acc[i]
+
+    return [
+        {"item_id": item_id, "bucket": bucket.isoformat(), "qty_in": qin, "qty_out": qout,
+         "qty_adjust": qadj, "moves": n}
+        for (item_id, bucket), (qin, qout, qadj, n) in sorted(totals.items())
+    ]
@@ -0,0 +1,67 @@
+# app/cache_version.py
+"""
+Per-process caches kept coherent across uvicorn workers.
+
+A writer that changes what a cache holds calls bump(conn, name) in its
+transaction; readers compare current(conn, name) - one primary-key read -
+with the version they built from and rebuild when it moved. The database
+is part of the version, so tools juggling several DBs in one process
+don't mix them.
+"""
+import threading
+from typing import Callable, Generic, TypeVar
+
+from sqlalchemy import text
+
+T = TypeVar("T")
+
+_VERSION = text("SELECT COALESCE(MAX(version), 0) FROM cache_version WHERE name = :n")
+
+_BUMP = text("""
+    INSERT INTO cache_version (name, version) VALUES (:n, 1)
+    ON CONFLICT(name) DO UPDATE SET version = cache_version.version + 1
+    RETURNING version
+""")
+
+
+def bump(conn, name: str) -> int:
+    """Mark cache `name` changed, in the caller's transaction; returns the new version."""
+    return conn.execute(_BUMP, {"n": name}).scalar_one()
+
+
+def current_database(conn) -> tuple:
+    """(backend, host, port, database) of `conn`: the prefix of every version tuple."""
+    u = conn.engine.url
+    return u.get_backend_name(), u.host, u.port, u.database
+
+
+def current(conn, name: str) -> tuple:
+    """(backend, host, port, database, version) of cache `name` as `conn` sees it."""
+    return (*current_database(conn), conn.execute(_VERSION, {"n": name}).scalar_one())
+
+
+class VersionedCache(Generic[T]):
+    """One value built from the database by `build(conn)`, rebuilt when cache_version row `name` moves."""
+
+    def __init__(self, name: str, build: Callable[..., T]):
+        self.name = name
+        self._build = build
+        self._lock = threading.Lock()
+        self._version: tuple | None = None
+        self._value: T | None = None
+        self.builds = 0
+
+    def get(self, conn) -> T:
+        version = current(conn, self.name)
+        with self._lock:
+            if version == self._version:
+                return self._value
+        value = self._build(conn)
+        with self._lock:
+            self._version, self._value = version, value
+            self.builds += 1
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version = self._value = None
@@ -0,0 +1,220 @@
+# app/datagen.py
+"""
+Deterministic synthetic datasets at configurable scale, for benchmarks and
+capacity tests:
+
+    python -m app.datagen --items 100000 --days 180 --seed 1
+
+Appends to whatever is already there (ids continue after the current
+maximum, skus are GEN-0000001...), so it runs on a freshly seeded DB as
+well as on dev.db. The same Scale, seed and end date always produce the
+same rows.
+
+What it writes:
+- items with a spread of uoms and planning parameters (lead time 2-30 days,
+  reorder point = lead-time demand + safety stock, as app/simulation.py
+  reads them back);
+- suppliers and customers (priority A/B/C);
+- sales orders over the window with 1-5 lines each, Open for the recent
+  ones and Shipped before that, nothing allocated yet;
+- purchase orders, OPEN (due in the next few sim days) or CLOSED;
+- item_movement history over the last `days` days: each item starts with
+  an opening IN large enough to cover every OUT that follows, so on_hand
+  (set to the sum of the movements) never went negative;
+- event_log rows spread over the same window.
+
+Everything is drawn with NumPy in bulk and inserted with executemany in
+chunks of INSERT_CHUNK rows.
+"""
+import argparse
+import json
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from app.db import engine, reset_id_sequences
+from app.item_master import bump_version
+
+INSERT_CHUNK = 50_000
+
+UOMS = ("pcs", "pcs", "pcs", "box", "kg", "m", "l")
+EVENT_TYPES = (("sim", "TICK"), ("planner", "PO_CREATED"), ("items", "MOVEMENTS_BATCH"), ("buyer", "RFQ_DRAFTED"))
+
+
+@dataclass(frozen=True)
+class Scale:
+    items: int = 10_000
+    suppliers: int = 50
+    customers: int = 500
+    sales_orders: int = 20_000
+    purchase_orders: int = 5_000
+    days: int = 90
+    # average movements per item per day, on top of the opening balance
+    movement_rate: float = 0.3
+    events: int = 50_000
+
+
+def _insert(conn, sql: str, rows: list[dict]) -> None:
+    stmt = text(sql)
+    for i in range(0, len(rows), INSERT_CHUNK):
+        conn.execute(stmt, rows[i:i + INSERT_CHUNK])
+
+
+def _next_id(conn, table: str) -> int:
+    return conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar_one() + 1
+
+
+def _timestamps(end: date, days: int, offsets_s: np.ndarray) -> list[str]:
+    """'YYYY-MM-DD HH:MM:SS' strings `offsets_s` seconds after the window start, as CURRENT_TIMESTAMP writes them."""
+    if not len(offsets_s):
+        return []
+    start = np.datetime64(end - timedelta(days=days - 1), "s")
+    return np.char.replace((start + offsets_s.astype("timedelta64[s]")).astype(str), "T", " ").tolist()
+
+
+def generate(conn, scale: Scale = Scale(), seed: int = 0, end: date | None = None) -> dict:
+    """Append a synthetic dataset on `conn` (in the caller's transaction); returns row counts per table."""
+    rng = np.random.default_rng(seed)
+    end = end or date.today()
+    n, days = scale.items, scale.days
+
+    # --- items ---
+    first_item = _next_id(conn, "item")
+    item_ids = np.arange(first_item, first_item + n)
+    lead = rng.integers(2, 31, n)
+    daily = rng.gamma(1.5, 4.0, n)  # mean units/day, long-tailed like a real catalog
+    safety = np.ceil(daily * np.sqrt(lead)).astype(int)
+    reorder_point = np.ceil(daily * lead).astype(int) + safety
+    reorder_qty = np.maximum(np.ceil(daily * rng.integers(7, 31, n)).astype(int), 1)
+    uom = rng.choice(len(UOMS), n)
+
+    # --- movements: opening IN, then random IN / OUT / ADJUST over the window ---
+    m = int(n * days * scale.movement_rate)
+    mv_item = rng.integers(0, n, m)
+    mv_type = rng.choice(3, m, p=(0.3, 0.65, 0.05))  # IN, OUT, ADJUST
+    mv_qty = np.maximum(np.ceil(rng.exponential(daily[mv_item] * 3 + 1)), 1).astype(int)
+    mv_at = rng.integers(86_400, days * 86_400, m)  # day 0 holds the opening balances
+    sign = np.array([1, -1, 0])[mv_type]
+    net = np.bincount(mv_item, weights=sign * mv_qty, minlength=n).astype(int)
+    outs = np.bincount(mv_item, weights=(mv_type == 1) * mv_qty, minlength=n).astype(int)
+    # cover every OUT up front, and land near the reorder point at the end of the window
+    final = rng.integers(0, 2 * reorder_point + 1)
+    opening = np.maximum(outs, final - net)
+    on_hand = opening + net
+
+    conn.execute(text("""
+        INSERT INTO item (id, sku, name, uom, reorder_point, reorder_qty, safety_stock, lead_time_days, on_hand)
+        VALUES (:id, :sku, :name, :uom, :rp, :rq, :ss, :lt, :oh)
+    """), [
+        {"id": int(i), "sku": f"GEN-{i:07d}", "name": f"Generated item {i}", "uom": UOMS[u],
+         "rp": int(rp), "rq": int(rq), "ss": int(ss), "lt": int(lt), "oh": int(oh)}
+        for i, u, rp, rq, ss, lt, oh in zip(item_ids, uom, reorder_point, reorder_qty, safety, lead, on_hand)
+    ])
+    bump_version(conn)
+
+    order = np.argsort(mv_at, kind="stable")
+    names = ("IN", "OUT", "ADJUST")
+    open_ts = _timestamps(end, days, rng.integers(0, 3_600, n))
+    mv_ts = _timestamps(end, days, mv_at[order])
+    _insert(conn, "INSERT INTO item_movement (item_id, ts, move_type, qty, note) VALUES (:i, :ts, :t, :q, :n)", [
+        *({"i": int(i), "ts": ts, "t": "IN", "q": int(q), "n": "opening balance"}
+          for i, ts, q in zip(item_ids, open_ts, opening) if q),
+        *({"i": int(item_ids[k]), "ts": ts, "t": names[t], "q": int(q), "n": None}
+          for k, ts, t, q in zip(mv_item[order], mv_ts, mv_type[order], mv_qty[order])),
+    ])
+    movements = int(np.count_nonzero(opening)) + m
+
+    # --- suppliers, customers ---
+    first_supplier = _next_id(conn, "supplier")
+    _insert(conn, "INSERT INTO supplier (id, name, reliability, avg_lead_days) VALUES (:id, :name, :r, :d)", [
+        {"id": first_supplier + k, "name": f"Supplier {first_supplier + k}", "r": round(float(r), 3), "d": int(d)}
+        for k, (r, d) in enumerate(zip(rng.uniform(0.7, 0.99, scale.suppliers),
+                                       rng.integers(2, 31, scale.suppliers)))
+    ])
+    first_customer = _next_id(conn, "customer")
+    _insert(conn, "INSERT INTO customer (id, name, priority) VALUES (:id, :name, :p)", [
+        {"id": first_customer + k, "name": f"Customer {first_customer + k}", "p": int(p)}
+        for k, p in enumerate(rng.choice(3, scale.customers, p=(0.1, 0.3, 0.6)) + 1)
+    ])
+
+    # --- sales orders ---
+    first_so = _next_id(conn, "sales_order")
+    so_day = rng.integers(0, days, scale.sales_orders)
+    window_start = end - timedelta(days=days - 1)
+    _insert(conn, """
+        INSERT INTO sales_order (id, customer_id, order_date, ship_by, status)
+        VALUES (:id, :c, :d, :s, :st)
+    """, [
+        {"id": first_so + k, "c": first_customer + int(c), "d": window_start + timedelta(days=int(d)),
+         "s": window_start + timedelta(days=int(d + s)), "st": "Open" if d + s >= days - 1 else "Shipped"}
+        for k, (c, d, s) in enumerate(zip(rng.integers(0, scale.customers, scale.sales_orders), so_day,
+                                          rng.integers(1, 15, scale.sales_orders)))
+    ])
+    n_lines = rng.integers(1, 6, scale.sales_orders)
+    line_so = np.repeat(np.arange(first_so, first_so + scale.sales_orders), n_lines)
+    line_item = rng.integers(0, n, len(line_so))
+    line_qty = np.maximum(np.ceil(rng.exponential(daily[line_item] * 2 + 1)), 1).astype(int)
+    _insert(conn, "INSERT INTO sales_order_line (so_id, item_id, qty, allocated_qty) VALUES (:so, :i, :q, 0)", [
+        {"so": int(so), "i": int(item_ids[k]), "q": int(q)} for so, k, q in zip(line_so, line_item, line_qty)
+    ])
+
+    reset_id_sequences(conn, "item", "supplier", "customer", "sales_order")
+
+    # --- purchase orders ---
+    current_day = conn.execute(text("SELECT current_day FROM sim_state WHERE id = 1")).scalar() or 1
+    po_item = rng.integers(0, n, scale.purchase_orders)
+    po_open = rng.random(scale.purchase_orders) < 0.4
+    # created_at in the window too, so the same seed gives the same rows
+    po_ts = _timestamps(end, days, np.sort(rng.integers(0, days * 86_400, scale.purchase_orders)))
+    _insert(conn, """
+        INSERT INTO purchase_order (item_id, qty, status, created_at, due_day, note)
+        VALUES (:i, :q, :st, :ts, :due, 'generated')
+    """, [
+        {"i": int(item_ids[k]), "q": int(reorder_qty[k]), "st": "OPEN" if o else "CLOSED", "ts": ts,
+         "due": int(current_day + lead[k] // 2) if o else int(current_day)}
+        for k, o, ts in zip(po_item, po_open, po_ts)
+    ])
+
+    # --- event log ---
+    ev_kind = rng.integers(0, len(EVENT_TYPES), scale.events)
+    ev_ts = _timestamps(end, days, np.sort(rng.integers(0, days * 86_400, scale.events)))
+    ev_item = rng.integers(0, n, scale.events)
+    _insert(conn, "INSERT INTO event_log (ts, actor, event_type, payload_json) VALUES (:ts, :a, :t, :p)", [
+        {"ts": ts, "a": EVENT_TYPES[k][0], "t": EVENT_TYPES[k][1],
+         "p": json.dumps({"item_id": int(item_ids[i]), "generated": True}, separators=(",", ":"))}
+        for ts, k, i in zip(ev_ts, ev_kind, ev_item)
+    ])
+
+    return {
+        "item": n,
+        "item_movement": movements,
+        "supplier": scale.suppliers,
+        "customer": scale.customers,
+        "sales_order": scale.sales_orders,
+        "sales_order_line": int(len(line_so)),
+        "purchase_order": scale.purchase_orders,
+        "event_log": scale.events,
+    }
+
+
+def main() -> None:
+    defaults = Scale()
+    ap = argparse.ArgumentParser(description="Append a deterministic synthetic dataset to DATABASE_URL.")
+    for name, value in asdict(defaults).items():
+        ap.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--end", type=date.fromisoformat, help="last day of the movement window (default: today)")
+    args = ap.parse_args()
+    scale = Scale(**{name: getattr(args, name) for name in asdict(defaults)})
+
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        counts = generate(conn, scale, seed=args.seed, end=args.end)
+    print(", ".join(f"{v:,} {k}" for k, v in counts.items()) + f" in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
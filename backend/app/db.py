@@ -1,13 +1,142 @@
 # app/db.py
 import os
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
 
 # Default to local SQLite so you can work without Docker
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
 
+# Max ids per IN (...) list; keeps us well under SQLite's bound-parameter limit
+ID_CHUNK = 900
+
+# Pool settings shared by the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() not in ("0", "false", "no")
+
+# SQLite: how long a writer waits on a lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+
+# Async drivers for the sync URLs we deploy with
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def to_async_url(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, postgresql+psycopg2://... -> postgresql+asyncpg://..."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for {backend!r}; set ASYNC_DATABASE_URL")
+    return u.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+def _pool_options(url: str, is_async: bool) -> dict:
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        return {}  # in-memory SQLite is tied to a single connection
+    opts = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        # a local file can't drop the connection; pinging only costs a round-trip
+        "pool_pre_ping": DB_POOL_PRE_PING and u.get_backend_name() != "sqlite",
+    }
+    if is_async and u.get_backend_name() == "sqlite":
+        # aiosqlite defaults to NullPool (a new connection + thread per checkout)
+        opts["poolclass"] = AsyncAdaptedQueuePool
+    if u.get_backend_name() == "postgresql":
+        # timestamps are UTC throughout (app/queries.Timestamp); keep date casts and now() in UTC too
+        opts["connect_args"] = ({"server_settings": {"timezone": "UTC"}} if u.get_driver_name() == "asyncpg"
+                                else {"options": "-c timezone=UTC"})
+    return opts
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    """WAL lets readers run alongside the writer; busy_timeout queues writers instead of failing."""
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cur.close()
+
 class Base(DeclarativeBase):
     pass
 
-engine = create_engine(DATABASE_URL, future=True)
+# Sync engine: CLI tools, benchmarks, and CPU-heavy engines run in the threadpool
+engine = create_engine(DATABASE_URL, future=True, **_pool_options(DATABASE_URL, is_async=False))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+# Async engine: request handlers
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL, is_async=True))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+if make_url(DATABASE_URL).get_backend_name() == "sqlite":
+    event.listen(engine, "connect", _sqlite_pragmas)
+if make_url(ASYNC_DATABASE_URL).get_backend_name() == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas)
+
+def begin_immediate(conn) -> None:
+    """
+    First statement of a sync transaction that reads rows and then writes
+    decisions based on them. On SQLite this takes the write lock up front
+    (BEGIN IMMEDIATE), so the reads can't go stale before the writes; other
+    backends lock the rows they read with SELECT ... FOR UPDATE instead
+    (see for_update()), so this is a no-op there.
+    """
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def for_update(conn, of: str | None = None, skip_locked: bool = False) -> str:
+    """Row-locking suffix for a SELECT; empty on SQLite, where begin_immediate() covers it."""
+    if conn.dialect.name == "sqlite":
+        return ""
+    clause = " FOR UPDATE"
+    if of:
+        clause += f" OF {of}"
+    if skip_locked:
+        clause += " SKIP LOCKED"
+    return clause
+
+def reset_id_sequences(conn, *tables: str) -> None:
+    """
+    After inserting explicit ids (seed, datagen), move each table's id
+    sequence past MAX(id) so later inserts don't collide. SQLite's rowid
+    already follows MAX(id), so this is a no-op there.
+    """
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        ))
+
+# SQLite allows one writer at a time, and an async transaction holds the write
+# lock across every await in it: under load each statement waits for an event
+# loop turn (aiosqlite runs it on its own thread), so writers queued behind
+# each other for most of that time. On SQLite the whole transaction instead
+# runs in one threadpool call, holding the lock only while SQLite works.
+_SQLITE_WRITES = engine.dialect.name == "sqlite"
+_sqlite_writer = threading.Lock()
+
+def _write_in_thread(fn, args):
+    with _sqlite_writer, engine.begin() as conn:
+        return fn(conn, *args)
+
+async def run_write(fn, *args):
+    """
+    fn(conn, *args) in one write transaction, for request handlers; returns
+    what fn returns. fn is plain sync code: on SQLite it runs on the sync
+    engine in the threadpool, one writer per process at a time; elsewhere
+    on the async engine through run_sync, without the lock.
+    """
+    if _SQLITE_WRITES:
+        return await run_in_threadpool(_write_in_thread, fn, args)
+    async with async_engine.begin() as conn:
+        return await conn.run_sync(fn, *args)
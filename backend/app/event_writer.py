@@ -0,0 +1,214 @@
+# app/event_writer.py
+"""
+Write-behind event_log writes with group commit.
+
+A handler that has committed its own change calls emitter.emit(actor, type,
+payload) (or `await emitter.aemit(...)` on the event loop) instead of
+inserting the event_log row inside its transaction. The event is stamped
+and serialized (orjson) right away and put on a bounded queue; a background
+thread takes whatever is queued, up to EVENT_BATCH_SIZE rows, waiting at
+most EVENT_FLUSH_MS for a batch to fill, writes it with one executemany in
+one transaction, and then publishes the rows on event_bus. A burst of a
+thousand approvals costs a handful of event commits instead of a thousand.
+
+Trade-offs against the inline insert:
+- an event is durable EVENT_FLUSH_MS or so after the action, not with it:
+  a crash in between loses it (the action itself is committed). Paths where
+  the event must be atomic with the change (batch movement ingestion, item
+  import, stock reconciliation, forecast refresh) keep recording it in
+  their transaction with record_event(). Single movements, allocation runs,
+  sim ticks and planner proposal actions emit.
+- ts is the emit time, so it's accurate; ids follow emit order within a
+  process.
+
+Backpressure: when EVENT_QUEUE_SIZE events are waiting, emit() blocks for
+up to EVENT_QUEUE_TIMEOUT_S and then raises EventQueueFull; aemit() waits
+in the threadpool so the event loop keeps running. close() (called from the
+app's lifespan shutdown and at interpreter exit) drains the queue before
+returning; the next emit() starts a fresh flusher. A failed batch is
+retried EVENT_WRITE_RETRIES times with backoff, then logged and dropped.
+
+EVENT_WRITE_BEHIND=0 makes emit() write and publish inline in its own
+transaction, for deployments that would rather pay the commit per event.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.events import dump_payload, event_bus, write_events
+from app.queries import utcnow
+
+log = logging.getLogger(__name__)
+
+EVENT_WRITE_BEHIND = os.getenv("EVENT_WRITE_BEHIND", "1").lower() not in ("0", "false", "no")
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+EVENT_BATCH_SIZE = int(os.getenv("EVENT_BATCH_SIZE", "500"))
+EVENT_FLUSH_MS = float(os.getenv("EVENT_FLUSH_MS", "20"))
+EVENT_QUEUE_TIMEOUT_S = float(os.getenv("EVENT_QUEUE_TIMEOUT_S", "5"))
+EVENT_WRITE_RETRIES = int(os.getenv("EVENT_WRITE_RETRIES", "3"))
+
+
+class EventQueueFull(RuntimeError):
+    """The flusher is EVENT_QUEUE_SIZE events behind and didn't catch up within the timeout."""
+
+
+class EventEmitter:
+    def __init__(self, bind=None, write_behind: bool = EVENT_WRITE_BEHIND, queue_size: int = EVENT_QUEUE_SIZE,
+                 batch_size: int = EVENT_BATCH_SIZE, flush_ms: float = EVENT_FLUSH_MS,
+                 queue_timeout_s: float = EVENT_QUEUE_TIMEOUT_S, retries: int = EVENT_WRITE_RETRIES):
+        self._bind = bind
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_s = flush_ms / 1000
+        self.queue_timeout_s = queue_timeout_s
+        self.retries = retries
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+        self._closing = False
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    @property
+    def bind(self):
+        if self._bind is None:
+            from app.db import engine  # late: tests and tools swap DATABASE_URL before app.db is imported
+            self._bind = engine
+        return self._bind
+
+    # -- producers ------------------------------------------------------------
+    def emit(self, actor: str, event_type: str, payload: dict, timeout: float | None = None) -> None:
+        """Queue one event for the flusher; blocks (then raises EventQueueFull) only when the queue is full."""
+        row = {"ts": utcnow(), "actor": actor, "event_type": event_type, "payload_json": dump_payload(payload)}
+        if not self.write_behind:
+            with self.bind.begin() as conn:
+                event_bus.publish(*write_events(conn, [row]))
+            return
+        self._ensure_started()
+        with self._lock:
+            self.emitted += 1
+        try:
+            self._queue.put(row, timeout=self.queue_timeout_s if timeout is None else timeout)
+        except queue.Full:
+            with self._lock:
+                self.emitted -= 1
+            raise EventQueueFull(f"{self._queue.maxsize} events waiting to be written") from None
+
+    async def aemit(self, actor: str, event_type: str, payload: dict) -> None:
+        """emit() for the event loop: only goes to the threadpool when it would block."""
+        if self.write_behind and self._thread is not None and not self._queue.full():
+            try:
+                return self.emit(actor, event_type, payload, timeout=0)
+            except EventQueueFull:
+                pass
+        await run_in_threadpool(self.emit, actor, event_type, payload)
+
+    # -- flusher --------------------------------------------------------------
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closing = False
+                self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+                self._thread.start()
+
+    def _take_batch(self) -> list[dict]:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_s
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list[dict]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                with self.bind.begin() as conn:
+                    rows = write_events(conn, batch)
+                break
+            except Exception:
+                if attempt == self.retries:
+                    log.exception("dropping %d events after %d attempts", len(batch), attempt + 1)
+                    with self._done:
+                        self.dropped += len(batch)
+                        self._done.notify_all()
+                    return
+                time.sleep(0.05 * 2 ** attempt)
+        event_bus.publish(*rows)
+        with self._done:
+            self.written += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self._done.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+            elif self._closing:
+                return
+
+    # -- lifecycle ------------------------------------------------------------
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every event emitted before this call is written (or dropped); False on timeout."""
+        with self._done:
+            target = self.emitted
+            return self._done.wait_for(lambda: self.written + self.dropped >= target, timeout)
+
+    def close(self, timeout: float = 30) -> None:
+        """Write everything queued and stop the flusher; a later emit() starts a new one."""
+        with self._lock:
+            self._closing = True
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                log.error("event writer still has %d events queued after %.0f s", self._queue.qsize(), timeout)
+                return
+        # anything emitted while the flusher was exiting
+        while batch := self._drain():
+            self._write(batch)
+        with self._lock:
+            self._thread = None
+
+    def _drain(self) -> list[dict]:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "write_behind": self.write_behind,
+                "queued": self._queue.qsize(),
+                "emitted": self.emitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "largest_batch": self.largest_batch,
+            }
+
+
+emitter = EventEmitter()
+atexit.register(emitter.close)
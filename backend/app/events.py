@@ -0,0 +1,98 @@
+# app/events.py
+"""
+Event log writes and in-process pub/sub for live event feeds.
+
+`record_event` inserts an event_log row inside the caller's transaction and
+returns it; once the transaction has committed the caller hands the rows to
+`event_bus.publish`, which fans them out to every connected stream
+subscriber. Hot single-event paths don't write in their own transaction at
+all: they hand the event to app.event_writer, which group-commits and
+publishes in the background. Subscribers are asyncio queues, so an idle client costs nothing
+but a pending `await`.
+
+The bus is per process: with several uvicorn workers a client only gets
+pushes for writes handled by its own worker, and resumes from the DB (by last
+event id) for everything else when it reconnects.
+"""
+import asyncio
+import threading
+
+import orjson
+
+from app.queries import INSERT_EVENT, utcnow
+
+
+def dump_payload(payload: dict) -> str:
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+
+def write_events(conn, rows: list[dict]) -> list[dict]:
+    """
+    Insert event_log rows ({actor, event_type, payload_json[, ts]}, payload
+    already serialized, ts defaulting to now) with one executemany ...
+    RETURNING; returns them in id order, shaped like record_event's.
+    """
+    if not rows:
+        return []
+    now = utcnow()
+    out = conn.execute(INSERT_EVENT, [r if "ts" in r else {**r, "ts": now} for r in rows]).mappings().all()
+    return sorted((dict(r) for r in out), key=lambda r: r["id"])
+
+
+def record_event(conn, actor: str, event_type: str, payload: dict) -> dict:
+    """Insert one event_log row in the caller's transaction and return it."""
+    return write_events(conn, [{"actor": actor, "event_type": event_type, "payload_json": dump_payload(payload)}])[0]
+
+
+def record_events(conn, events: list[tuple[str, str, dict]]) -> list[dict]:
+    """Insert many (actor, event_type, payload) rows in the caller's transaction; see write_events()."""
+    return write_events(conn, [{"actor": a, "event_type": t, "payload_json": dump_payload(p)} for a, t, p in events])
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # set when the queue filled up; the reader then re-syncs from the DB
+        self.overflowed = False
+
+    def _offer(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class EventBus:
+    def __init__(self, queue_size: int = 1000):
+        self._lock = threading.Lock()
+        self._subs: set[Subscription] = set()
+        self._queue_size = queue_size
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), self._queue_size)
+        with self._lock:
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subs.discard(sub)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subs)
+
+    def publish(self, *events: dict) -> None:
+        """Deliver committed events to all subscribers; safe to call from any thread."""
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            for event in events:
+                try:
+                    sub.loop.call_soon_threadsafe(sub._offer, event)
+                except RuntimeError:  # subscriber's loop already closed
+                    self.unsubscribe(sub)
+
+
+event_bus = EventBus()
@@ -0,0 +1,319 @@
+# app/forecast.py
+"""
+Demand forecasting and recommended reorder points.
+
+Item.reorder_point and safety_stock are typed in, while item_movement holds
+the demand that actually happened. refresh() turns the OUT history into a
+per-item demand forecast and a recommended reorder point and safety stock,
+for the whole catalog in one vectorized pass:
+
+- Demand per item per bucket (FORECAST_GRAIN: day or week) is qty_out from
+  movement_rollup (app/analytics.py): one row per item per bucket instead
+  of the raw ledger. The simulation's shipments (qty_out_sim) are left
+  out: they are drawn from the typed-in reorder points, and fast_forward
+  books many simulated days as one movement stamped with the real time.
+- Two forecasts are kept per item and folded forward one bucket at a time,
+  every item at once: simple exponential smoothing (SES) of the demand, and
+  Croston's method for intermittent demand (smoothed non-zero demand size
+  over smoothed interval between demands, with the Syntetos-Boylan
+  correction). Items whose average interval between demands exceeds
+  ADI_CUTOFF buckets use Croston, the others SES. An item's history starts
+  at its first demand.
+- The smoothed mean absolute one-step error of that forecast (x MAD_TO_SD
+  for a standard deviation) sets the safety stock for FORECAST_SERVICE_LEVEL
+  over the lead time, and reorder_point = forecast demand over the lead
+  time + safety stock. Items with fewer than FORECAST_MIN_BUCKETS buckets
+  of history get no recommendation and keep their typed-in values.
+
+The smoothing state is the cache: demand_forecast holds it per item and the
+"demand_forecast" rollup_checkpoint row the last complete bucket folded in
+(as a date ordinal), so a refresh folds in only the buckets completed since
+the last one; the first run, or --full, starts FORECAST_HISTORY buckets
+back. Rerun with --full after changing FORECAST_GRAIN or FORECAST_ALPHA.
+
+    python -m app.forecast [--full]
+
+It also runs with the periodic rollups and from POST /agents/planner/forecast.
+The planner paths (load_item_arrays(..., use_forecast=True): planner
+proposals and agent, MRP) take reorder_point and safety_stock from here
+where there is a recommendation, through forecast_cache, a per-process copy
+rebuilt when the cache_version row 'forecast' moves; FORECAST_PLANNING=0
+turns that off. The simulation keeps the typed-in values, which are its
+demand model.
+"""
+import argparse
+import logging
+import os
+import time
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timedelta, timezone
+from statistics import NormalDist
+
+import numpy as np
+from sqlalchemy import text
+
+from app import analytics, cache_version
+from app.cache_version import VersionedCache
+from app.db import engine
+from app.events import event_bus, record_event
+from app.snapshots import claim_checkpoint
+
+log = logging.getLogger(__name__)
+
+FORECAST_GRAIN = os.getenv("FORECAST_GRAIN", "week")
+FORECAST_HISTORY = int(os.getenv("FORECAST_HISTORY", "52"))
+FORECAST_ALPHA = float(os.getenv("FORECAST_ALPHA", "0.2"))
+FORECAST_SERVICE_LEVEL = float(os.getenv("FORECAST_SERVICE_LEVEL", "0.95"))
+FORECAST_MIN_BUCKETS = int(os.getenv("FORECAST_MIN_BUCKETS", "8"))
+FORECAST_PLANNING = os.getenv("FORECAST_PLANNING", "1").lower() not in ("0", "false", "no")
+
+GRAIN_DAYS = {"day": 1, "week": 7}
+ADI_CUTOFF = 1.32       # average demand interval above which demand counts as intermittent
+MAD_TO_SD = 1.25        # standard deviation / mean absolute deviation of a normal error
+CHECKPOINT = "demand_forecast"
+VERSION_KEY = "forecast"
+WRITE_CHUNK = 50_000
+
+
+# --- smoothing ---------------------------------------------------------------
+
+@dataclass
+class ForecastState:
+    """Smoothing state per item; row i of every array is item ids[i] (sorted)."""
+    ids: np.ndarray
+    buckets: np.ndarray         # buckets folded since the first demand (0: no demand yet)
+    nonzero: np.ndarray         # of which had demand
+    level: np.ndarray           # SES forecast per bucket
+    level_mad: np.ndarray
+    size: np.ndarray            # Croston: smoothed non-zero demand
+    interval: np.ndarray        #          smoothed buckets between demands
+    since: np.ndarray           #          buckets since the last demand
+    croston_mad: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def empty(cls, ids) -> "ForecastState":
+        ids = np.asarray(ids, dtype=np.int64)
+        n = len(ids)
+        ints = {"buckets", "nonzero", "since"}
+        return cls(ids=ids, **{f.name: np.zeros(n, dtype=np.int64 if f.name in ints else np.float64)
+                               for f in fields(cls) if f.name != "ids"})
+
+    def reindex(self, ids: np.ndarray) -> "ForecastState":
+        """The state for sorted `ids` (a superset of self.ids); new items start empty."""
+        out = ForecastState.empty(ids)
+        pos = np.searchsorted(ids, self.ids)
+        for f in fields(self):
+            getattr(out, f.name)[pos] = getattr(self, f.name)
+        return out
+
+    def take(self, mask: np.ndarray) -> "ForecastState":
+        return ForecastState(**{f.name: getattr(self, f.name)[mask] for f in fields(self)})
+
+
+def croston_rate(s: ForecastState, alpha: float = FORECAST_ALPHA) -> np.ndarray:
+    """Croston's demand per bucket, Syntetos-Boylan corrected."""
+    return (1 - alpha / 2) * s.size / np.maximum(s.interval, 1.0)
+
+
+def fold(s: ForecastState, y: np.ndarray, alpha: float = FORECAST_ALPHA) -> None:
+    """Fold one bucket of demand (y[i] for item s.ids[i]) into the state, in place."""
+    seen = s.buckets > 0
+    demand = y > 0
+    # one-step errors of the forecasts made before this bucket; the first one seeds the MAD
+    first_error = s.buckets == 1
+    for mad, err in (("level_mad", np.abs(y - s.level)), ("croston_mad", np.abs(y - croston_rate(s, alpha)))):
+        cur = getattr(s, mad)
+        setattr(s, mad, np.where(first_error, err, np.where(seen, cur + alpha * (err - cur), cur)))
+
+    s.level = np.where(seen, s.level + alpha * (y - s.level), np.where(demand, y, s.level))
+    gap = s.since + 1
+    s.size = np.where(demand, np.where(seen, s.size + alpha * (y - s.size), y), s.size)
+    s.interval = np.where(demand, np.where(seen, s.interval + alpha * (gap - s.interval), 1.0), s.interval)
+    s.since = np.where(demand, 0, np.where(seen, s.since + 1, s.since))
+    s.buckets = s.buckets + (seen | demand)
+    s.nonzero = s.nonzero + demand
+
+
+@dataclass
+class Recommendation:
+    croston: np.ndarray         # which items use Croston rather than SES
+    per_day: np.ndarray
+    safety_stock: np.ndarray
+    reorder_point: np.ndarray
+    valid: np.ndarray           # enough history to replace the typed-in values
+
+
+def recommend(s: ForecastState, lead_time_days: np.ndarray, bucket_days: int,
+              alpha: float = FORECAST_ALPHA, service_level: float = FORECAST_SERVICE_LEVEL,
+              min_buckets: int = FORECAST_MIN_BUCKETS) -> Recommendation:
+    """Reorder point and safety stock per item for its lead time (at least a day)."""
+    croston = s.buckets > ADI_CUTOFF * s.nonzero
+    rate = np.where(croston, croston_rate(s, alpha), s.level)
+    mad = np.where(croston, s.croston_mad, s.level_mad)
+    lead = np.maximum(lead_time_days, 1)
+    z = NormalDist().inv_cdf(service_level)
+    # errors of independent buckets add up as variances
+    ss = np.ceil(z * MAD_TO_SD * mad * np.sqrt(lead / bucket_days) - 1e-9)
+    rp = np.ceil(rate / bucket_days * lead - 1e-9) + ss
+    return Recommendation(croston=croston, per_day=rate / bucket_days, safety_stock=ss.astype(np.int64),
+                          reorder_point=rp.astype(np.int64), valid=s.buckets >= min_buckets)
+
+
+# --- refresh -----------------------------------------------------------------
+
+_BUCKET_DEMAND = text("""
+    SELECT item_id, qty_out - qty_out_sim FROM movement_rollup
+    WHERE grain = :g AND bucket = :b AND qty_out > qty_out_sim
+""")
+
+_STATE = text("""
+    SELECT item_id, buckets, nonzero, level, level_mad, demand_size, demand_interval, since_demand, croston_mad
+    FROM demand_forecast
+    ORDER BY item_id
+""")
+
+_INSERT = text("""
+    INSERT INTO demand_forecast (item_id, buckets, nonzero, level, level_mad, demand_size, demand_interval,
+                                 since_demand, croston_mad, method, per_day, safety_stock, reorder_point)
+    VALUES (:item_id, :buckets, :nonzero, :level, :level_mad, :size, :interval,
+            :since, :croston_mad, :method, :per_day, :ss, :rp)
+""")
+
+def _bucket_demand(conn, grain: str, bucket: date) -> tuple[np.ndarray, np.ndarray]:
+    rows = conn.execute(_BUCKET_DEMAND, {"g": grain, "b": bucket}).all()
+    return (np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)),
+            np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows)))
+
+
+def load_state(conn) -> ForecastState:
+    rows = conn.execute(_STATE).all()
+    cols = list(zip(*rows)) if rows else [()] * 9
+    names = [f.name for f in fields(ForecastState)]
+    return ForecastState(**{name: np.array(col, dtype=getattr(ForecastState.empty([]), name).dtype)
+                            for name, col in zip(names, cols)})
+
+
+def _lead_times(conn, ids: np.ndarray) -> np.ndarray:
+    rows = conn.execute(text("SELECT id, COALESCE(lead_time_days, 0) FROM item ORDER BY id")).all()
+    all_ids = np.array([r[0] for r in rows], dtype=np.int64)
+    lead = np.array([r[1] for r in rows], dtype=np.int64)
+    return lead[np.searchsorted(all_ids, ids)] if len(ids) else lead[:0]
+
+
+def last_complete_bucket(today: date, grain: str = FORECAST_GRAIN) -> date:
+    return analytics.bucket_of(today, grain) - timedelta(days=GRAIN_DAYS[grain])
+
+
+def refresh(bind=None, full: bool = False, today: date | None = None) -> dict:
+    """
+    Fold the buckets completed since the last refresh into demand_forecast
+    and recompute the recommendations. Returns a summary.
+    """
+    if FORECAST_GRAIN not in GRAIN_DAYS:
+        raise ValueError(f"FORECAST_GRAIN must be one of {', '.join(GRAIN_DAYS)}")
+    bind = bind if bind is not None else engine
+    t0 = time.perf_counter()
+    movements = analytics.rollup(bind)["movements"]
+    step = timedelta(days=GRAIN_DAYS[FORECAST_GRAIN])
+    upto = last_complete_bucket(today or datetime.now(timezone.utc).date())
+    summary = {"status": "ok", "grain": FORECAST_GRAIN, "through": upto.isoformat(), "buckets": 0,
+               "movements": movements}
+
+    with bind.connect() as conn:
+        after = 0 if full else conn.execute(
+            text("SELECT COALESCE(MAX(last_id), 0) FROM rollup_checkpoint WHERE name = :n"), {"n": CHECKPOINT}
+        ).scalar_one()
+        start = date.fromordinal(after) + step if after else upto - step * (FORECAST_HISTORY - 1)
+        if start > upto:
+            return {**summary, "seconds": round(time.perf_counter() - t0, 3)}
+        buckets = [start + step * k for k in range((upto - start) // step + 1)]
+        demand = [_bucket_demand(conn, FORECAST_GRAIN, b) for b in buckets]
+        state = load_state(conn) if after else ForecastState.empty([])
+        state = state.reindex(np.unique(np.concatenate([state.ids, *(ids for ids, _ in demand)])))
+        for ids, qty in demand:
+            y = np.zeros(len(state))
+            y[np.searchsorted(state.ids, ids)] = qty
+            fold(state, y)
+        state = state.take(state.buckets > 0)
+        rec = recommend(state, _lead_times(conn, state.ids), GRAIN_DAYS[FORECAST_GRAIN])
+
+    rows = [{"item_id": i, "buckets": b, "nonzero": nz, "level": lv, "level_mad": lm, "size": sz, "interval": iv,
+             "since": sn, "croston_mad": cm, "method": "CROSTON" if c else "SES", "per_day": pd,
+             "ss": ss if ok else None, "rp": rp if ok else None}
+            for i, b, nz, lv, lm, sz, iv, sn, cm, c, pd, ss, rp, ok in zip(
+                *(a.tolist() for a in (state.ids, state.buckets, state.nonzero, state.level, state.level_mad,
+                                       state.size, state.interval, state.since, state.croston_mad, rec.croston,
+                                       rec.per_day, rec.safety_stock, rec.reorder_point, rec.valid)))]
+    from app.proposal_cache import proposal_cache  # late: proposal_cache -> planning -> forecast
+
+    with bind.begin() as conn:
+        if claim_checkpoint(conn, CHECKPOINT) != after and not full:
+            # another refresh folded these buckets while we computed (and bumped the versions)
+            log.info("forecast refresh from %s skipped: checkpoint moved", start)
+            return {**summary, "status": "skipped", "seconds": round(time.perf_counter() - t0, 3)}
+        conn.execute(text("DELETE FROM demand_forecast"))
+        for i in range(0, len(rows), WRITE_CHUNK):
+            conn.execute(_INSERT, rows[i:i + WRITE_CHUNK])
+        # the checkpoint is an integer: the last bucket folded in, as a date ordinal
+        conn.execute(text("UPDATE rollup_checkpoint SET last_id = :last WHERE name = :n"),
+                     {"last": upto.toordinal(), "n": CHECKPOINT})
+        # every worker's forecast and proposal caches see these two move
+        cache_version.bump(conn, VERSION_KEY)
+        proposal_cache.touch(conn)
+        summary.update(buckets=len(buckets), items=len(rows), recommended=int(rec.valid.sum()),
+                       croston=int(rec.croston.sum()))
+        event = record_event(conn, "forecast", "FORECAST_REFRESHED", dict(summary, full=full))
+
+    event_bus.publish(event)
+    forecast_cache.invalidate()
+    return {**summary, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+# --- planner side --------------------------------------------------------------
+
+_RECOMMENDED = text("""
+    SELECT item_id, reorder_point, safety_stock FROM demand_forecast
+    WHERE reorder_point IS NOT NULL
+    ORDER BY item_id
+""")
+
+
+def load_recommended(conn) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ids, reorder_point, safety_stock) of the items with a recommendation."""
+    rows = conn.execute(_RECOMMENDED).all()
+    return tuple(np.fromiter((r[k] for r in rows), dtype=np.int64, count=len(rows)) for k in range(3))
+
+
+forecast_cache: VersionedCache[tuple[np.ndarray, np.ndarray, np.ndarray]] = VersionedCache(VERSION_KEY, load_recommended)
+
+
+def item_forecast(conn, item_id: int) -> dict | None:
+    """The demand_forecast row of one item, or None when it has no demand history."""
+    row = conn.execute(text("""
+        SELECT buckets, nonzero, method, per_day, safety_stock, reorder_point
+        FROM demand_forecast WHERE item_id = :id
+    """), {"id": item_id}).mappings().first()
+    return dict(row) if row else None
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Refresh demand forecasts and recommended reorder points.")
+    ap.add_argument("--full", action="store_true", help=f"refit from the last {FORECAST_HISTORY} buckets")
+    args = ap.parse_args()
+
+    result = refresh(full=args.full)
+    if result["status"] != "ok":
+        print("another refresh moved the checkpoint; nothing done")
+    elif not result["buckets"]:
+        print(f"forecasts already through the {result['grain']} of {result['through']}")
+    else:
+        print(f"folded {result['buckets']} {result['grain']}(s) through {result['through']} in {result['seconds']} s: "
+              f"{result['items']:,} items with demand, {result['recommended']:,} recommendations "
+              f"({result['croston']:,} intermittent)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# app/item_import.py
+"""
+Bulk item master import from CSV or Parquet, upserting on sku.
+
+    python -m app.item_import items.csv [--format csv|parquet] [--chunk 10000]
+
+or POST /items:import with the file as the request body.
+
+The file is read in chunks of `chunk` rows (csv.DictReader / pyarrow
+record batches), never all at once. Each chunk is validated row by row and
+upserted in its own transaction, so a large import doesn't hold the write
+lock from start to finish and a failure keeps the chunks before it:
+
+- SQLite (and any other backend): executemany INSERT ... ON CONFLICT(sku)
+  DO UPDATE.
+- Postgres via psycopg: COPY into a temp staging table, then one
+  INSERT ... SELECT ... ON CONFLICT (sku) DO UPDATE from it.
+
+Columns: sku and name are required; uom, reorder_point, reorder_qty,
+safety_stock and lead_time_days are optional. Only the columns present in
+the file are written on update (new rows take the table defaults for the
+rest). on_hand isn't importable; stock comes from movements. Later rows
+win over earlier ones with the same sku.
+
+Rejected rows are counted and the first MAX_REPORTED_ERRORS are returned
+with their line (CSV, header = line 1) or row number (Parquet).
+"""
+import argparse
+import csv
+import io
+import time
+
+from sqlalchemy import text
+
+from app.db import engine
+from app.events import event_bus, record_event
+from app.item_master import bump_version, item_master
+from app.proposal_cache import proposal_cache
+
+IMPORT_CHUNK = 10_000
+MAX_REPORTED_ERRORS = 100
+
+REQUIRED = ("sku", "name")
+TEXT_LIMITS = {"sku": 64, "name": 200, "uom": 16}
+INT_COLUMNS = ("reorder_point", "reorder_qty", "safety_stock", "lead_time_days")
+COLUMNS = (*REQUIRED, "uom", *INT_COLUMNS)
+
+
+class ImportFormatError(ValueError):
+    """The file can't be imported at all (unreadable, unknown or missing columns)."""
+
+
+# --- readers -----------------------------------------------------------------
+
+def _csv_chunks(fileobj, chunk: int):
+    """Yield (header, [(line, row dict), ...]) chunks from a binary or text CSV stream."""
+    if isinstance(fileobj.read(0), bytes):
+        fileobj = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(fileobj)
+    header = [h.strip() for h in (reader.fieldnames or [])]
+    reader.fieldnames = header
+    batch = []
+    for row in reader:
+        batch.append((reader.line_num, row))
+        if len(batch) >= chunk:
+            yield header, batch
+            batch = []
+    if batch or not header:
+        yield header, batch
+
+
+def _parquet_chunks(fileobj, chunk: int):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportFormatError("Parquet import needs pyarrow (pip install pyarrow)") from None
+    pf = pq.ParquetFile(fileobj)
+    header = list(pf.schema_arrow.names)
+    n = 0
+    for batch in pf.iter_batches(batch_size=chunk):
+        rows = batch.to_pylist()
+        yield header, [(n + i + 1, row) for i, row in enumerate(rows)]
+        n += len(rows)
+
+
+def read_chunks(fileobj, fmt: str, chunk: int = IMPORT_CHUNK):
+    """Yield (header, [(line, row), ...]) chunks; a file that can't be parsed raises ImportFormatError."""
+    readers = {"csv": _csv_chunks, "parquet": _parquet_chunks}
+    if fmt not in readers:
+        raise ImportFormatError(f"unknown format {fmt!r}; expected csv or parquet")
+    chunks = readers[fmt](fileobj, chunk)
+    while True:
+        try:
+            yield next(chunks)
+        except StopIteration:
+            return
+        except ImportFormatError:
+            raise
+        except Exception as e:  # csv.Error, UnicodeDecodeError, pyarrow.ArrowInvalid, ...
+            raise ImportFormatError(f"unreadable {fmt} file: {e}") from e
+
+
+def _check_header(header: list[str]) -> tuple[str, ...]:
+    unknown = [h for h in header if h not in COLUMNS]
+    missing = [c for c in REQUIRED if c not in header]
+    if unknown or missing:
+        raise ImportFormatError(
+            f"columns must include {', '.join(REQUIRED)} and may include {', '.join(COLUMNS[2:])}"
+            + (f"; unknown: {', '.join(unknown)}" if unknown else "")
+            + (f"; missing: {', '.join(missing)}" if missing else "")
+        )
+    return tuple(c for c in COLUMNS if c in header)
+
+
+# --- validation ----------------------------------------------------------------
+
+def validate_row(row: dict, columns: tuple[str, ...]) -> tuple[dict | None, str | None]:
+    out = {}
+    for col in columns:
+        value = row.get(col)
+        if col in INT_COLUMNS:
+            try:
+                value = int(value) if not isinstance(value, str) else int(value.strip())
+            except (TypeError, ValueError):
+                return None, f"{col} must be an integer"
+            if value < 0:
+                return None, f"{col} must be >= 0"
+        else:
+            value = "" if value is None else str(value).strip()
+            if not value:
+                return None, f"{col} is required"
+            if len(value) > TEXT_LIMITS[col]:
+                return None, f"{col} longer than {TEXT_LIMITS[col]} characters"
+        out[col] = value
+    return out, None
+
+
+# --- upsert ----------------------------------------------------------------------
+
+def _upsert_sql(columns: tuple[str, ...], source: str) -> str:
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "sku")
+    return f"""
+        INSERT INTO item ({", ".join(columns)})
+        {source}
+        ON CONFLICT (sku) DO UPDATE SET {updates}
+    """
+
+
+def _upsert_executemany(conn, columns, rows) -> None:
+    conn.execute(text(_upsert_sql(columns, f"VALUES ({', '.join(':' + c for c in columns)})")), rows)
+
+
+def _upsert_copy(conn, columns, rows) -> None:
+    """Postgres + psycopg 3: COPY into a temp table, then one set-based upsert."""
+    cols = ", ".join(columns)
+    conn.execute(text(f"""
+        CREATE TEMP TABLE item_import_stage ON COMMIT DROP
+        AS SELECT {cols} FROM item WITH NO DATA
+    """))
+    cursor = conn.connection.cursor()
+    try:
+        with cursor.copy(f"COPY item_import_stage ({cols}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row([row[c] for c in columns])
+    finally:
+        cursor.close()
+    conn.execute(text(_upsert_sql(columns, f"SELECT {cols} FROM item_import_stage")))
+
+
+def _upsert(conn, columns, rows) -> None:
+    if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg":
+        _upsert_copy(conn, columns, rows)
+    else:
+        _upsert_executemany(conn, columns, rows)
+
+
+def import_items(fileobj, fmt: str = "csv", chunk: int = IMPORT_CHUNK, bind=None) -> dict:
+    """Import a CSV/Parquet stream into item; returns counts, timing and the first rejected rows."""
+    bind = bind if bind is not None else engine
+    t0 = time.perf_counter()
+    rows_read = upserted = rejected = chunks = 0
+    errors: list[dict] = []
+    columns = None
+    for header, batch in read_chunks(fileobj, fmt, chunk):
+        if columns is None:
+            columns = _check_header(header)
+        rows_read += len(batch)
+        by_sku: dict[str, dict] = {}
+        for line, row in batch:
+            params, error = validate_row(row, columns)
+            if error:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({"line": line, "sku": row.get("sku"), "error": error})
+            else:
+                by_sku.pop(params["sku"], None)  # last one wins, and keeps file order
+                by_sku[params["sku"]] = params
+        if by_sku:
+            with bind.begin() as conn:
+                _upsert(conn, columns, list(by_sku.values()))
+                bump_version(conn)
+                proposal_cache.touch(conn)
+            upserted += len(by_sku)
+            chunks += 1
+
+    seconds = time.perf_counter() - t0
+    summary = {
+        "rows": rows_read,
+        "upserted": upserted,
+        "rejected": rejected,
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rows_read / seconds, 1) if seconds else None,
+    }
+    event = None
+    if upserted:
+        with bind.begin() as conn:
+            event = record_event(conn, "items", "ITEMS_IMPORTED", summary)
+        event_bus.publish(event)
+        item_master.invalidate()
+        proposal_cache.invalidate_all()
+    return {**summary, "errors": errors, "event": event}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Upsert items from a CSV or Parquet file, keyed on sku.")
+    ap.add_argument("path")
+    ap.add_argument("--format", choices=("csv", "parquet"), help="default: from the file extension")
+    ap.add_argument("--chunk", type=int, default=IMPORT_CHUNK)
+    args = ap.parse_args()
+    fmt = args.format or ("parquet" if args.path.endswith((".parquet", ".pq")) else "csv")
+
+    with open(args.path, "rb") as f:
+        result = import_items(f, fmt, args.chunk)
+    print(f"{result['rows']} rows, {result['upserted']} upserted, {result['rejected']} rejected "
+          f"in {result['seconds']} s ({result['rows_per_s']} rows/s)")
+    for e in result["errors"]:
+        print(f"  line {e['line']}: {e['sku']!r}: {e['error']}")
+
+
+if __name__ == "__main__":
+    main()
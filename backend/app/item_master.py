@@ -0,0 +1,124 @@
+# app/item_master.py
+"""
+Read-through cache of item master data.
+
+sku, name, uom and the planning parameters change rarely, while on_hand
+changes on every movement. Readers fetch the volatile columns from the DB
+and take the rest from here with get_many(conn, ids); ids not cached (new
+items, evicted or older than ITEM_CACHE_TTL_S) are loaded in one chunked
+query and kept, least recently used first out past ITEM_CACHE_SIZE.
+
+Invalidation across uvicorn workers goes through the cache_version row
+'item_master': a writer that changes master fields calls bump_version(conn)
+in its transaction, and every get_many() compares the row with the version
+it last saw (one primary-key read), dropping everything when it moved.
+A writer in this process also calls invalidate() after committing so its
+own next read doesn't wait for that check. The TTL bounds staleness for
+writes that bypass both (hand-edited rows).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import bindparam, text
+
+from app import cache_version
+from app.db import ID_CHUNK
+
+ITEM_CACHE_SIZE = int(os.getenv("ITEM_CACHE_SIZE", "100000"))
+ITEM_CACHE_TTL_S = float(os.getenv("ITEM_CACHE_TTL_S", "300"))
+
+MASTER_FIELDS = ("sku", "name", "uom", "reorder_point", "reorder_qty", "safety_stock", "lead_time_days")
+VERSION_KEY = "item_master"
+
+_LOAD = text("""
+    SELECT id, sku, name, uom,
+           COALESCE(reorder_point, 0), COALESCE(reorder_qty, 0),
+           COALESCE(safety_stock, 0), COALESCE(lead_time_days, 0)
+    FROM item
+    WHERE id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def bump_version(conn) -> None:
+    """Mark item master data changed, in the caller's transaction."""
+    cache_version.bump(conn, VERSION_KEY)
+
+
+class ItemMasterCache:
+    def __init__(self, max_items: int = ITEM_CACHE_SIZE, ttl_s: float = ITEM_CACHE_TTL_S):
+        self.max_items = max_items
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
+        self._version: tuple | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_many(self, conn, item_ids) -> dict[int, dict]:
+        """Master fields of each existing item in `item_ids`, loading what isn't cached."""
+        version = cache_version.current(conn, VERSION_KEY)
+        now = time.monotonic()
+        found: dict[int, dict] = {}
+        missing = []
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+            for item_id in item_ids:
+                entry = self._entries.get(item_id)
+                if entry is not None and now - entry[0] < self.ttl_s:
+                    self._entries.move_to_end(item_id)
+                    found[item_id] = entry[1]
+                else:
+                    missing.append(item_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+        if not missing:
+            return found
+
+        loaded = {}
+        ids = sorted(set(missing))
+        for i in range(0, len(ids), ID_CHUNK):
+            for row in conn.execute(_LOAD, {"ids": ids[i:i + ID_CHUNK]}):
+                loaded[row[0]] = dict(zip(MASTER_FIELDS, row[1:]))
+        with self._lock:
+            # a concurrent invalidation wins: don't store what we read under the old version
+            if self._version == version:
+                for item_id, record in loaded.items():
+                    self._entries[item_id] = (now, record)
+                    self._entries.move_to_end(item_id)
+                while len(self._entries) > self.max_items:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        found.update(loaded)
+        return found
+
+    def invalidate(self, item_ids=None) -> None:
+        """Drop `item_ids` (default: everything) from this process's cache."""
+        with self._lock:
+            if item_ids is None:
+                self._entries.clear()
+            else:
+                for item_id in item_ids:
+                    self._entries.pop(int(item_id), None)
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "version": self._version[-1] if self._version else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+item_master = ItemMasterCache()
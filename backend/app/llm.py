@@ -0,0 +1,97 @@
+# app/llm.py
+"""
+Text-generation backends for agents.
+
+Agents only ever call `await backend.complete(system, prompt)`. AGENT_LLM
+picks the backend:
+
+- "stub" (the default): deterministic, offline, no key needed. It echoes
+  the prompt under a fixed header, so tests and demos get stable output;
+  `delay_s` makes it slow on purpose for timeout tests.
+- "openai": the Chat Completions API over httpx, using OPENAI_API_KEY and
+  AGENT_LLM_MODEL.
+
+Calls are bounded by a per-backend semaphore (AGENT_LLM_CONCURRENCY), so an
+agent drafting hundreds of messages queues them rather than opening
+hundreds of requests at once. aclose() releases whatever a backend holds
+open (OpenAIChat's connection pool); the app calls it on shutdown.
+"""
+import asyncio
+import os
+
+AGENT_LLM = os.getenv("AGENT_LLM", "stub")
+AGENT_LLM_MODEL = os.getenv("AGENT_LLM_MODEL", "gpt-4o-mini")
+AGENT_LLM_CONCURRENCY = int(os.getenv("AGENT_LLM_CONCURRENCY", "8"))
+AGENT_LLM_TIMEOUT_S = float(os.getenv("AGENT_LLM_TIMEOUT_S", "20"))
+
+
+class LLMBackend:
+    name = "base"
+
+    def __init__(self, concurrency: int = AGENT_LLM_CONCURRENCY):
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def complete(self, system: str, prompt: str) -> str:
+        async with self._slots:
+            return await self._complete(system, prompt)
+
+    async def _complete(self, system: str, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+class StubLLM(LLMBackend):
+    name = "stub"
+
+    def __init__(self, delay_s: float = 0.0, **kw):
+        super().__init__(**kw)
+        self.delay_s = delay_s
+        self.calls = 0
+
+    async def _complete(self, system: str, prompt: str) -> str:
+        self.calls += 1
+        if self.delay_s:
+            await asyncio.sleep(self.delay_s)
+        return f"[draft]\n{prompt.strip()}"
+
+
+class OpenAIChat(LLMBackend):
+    name = "openai"
+    URL = "https://api.openai.com/v1/chat/completions"
+
+    def __init__(self, api_key: str | None = None, model: str = AGENT_LLM_MODEL, **kw):
+        super().__init__(**kw)
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        if not self.api_key:
+            raise RuntimeError("AGENT_LLM=openai needs OPENAI_API_KEY")
+        self.model = model
+        self._client = None
+
+    async def _complete(self, system: str, prompt: str) -> str:
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=AGENT_LLM_TIMEOUT_S)
+        r = await self._client.post(self.URL, headers={"Authorization": f"Bearer {self.api_key}"}, json={
+            "model": self.model,
+            "messages": [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+        })
+        r.raise_for_status()
+        return r.json()["choices"][0]["message"]["content"]
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+
+_BACKENDS = {"stub": StubLLM, "openai": OpenAIChat}
+
+
+def make_backend(name: str = AGENT_LLM) -> LLMBackend:
+    try:
+        return _BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"unknown AGENT_LLM {name!r}; expected one of {sorted(_BACKENDS)}") from None
@@ -0,0 +1,222 @@
+# app/metrics.py
+"""
+Opt-in request and SQL instrumentation, exposed as GET /metrics in the
+Prometheus text format.
+
+METRICS_ENABLED=1 turns it on. Off (the default), install() does nothing:
+no middleware, no engine event listeners and no /metrics route, so the
+disabled cost is zero rather than a flag check per request.
+
+On, it records:
+- a latency histogram per (method, route template, status class), from a
+  plain ASGI middleware (route templates like /items/{item_id}, so ids
+  don't explode the label set);
+- per SQL statement shape (whitespace collapsed, IN lists and multi-row
+  VALUES folded to one placeholder) a call count and total seconds, plus
+  one overall query-latency histogram; at most METRICS_MAX_STATEMENTS shapes,
+  the rest are counted under "other";
+- a WARNING on the app.metrics logger for every statement slower than
+  METRICS_SLOW_QUERY_MS, with its bound parameters (truncated).
+
+The per-event work is a perf_counter pair, a dict lookup and a bisect
+under one lock. Counters are per process; with several uvicorn workers each
+serves its own numbers, so scrape them individually (or via a sidecar).
+"""
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+from fastapi import FastAPI, Response
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+METRICS_SLOW_QUERY_MS = float(os.getenv("METRICS_SLOW_QUERY_MS", "200"))
+METRICS_MAX_STATEMENTS = int(os.getenv("METRICS_MAX_STATEMENTS", "500"))
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))*\s*\)")
+_ROW_LIST = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def statement_shape(sql: str) -> str:
+    """Collapse a statement to the shape it's counted under."""
+    sql = _SPACE.sub(" ", sql).strip()
+    sql = _PLACEHOLDER_LIST.sub("(?)", sql)
+    return _ROW_LIST.sub("(?)", sql)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Registry:
+    def __init__(self, max_statements: int = METRICS_MAX_STATEMENTS, slow_query_ms: float = METRICS_SLOW_QUERY_MS):
+        self._lock = threading.Lock()
+        self.requests: dict[tuple[str, str, str], Histogram] = {}
+        self.queries = Histogram()
+        self.statements: dict[str, list] = {}  # shape -> [calls, seconds]
+        self.slow_queries = 0
+        self.max_statements = max_statements
+        self.slow_query_s = slow_query_ms / 1000
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, f"{status // 100}xx")
+        with self._lock:
+            h = self.requests.get(key)
+            if h is None:
+                h = self.requests[key] = Histogram()
+            h.observe(seconds)
+
+    def observe_query(self, sql: str, seconds: float, params) -> None:
+        shape = statement_shape(sql)
+        with self._lock:
+            self.queries.observe(seconds)
+            s = self.statements.get(shape)
+            if s is None:
+                if len(self.statements) >= self.max_statements:
+                    shape = "other"
+                s = self.statements.setdefault(shape, [0, 0.0])
+            s[0] += 1
+            s[1] += seconds
+            slow = seconds >= self.slow_query_s
+            if slow:
+                self.slow_queries += 1
+        if slow:
+            log.warning("slow query %.1f ms: %s params=%.500r", seconds * 1000, shape, params)
+
+    # -- exposition -----------------------------------------------------------
+    def render(self) -> str:
+        with self._lock:
+            requests = {k: (list(h.counts), h.sum, h.count) for k, h in self.requests.items()}
+            queries = (list(self.queries.counts), self.queries.sum, self.queries.count)
+            statements = {k: tuple(v) for k, v in self.statements.items()}
+            slow = self.slow_queries
+
+        out = [
+            "# HELP http_request_duration_seconds Request latency by route template.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), h in sorted(requests.items()):
+            out += _histogram("http_request_duration_seconds", {"method": method, "route": route, "status": status}, h)
+        out += [
+            "# HELP db_query_duration_seconds SQL statement latency (cursor execute).",
+            "# TYPE db_query_duration_seconds histogram",
+            *_histogram("db_query_duration_seconds", {}, queries),
+            "# HELP db_statement_calls_total Executions per statement shape.",
+            "# TYPE db_statement_calls_total counter",
+        ]
+        by_time = sorted(statements.items(), key=lambda kv: -kv[1][1])
+        out += [f"db_statement_calls_total{_labels({'statement': k})} {calls}" for k, (calls, _) in by_time]
+        out += [
+            "# HELP db_statement_seconds_total Time spent per statement shape.",
+            "# TYPE db_statement_seconds_total counter",
+        ]
+        out += [f"db_statement_seconds_total{_labels({'statement': k})} {secs:.6f}" for k, (_, secs) in by_time]
+        out += [
+            "# HELP db_slow_queries_total Statements slower than METRICS_SLOW_QUERY_MS.",
+            "# TYPE db_slow_queries_total counter",
+            f"db_slow_queries_total {slow}",
+        ]
+        return "\n".join(out) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _histogram(name: str, labels: dict, h: tuple) -> list[str]:
+    counts, total, n = h
+    lines, cumulative = [], 0
+    for bound, c in zip((*BUCKETS, "+Inf"), counts):
+        cumulative += c
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+    lines.append(f"{name}_count{_labels(labels)} {n}")
+    return lines
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware: times HTTP requests and labels them with the matched route's template."""
+
+    def __init__(self, app, registry: Registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+        t0 = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            self.registry.observe_request(scope["method"], getattr(route, "path", "unmatched"), status,
+                                          time.perf_counter() - t0)
+
+
+def instrument_engine(sync_engine, registry: Registry) -> None:
+    """Time every cursor execute on `sync_engine` (pass async_engine.sync_engine for the async one)."""
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_t0", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        registry.observe_query(statement, time.perf_counter() - conn.info["metrics_t0"].pop(), parameters)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(ctx):
+        stack = ctx.connection.info.get("metrics_t0") if ctx.connection is not None else None
+        if stack:
+            stack.pop()
+
+
+registry = Registry()
+
+
+def install(app: FastAPI, engines, enabled: bool = METRICS_ENABLED) -> bool:
+    """Wire the middleware, engine listeners and GET /metrics into `app` when enabled."""
+    if not enabled:
+        return False
+    for eng in engines:
+        instrument_engine(eng, registry)
+    app.add_middleware(MetricsMiddleware, registry=registry)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    return True
@@ -1,9 +1,9 @@
 # app/models.py
 from sqlalchemy import (
-    String, Date, DateTime, ForeignKey, Float, JSON, CheckConstraint
+    BigInteger, String, Text, Date, DateTime, ForeignKey, Float, JSON, CheckConstraint, Index
 )
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from .db import Base
 
 class Item(Base):
@@ -11,12 +11,15 @@ class Item(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     sku: Mapped[str] = mapped_column(String(64), unique=True, index=True)
     name: Mapped[str] = mapped_column(String(200))
-    uom: Mapped[str] = mapped_column(String(16), default="pcs")
-    reorder_point: Mapped[int] = mapped_column(default=0)
-    reorder_qty: Mapped[int] = mapped_column(default=0)
-    safety_stock: Mapped[int] = mapped_column(default=0)
-    lead_time_days: Mapped[int] = mapped_column(default=7)
-    on_hand: Mapped[int] = mapped_column(default=0)
+    # server defaults too: the routers insert with raw SQL and omit these
+    uom: Mapped[str] = mapped_column(String(16), default="pcs", server_default="pcs")
+    reorder_point: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    reorder_qty: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    safety_stock: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    lead_time_days: Mapped[int] = mapped_column(default=7, server_default=text("7"))
+    on_hand: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    # reserved for sales order lines (app/allocation.py); available = on_hand - allocated
+    allocated: Mapped[int] = mapped_column(default=0, server_default=text("0"))
 
 class Customer(Base):
     __tablename__ = "customer"
@@ -46,13 +49,24 @@ class SalesOrderLine(Base):
     item_id: Mapped[int] = mapped_column(ForeignKey("item.id"))
     qty: Mapped[int] = mapped_column()
     allocated_qty: Mapped[int] = mapped_column(default=0)
+    # left the warehouse (allocation.ship_order); open qty = qty - shipped_qty - allocated_qty
+    shipped_qty: Mapped[int] = mapped_column(default=0, server_default=text("0"))
 
 class PurchaseOrder(Base):
     __tablename__ = "purchase_order"
     id: Mapped[int] = mapped_column(primary_key=True)
-    supplier_id: Mapped[int] = mapped_column(ForeignKey("supplier.id"))
-    expected_date: Mapped[Date] = mapped_column(Date)
-    status: Mapped[str] = mapped_column(String(32), default="Open")
+    item_id: Mapped[int] = mapped_column(ForeignKey("item.id"))
+    qty: Mapped[int] = mapped_column()
+    status: Mapped[str] = mapped_column(String(32), default="OPEN", server_default="OPEN")  # OPEN|CLOSED|CANCELED
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    due_day: Mapped[int | None] = mapped_column(nullable=True)  # sim day the PO is expected
+    note: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # the approved agent_proposal this PO was created from; unique, so a proposal orders at most once
+    proposal_id: Mapped[int | None] = mapped_column(ForeignKey("agent_proposal.id"), nullable=True)
+
+    __table_args__ = (
+        Index("ux_purchase_order_proposal_id", "proposal_id", unique=True),
+    )
 
 class PurchaseOrderLine(Base):
     __tablename__ = "purchase_order_line"
@@ -79,10 +93,17 @@ class EventLog(Base):
     event_type: Mapped[str] = mapped_column(String(64))
     payload_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
 
+    # keyset pages filtered by actor / event_type, and time-range scans
+    __table_args__ = (
+        Index("ix_event_log_actor_id", "actor", "id"),
+        Index("ix_event_log_event_type_id", "event_type", "id"),
+        Index("ix_event_log_ts", "ts"),
+    )
+
 class SimState(Base):
     __tablename__ = "sim_state"
     id: Mapped[int] = mapped_column(primary_key=True)  # always 1
-    current_day: Mapped[int] = mapped_column(default=0)
+    current_day: Mapped[int] = mapped_column(default=1, server_default=text("1"))
 
 class ItemMovement(Base):
     __tablename__ = "item_movement"
@@ -91,4 +112,136 @@ class ItemMovement(Base):
     ts: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     move_type: Mapped[str] = mapped_column(String(16))  # "IN" | "OUT" | "ADJUST"
     qty: Mapped[int]
-    note: Mapped[str] = mapped_column(String(200))
+    note: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    # per-item history in time order (movement lists, exports, analytics tail)
+    __table_args__ = (
+        Index("ix_item_movement_item_id_ts", "item_id", "ts"),
+    )
+
+class BomLine(Base):
+    """One component of an item's bill of materials: qty_per units of component per unit of parent (app/mrp.py)."""
+    __tablename__ = "bom_line"
+    parent_id: Mapped[int] = mapped_column(ForeignKey("item.id"), primary_key=True)
+    component_id: Mapped[int] = mapped_column(ForeignKey("item.id"), primary_key=True)
+    qty_per: Mapped[float] = mapped_column(Float)
+
+    # where-used lookups go from component to parents
+    __table_args__ = (
+        CheckConstraint("qty_per > 0", name="ck_bom_line_qty_per_positive"),
+        CheckConstraint("parent_id <> component_id", name="ck_bom_line_not_self"),
+        Index("ix_bom_line_component_id", "component_id"),
+    )
+
+class StockSnapshot(Base):
+    """Closing ledger balance per item per day that had movements (app/snapshots.py)."""
+    __tablename__ = "stock_snapshot"
+    item_id: Mapped[int] = mapped_column(ForeignKey("item.id"), primary_key=True)
+    snap_date: Mapped[Date] = mapped_column(Date, primary_key=True)
+    on_hand: Mapped[int] = mapped_column()
+    qty_in: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    qty_out: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    moves: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+
+class RollupCheckpoint(Base):
+    """Last item_movement.id folded into a rollup table, one row per rollup."""
+    __tablename__ = "rollup_checkpoint"
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_id: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+
+class RollupGap(Base):
+    """
+    item_movement ids [lo, hi] below a rollup's checkpoint that were not
+    visible when it advanced: rows still in flight on Postgres, or rolled back.
+    seen_at is epoch seconds (app/snapshots.py).
+    """
+    __tablename__ = "rollup_gap"
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    lo: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    hi: Mapped[int] = mapped_column()
+    seen_at: Mapped[float] = mapped_column(Float)
+
+class LedgerBalance(Base):
+    """item_movement replayed per item up to the "ledger_balance" checkpoint (app/reconcile.py)."""
+    __tablename__ = "ledger_balance"
+    item_id: Mapped[int] = mapped_column(ForeignKey("item.id"), primary_key=True)
+    balance: Mapped[int] = mapped_column(BigInteger, default=0, server_default=text("0"))
+    moves: Mapped[int] = mapped_column(BigInteger, default=0, server_default=text("0"))
+
+class MovementRollup(Base):
+    """IN/OUT/ADJUST totals per item per day, week or month bucket (app/analytics.py)."""
+    __tablename__ = "movement_rollup"
+    grain: Mapped[str] = mapped_column(String(8), primary_key=True)  # day|week|month
+    item_id: Mapped[int] = mapped_column(ForeignKey("item.id"), primary_key=True)
+    bucket: Mapped[Date] = mapped_column(Date, primary_key=True)  # first day of the bucket
+    qty_in: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    qty_out: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    qty_adjust: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    moves: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    # the part of qty_out the simulation shipped (notes "SIM ..."); not demand for app/forecast.py
+    qty_out_sim: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+
+    # all-items dashboards scan one grain over a bucket range
+    __table_args__ = (
+        Index("ix_movement_rollup_grain_bucket", "grain", "bucket"),
+    )
+
+class DemandForecast(Base):
+    """Smoothed demand state and recommended reorder point per item with OUT history (app/forecast.py)."""
+    __tablename__ = "demand_forecast"
+    item_id: Mapped[int] = mapped_column(ForeignKey("item.id"), primary_key=True)
+    buckets: Mapped[int] = mapped_column()              # buckets folded since the first demand
+    nonzero: Mapped[int] = mapped_column()              # of which with demand
+    level: Mapped[float] = mapped_column(Float)         # exponential smoothing
+    level_mad: Mapped[float] = mapped_column(Float)
+    demand_size: Mapped[float] = mapped_column(Float)   # Croston
+    demand_interval: Mapped[float] = mapped_column(Float)
+    since_demand: Mapped[int] = mapped_column()
+    croston_mad: Mapped[float] = mapped_column(Float)
+    method: Mapped[str] = mapped_column(String(8))      # SES|CROSTON
+    per_day: Mapped[float] = mapped_column(Float)
+    safety_stock: Mapped[int | None] = mapped_column(nullable=True)   # NULL: too little history
+    reorder_point: Mapped[int | None] = mapped_column(nullable=True)
+
+class AgentRun(Base):
+    """One agent's share of a runtime tick (app/agent_runtime.py)."""
+    __tablename__ = "agent_run"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tick_id: Mapped[str] = mapped_column(String(32))
+    agent: Mapped[str] = mapped_column(String(64))
+    started_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    status: Mapped[str] = mapped_column(String(16))  # ok|cached|joined|timeout|error
+    duration_ms: Mapped[float] = mapped_column(default=0, server_default=text("0"))
+    rows_read: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    proposals: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("ix_agent_run_agent_id", "agent", "id"),
+        Index("ix_agent_run_tick_id", "tick_id"),
+    )
+
+class AgentProposal(Base):
+    """A suggestion written by an agent; superseded by the agent's next fresh run."""
+    __tablename__ = "agent_proposal"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    run_id: Mapped[int] = mapped_column(ForeignKey("agent_run.id"))
+    agent: Mapped[str] = mapped_column(String(64))
+    kind: Mapped[str] = mapped_column(String(32))  # REORDER|RFQ|...
+    item_id: Mapped[int | None] = mapped_column(ForeignKey("item.id"), nullable=True)
+    qty: Mapped[int | None] = mapped_column(nullable=True)
+    reason: Mapped[str | None] = mapped_column(Text, nullable=True)
+    payload_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    status: Mapped[str] = mapped_column(String(16), default="OPEN", server_default="OPEN")  # OPEN|SUPERSEDED|APPROVED|REJECTED
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    acted_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_agent_proposal_agent_status_id", "agent", "status", "id"),
+    )
+
+class CacheVersion(Base):
+    """Version counters for in-process caches; a writer bumps one to invalidate every worker's copy."""
+    __tablename__ = "cache_version"
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(default=0, server_default=text("0"))
@@ -0,0 +1,317 @@
+# app/mrp.py
+"""
+Multi-level MRP: bill-of-materials explosion and netting.
+
+bom_line says how many units of a component go into one unit of its parent.
+plan_mrp() turns independent demand for the whole catalog into planned
+orders over a horizon of buckets (MRP_HORIZON_DAYS split into
+MRP_BUCKET_DAYS-day buckets, bucket 0 = today):
+
+1. Low-level codes: every item's deepest position in any BOM (0 = not a
+   component), by Kahn's algorithm one level per step over the edge arrays.
+   A cycle raises BomCycleError.
+2. Level by level, all items of the level at once: gross requirements
+   (independent + dependent) are netted against on_hand - safety_stock and
+   open PO receipts in their due bucket; shortages become planned receipts
+   in lots of reorder_qty (lot-for-lot when 0). Each receipt is released
+   ceil(lead_time_days / bucket days) buckets earlier; releases that would
+   fall before today go in bucket 0 and are flagged late.
+3. The level's releases times qty_per become gross requirements of the
+   components, summed per component over all its parents.
+
+Because a component's level is below all of its parents', its gross
+requirements are complete before it is netted, and it is netted and
+exploded once for the whole catalog, however many assemblies use it: the
+sub-assembly explosion is computed once and reused by every parent instead
+of walking the tree per finished good. The compiled BOM (edge arrays and
+low-level codes) is cached per process and rebuilt when the cache_version
+row 'bom' moves (bump_bom_version() in the writer's transaction).
+
+Independent demand per bucket is the larger of open sales order lines due
+in it (by ship_by; past due counts today) and the forecast, the daily
+demand implied by the reorder point (app.simulation.daily_demand_mean; the
+recommended one from app.forecast where there is one), for items that
+aren't components of anything.
+"""
+import math
+import os
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+from sqlalchemy import text
+
+from app import cache_version
+from app.cache_version import VersionedCache
+from app.planning import ItemArrays, load_item_arrays
+from app.simulation import daily_demand_mean
+from app.snapshots import day_of
+
+MRP_HORIZON_DAYS = int(os.getenv("MRP_HORIZON_DAYS", "90"))
+MRP_BUCKET_DAYS = int(os.getenv("MRP_BUCKET_DAYS", "1"))
+VERSION_KEY = "bom"
+
+# float slack when rounding fractional requirements (qty_per 0.05 ...) up to whole units
+_EPS = 1e-9
+
+
+class BomCycleError(ValueError):
+    """The BOM graph has a cycle; item_ids are the items on or below it."""
+
+    def __init__(self, item_ids):
+        self.item_ids = [int(i) for i in item_ids]
+        super().__init__(f"BOM cycle through item(s) {', '.join(map(str, self.item_ids[:20]))}")
+
+
+@dataclass
+class Bom:
+    """BOM lines as arrays (item ids), with the low-level code of every item that appears in one."""
+    parent: np.ndarray
+    component: np.ndarray
+    qty_per: np.ndarray
+    nodes: np.ndarray   # sorted ids of every item in a line
+    llc: np.ndarray     # per node
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+
+@dataclass
+class MrpResult:
+    """Row i of each array is item i of the ItemArrays the plan was made for; columns are buckets."""
+    llc: np.ndarray
+    gross: np.ndarray
+    planned: np.ndarray     # planned order receipts, in their due bucket
+    releases: np.ndarray    # the same orders in their release bucket
+    late: np.ndarray        # per (item, bucket) of planned: release should have been before today
+    bucket_days: int
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenated arange(s, s + c) for each (s, c)."""
+    total = int(counts.sum())
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+
+
+def low_level_codes(n: int, parent: np.ndarray, child: np.ndarray) -> np.ndarray:
+    """
+    Longest path from a root to each of nodes 0..n-1 over parent -> child
+    edges: Kahn's algorithm, one frontier (= one level) per step.
+    """
+    llc = np.zeros(n, dtype=np.int64)
+    indegree = np.bincount(child, minlength=n)
+    order = np.argsort(parent, kind="stable")
+    by_parent, child_of = parent[order], child[order]
+    frontier = np.flatnonzero(indegree == 0)
+    level = done = 0
+    while len(frontier):
+        llc[frontier] = level
+        done += len(frontier)
+        lo = np.searchsorted(by_parent, frontier, "left")
+        kids = child_of[_ranges(lo, np.searchsorted(by_parent, frontier, "right") - lo)]
+        indegree -= np.bincount(kids, minlength=n)
+        kids = np.unique(kids)
+        frontier = kids[indegree[kids] == 0]
+        level += 1
+    if done < n:
+        raise BomCycleError(np.flatnonzero(indegree > 0))
+    return llc
+
+
+def compile_bom(parent, component, qty_per) -> Bom:
+    """Bom from line columns (item ids); raises BomCycleError with item ids."""
+    parent = np.asarray(parent, dtype=np.int64)
+    component = np.asarray(component, dtype=np.int64)
+    nodes = np.unique(np.concatenate([parent, component]))
+    try:
+        llc = low_level_codes(len(nodes), np.searchsorted(nodes, parent), np.searchsorted(nodes, component))
+    except BomCycleError as e:
+        raise BomCycleError(nodes[e.item_ids]) from None
+    return Bom(parent=parent, component=component, qty_per=np.asarray(qty_per, dtype=np.float64),
+               nodes=nodes, llc=llc)
+
+
+def load_bom(conn) -> Bom:
+    rows = conn.execute(text("SELECT parent_id, component_id, qty_per FROM bom_line")).all()
+    return compile_bom([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows])
+
+
+def bump_bom_version(conn) -> None:
+    """Mark the BOM changed, in the caller's transaction."""
+    cache_version.bump(conn, VERSION_KEY)
+
+
+# the compiled BOM of the database
+bom_cache: VersionedCache[Bom] = VersionedCache(VERSION_KEY, load_bom)
+
+
+# --- explosion -------------------------------------------------------------
+
+def _positions(ids: np.ndarray, wanted: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Index of each `wanted` id in sorted `ids`, and which of them are there at all."""
+    if not len(ids):
+        return np.zeros(len(wanted), dtype=np.int64), np.zeros(len(wanted), dtype=bool)
+    pos = np.minimum(np.searchsorted(ids, wanted), len(ids) - 1)
+    return pos, ids[pos] == wanted
+
+
+def explode(items: ItemArrays, bom: Bom, demand: np.ndarray, receipts: np.ndarray,
+            bucket_days: int = MRP_BUCKET_DAYS) -> MrpResult:
+    """
+    Net and explode `demand` (items x buckets, independent demand) level by
+    level; `receipts` are the open PO quantities due in each bucket.
+    """
+    n, buckets = demand.shape
+    llc = np.zeros(n, dtype=np.int64)
+    pos, hit = _positions(items.ids, bom.nodes)
+    llc[pos[hit]] = bom.llc[hit]
+    p, p_hit = _positions(items.ids, bom.parent)
+    c, c_hit = _positions(items.ids, bom.component)
+    keep = p_hit & c_hit
+    p, c, qty_per = p[keep], c[keep], bom.qty_per[keep]
+    edge_level = llc[p]
+
+    gross = demand.astype(np.float64, copy=True)
+    planned = np.zeros((n, buckets))
+    releases = np.zeros((n, buckets))
+    late = np.zeros((n, buckets), dtype=bool)
+    offset = -(-items.lead_time_days // bucket_days)
+    lot = items.reorder_qty.astype(np.float64)
+
+    for level in range(int(llc.max(initial=0)) + 1):
+        rows = np.flatnonzero(llc == level)
+        avail = (items.on_hand[rows] - items.safety_stock[rows]).astype(np.float64)
+        g, r, lot_r = gross[rows], receipts[rows], lot[rows]
+        level_planned = np.zeros((len(rows), buckets))
+        for t in range(buckets):
+            avail += r[:, t] - g[:, t]
+            need = np.where(avail < 0, -avail, 0.0)
+            qty = np.where(lot_r > 0, np.ceil(need / np.maximum(lot_r, 1) - _EPS) * lot_r, np.ceil(need - _EPS))
+            level_planned[:, t] = qty
+            avail += qty
+        planned[rows] = level_planned
+
+        i, t = np.nonzero(level_planned)
+        release = t - offset[rows[i]]
+        late[rows[i], t] = release < 0
+        releases[rows] = np.bincount(i * buckets + np.maximum(release, 0), weights=level_planned[i, t],
+                                     minlength=len(rows) * buckets).reshape(len(rows), buckets)
+
+        # this level's releases are the components' dependent demand, summed per component
+        e = np.flatnonzero(edge_level == level)
+        if len(e):
+            e = e[np.argsort(c[e], kind="stable")]
+            comp = c[e]
+            starts = np.flatnonzero(np.r_[True, comp[1:] != comp[:-1]])
+            gross[comp[starts]] += np.add.reduceat(releases[p[e]] * qty_per[e, None], starts, axis=0)
+
+    return MrpResult(llc=llc, gross=gross, planned=planned, releases=releases, late=late, bucket_days=bucket_days)
+
+
+# --- inputs from the database ---------------------------------------------------
+
+def _bucket_add(out: np.ndarray, items: ItemArrays, item_ids, buckets, qty) -> None:
+    item_ids = np.asarray(item_ids, dtype=np.int64)
+    buckets = np.asarray(buckets, dtype=np.int64)
+    pos, hit = _positions(items.ids, item_ids)
+    hit &= buckets < out.shape[1]
+    np.add.at(out, (pos[hit], np.maximum(buckets[hit], 0)), np.asarray(qty, dtype=np.float64)[hit])
+
+
+def load_order_demand(conn, items: ItemArrays, buckets: int, bucket_days: int, today: date | None = None) -> np.ndarray:
+    """Unshipped sales order quantity per item and ship_by bucket (past due in bucket 0)."""
+    today = today or date.today()
+    rows = conn.execute(text("""
+        SELECT l.item_id, o.ship_by, SUM(l.qty - l.shipped_qty)
+        FROM sales_order_line l
+        JOIN sales_order o ON o.id = l.so_id
+        WHERE o.status = 'Open'
+        GROUP BY l.item_id, o.ship_by
+    """)).all()
+    out = np.zeros((len(items), buckets))
+    if rows:
+        _bucket_add(out, items, [r[0] for r in rows],
+                    [(day_of(r[1]) - today).days // bucket_days for r in rows], [r[2] or 0 for r in rows])
+    return out
+
+
+def load_receipts(conn, items: ItemArrays, buckets: int, bucket_days: int) -> np.ndarray:
+    """Open PO quantity per item and due bucket (due_day counted from the sim day; overdue in bucket 0)."""
+    rows = conn.execute(text("""
+        SELECT po.item_id, COALESCE(po.due_day, s.current_day) - s.current_day, SUM(po.qty)
+        FROM purchase_order po
+        CROSS JOIN sim_state s
+        WHERE po.status = 'OPEN' AND s.id = 1
+        GROUP BY po.item_id, COALESCE(po.due_day, s.current_day) - s.current_day
+    """)).all()
+    out = np.zeros((len(items), buckets))
+    if rows:
+        _bucket_add(out, items, [r[0] for r in rows], [max(r[1], 0) // bucket_days for r in rows],
+                    [r[2] or 0 for r in rows])
+    return out
+
+
+def independent_demand(items: ItemArrays, bom: Bom, orders: np.ndarray, bucket_days: int) -> np.ndarray:
+    """Per bucket, the larger of booked orders and the forecast; components get no forecast of their own."""
+    rate = daily_demand_mean(items)
+    pos, hit = _positions(items.ids, np.unique(bom.component))
+    rate[pos[hit]] = 0
+    return np.maximum(orders, (rate * bucket_days)[:, None])
+
+
+def plan_mrp(conn, horizon_days: int = MRP_HORIZON_DAYS, bucket_days: int = MRP_BUCKET_DAYS,
+             today: date | None = None, items: ItemArrays | None = None) -> tuple[ItemArrays, MrpResult]:
+    """Load the catalog (unless given), BOM, sales orders and open POs, and run the explosion."""
+    buckets = max(1, math.ceil(horizon_days / bucket_days))
+    items = items if items is not None else load_item_arrays(conn, use_forecast=True)
+    bom = bom_cache.get(conn)
+    orders = load_order_demand(conn, items, buckets, bucket_days, today)
+    receipts = load_receipts(conn, items, buckets, bucket_days)
+    return items, explode(items, bom, independent_demand(items, bom, orders, bucket_days), receipts, bucket_days)
+
+
+def planned_orders(items: ItemArrays, result: MrpResult, release_within_days: int | None = None) -> list[dict]:
+    """Planned orders, earliest release first; only those released within `release_within_days` when given."""
+    i, t = np.nonzero(result.planned)
+    offset = -(-items.lead_time_days[i] // result.bucket_days)
+    release = np.maximum(t - offset, 0)
+    keep = np.ones(len(i), dtype=bool) if release_within_days is None else \
+        release * result.bucket_days < max(release_within_days, 1)
+    order = np.lexsort((items.ids[i], release))
+    out = []
+    for k in order[keep[order]].tolist():
+        row = int(i[k])
+        out.append({
+            "item_id": int(items.ids[row]),
+            "sku": items.sku[row],
+            "level": int(result.llc[row]),
+            "qty": int(result.planned[row, t[k]]),
+            "release_in_days": int(release[k]) * result.bucket_days,
+            "due_in_days": int(t[k]) * result.bucket_days,
+            "late": bool(result.late[row, t[k]]),
+        })
+    return out
+
+
+# --- BOM writes --------------------------------------------------------------------
+
+def replace_components(conn, parent_id: int, components: dict[int, float]) -> int:
+    """
+    Make {component_id: qty_per} the BOM of `parent_id`, in the caller's
+    transaction. Raises BomCycleError (nothing written) if the BOM would
+    become cyclic; returns the number of lines written.
+    """
+    # the version bump is a write: it takes SQLite's write lock / the 'bom' row
+    # lock on Postgres before the cycle check reads, so concurrent BOM writers
+    # queue instead of each passing the check against the other's old lines
+    bump_bom_version(conn)
+    rows = conn.execute(text("SELECT parent_id, component_id, qty_per FROM bom_line WHERE parent_id <> :p"),
+                        {"p": parent_id}).all()
+    compile_bom([r[0] for r in rows] + [parent_id] * len(components),
+                [r[1] for r in rows] + list(components),
+                [r[2] for r in rows] + list(components.values()))
+    conn.execute(text("DELETE FROM bom_line WHERE parent_id = :p"), {"p": parent_id})
+    if components:
+        conn.execute(text("INSERT INTO bom_line (parent_id, component_id, qty_per) VALUES (:p, :c, :q)"),
+                     [{"p": parent_id, "c": c, "q": q} for c, q in components.items()])
+    return len(components)
@@ -0,0 +1,160 @@
+# app/planning.py
+"""
+Reorder planning engine.
+
+Item columns are loaded once into NumPy arrays and the reorder-point
+heuristic is evaluated for the whole catalog in one vectorized pass.
+Open purchase orders count towards the inventory position, so an item that
+already has enough on order is not proposed again. With use_forecast the
+reorder point and safety stock come from app.forecast where it has a
+recommendation for the item.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import bindparam, text
+
+from app import forecast
+from app.db import ID_CHUNK
+from app.item_master import MASTER_FIELDS, item_master
+
+
+@dataclass
+class ItemArrays:
+    """Column-oriented view of the item table (row i of every array is one item)."""
+    ids: np.ndarray
+    sku: list
+    name: list
+    on_hand: np.ndarray
+    reorder_point: np.ndarray
+    reorder_qty: np.ndarray
+    safety_stock: np.ndarray
+    lead_time_days: np.ndarray
+    on_order: np.ndarray
+    forecast: np.ndarray | None = None     # rows whose reorder_point / safety_stock are forecast
+    allocated: np.ndarray | None = None    # on_hand reserved for sales order lines (None: nothing reserved)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass
+class PlanResult:
+    """Indices into ItemArrays of the items to reorder, with the suggested qty."""
+    idx: np.ndarray
+    qty: np.ndarray
+
+
+def _int_column(values) -> np.ndarray:
+    return np.fromiter(values, dtype=np.int64, count=len(values))
+
+
+_ITEM_STOCK = """
+    SELECT id, COALESCE(on_hand, 0), COALESCE(allocated, 0)
+    FROM item
+"""
+
+_OPEN_PO = """
+    SELECT item_id, SUM(qty)
+    FROM purchase_order
+    WHERE status = 'OPEN'
+"""
+
+
+def _fetch(conn, sql: str, where: str, tail: str, item_ids) -> list:
+    if item_ids is None:
+        return conn.execute(text(f"{sql} {tail}")).all()
+    stmt = text(f"{sql} {where} {tail}").bindparams(bindparam("ids", expanding=True))
+    ids = sorted(set(int(i) for i in item_ids))
+    rows = []
+    for i in range(0, len(ids), ID_CHUNK):
+        rows.extend(conn.execute(stmt, {"ids": ids[i:i + ID_CHUNK]}).all())
+    return rows
+
+
+def load_item_arrays(conn, item_ids=None, use_forecast: bool = False) -> ItemArrays:
+    """
+    Read the planning columns plus open PO quantity of every item, or only of
+    `item_ids` when given. Only on_hand and allocated come from the item table; the master
+    fields are served by the item master cache, recommended reorder points
+    (use_forecast) by the forecast cache.
+    """
+    rows = _fetch(conn, _ITEM_STOCK, "WHERE id IN :ids", "ORDER BY id", item_ids)
+    rows.sort(key=lambda r: r[0])
+    ids = _int_column([r[0] for r in rows])
+    master = item_master.get_many(conn, ids.tolist())
+    cols = {f: [master[i][f] for i in ids.tolist()] for f in MASTER_FIELDS}
+
+    on_order = np.zeros(len(ids), dtype=np.int64)
+    po_rows = _fetch(conn, _OPEN_PO, "AND item_id IN :ids", "GROUP BY item_id", item_ids)
+    if po_rows and len(ids):
+        po_ids = np.array([r[0] for r in po_rows], dtype=np.int64)
+        po_qty = np.array([r[1] or 0 for r in po_rows], dtype=np.int64)
+        pos = np.searchsorted(ids, po_ids)
+        hit = (pos < len(ids)) & (ids[np.minimum(pos, len(ids) - 1)] == po_ids)
+        np.add.at(on_order, pos[hit], po_qty[hit])
+
+    reorder_point = _int_column(cols["reorder_point"])
+    safety_stock = _int_column(cols["safety_stock"])
+    forecast_rows = None
+    if use_forecast and forecast.FORECAST_PLANNING:
+        f_ids, f_rp, f_ss = forecast.forecast_cache.get(conn)
+        forecast_rows = np.zeros(len(ids), dtype=bool)
+        if len(f_ids) and len(ids):
+            pos = np.searchsorted(f_ids, ids)
+            hit = (pos < len(f_ids)) & (f_ids[np.minimum(pos, len(f_ids) - 1)] == ids)
+            reorder_point[hit] = f_rp[pos[hit]]
+            safety_stock[hit] = f_ss[pos[hit]]
+            forecast_rows = hit
+
+    return ItemArrays(
+        ids=ids,
+        sku=cols["sku"],
+        name=cols["name"],
+        on_hand=_int_column([r[1] for r in rows]),
+        reorder_point=reorder_point,
+        reorder_qty=_int_column(cols["reorder_qty"]),
+        safety_stock=safety_stock,
+        lead_time_days=_int_column(cols["lead_time_days"]),
+        on_order=on_order,
+        forecast=forecast_rows,
+        allocated=_int_column([r[2] for r in rows]),
+    )
+
+
+def plan(items: ItemArrays) -> PlanResult:
+    """
+    Vectorized reorder-point rule: reorder when on_hand + on_order drops
+    below reorder_point, for max(reorder_qty, shortfall + safety_stock).
+    """
+    position = items.on_hand + items.on_order
+    idx = np.flatnonzero(position < items.reorder_point)
+    shortfall = items.reorder_point[idx] - position[idx]
+    qty = np.maximum(items.reorder_qty[idx], shortfall + items.safety_stock[idx])
+    return PlanResult(idx=idx, qty=qty)
+
+
+def to_proposals(items: ItemArrays, result: PlanResult) -> list[dict]:
+    """Render a PlanResult in the /agents/planner/proposals response shape (proposal_id is added by app.proposal_cache)."""
+    out = []
+    for i, need in zip(result.idx.tolist(), result.qty.tolist()):
+        on_hand = int(items.on_hand[i])
+        rp = int(items.reorder_point[i])
+        ss = int(items.safety_stock[i])
+        on_order = int(items.on_order[i])
+        stock = f"on_hand {on_hand}" + (f" + on_order {on_order}" if on_order else "")
+        source = " (forecast)" if items.forecast is not None and items.forecast[i] else ""
+        item_id = int(items.ids[i])
+        out.append({
+            "item_id": item_id,
+            "sku": items.sku[i],
+            "name": items.name[i],
+            "suggested_qty": int(need),
+            "reason": f"{stock} < reorder_point {rp}, ss {ss}{source}",
+        })
+    return out
+
+
+def planner_proposals(conn) -> list[dict]:
+    items = load_item_arrays(conn, use_forecast=True)
+    return to_proposals(items, plan(items))
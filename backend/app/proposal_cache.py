@@ -0,0 +1,184 @@
+# app/proposal_cache.py
+"""
+Per-item cache of planner proposals.
+
+Freshness is shared by every uvicorn worker through the cache_version row
+VERSION_KEY (app/cache_version.py). A writer that changes an item's stock,
+master fields or open POs calls `proposal_cache.touch(conn)` in its transaction, which
+bumps the row and returns the new version, and after commit hands that
+version to `mark_dirty(item_ids, version)`. A poll reads the row: if it
+hasn't moved since the listing was built, the ETag (derived from the
+version, so the same on every worker) still holds and a conditional poll is
+answered with 304. If it moved and this worker saw every version in between
+through mark_dirty, only those items are recomputed; a version written by
+another worker (or by a writer that only touched) means a full rebuild.
+
+Each proposal carries the id of the planner agent's persisted OPEN
+agent_proposal for its item, which is what POST /agents/proposals:act
+takes. The agent runtime touches the version when it replaces proposals,
+so the ids are looked up again whenever the version moves.
+
+Two locks: `_state_lock` guards the marks and counters and is only ever
+held briefly (writers call mark_dirty from the event loop), while
+`_compute_lock` serializes recomputes, which do DB work in a worker thread.
+"""
+import threading
+import zlib
+
+from sqlalchemy import text
+
+from app import cache_version, planning
+
+VERSION_KEY = "proposals"
+
+_OPEN_PLANNER_PROPOSALS = text("""
+    SELECT item_id, id FROM agent_proposal
+    WHERE agent = 'planner' AND status = 'OPEN' AND kind = 'REORDER'
+""")
+
+
+class ProposalCache:
+    def __init__(self):
+        self._state_lock = threading.Lock()
+        self._compute_lock = threading.Lock()
+        self._by_item: dict[int, dict] = {}
+        self._marks: dict[tuple, set[int]] = {}  # touch() version -> item ids, for versions past _version
+        self._version: tuple | None = None      # current_version() the listing was built at
+        self._busy = False
+        self._listing: list[dict] = []
+        self.hits = 0
+        self.misses = 0
+        self.recomputed_items = 0
+        self.full_rebuilds = 0
+
+    # -- invalidation -------------------------------------------------------
+    @staticmethod
+    def touch(conn) -> tuple:
+        """Mark the proposals changed, in the caller's transaction; returns the version for mark_dirty."""
+        version = cache_version.bump(conn, VERSION_KEY)
+        return (*cache_version.current_database(conn), version)
+
+    def mark_dirty(self, item_ids, version: tuple | None) -> None:
+        """After commit: the transaction that touch()ed `version` changed `item_ids`."""
+        if version is None:
+            return
+        ids = [int(i) for i in item_ids]
+        with self._state_lock:
+            built = self._version
+            if built is None or built[:-1] != version[:-1] or version[-1] > built[-1]:
+                self._marks.setdefault(version, set()).update(ids)
+
+    def invalidate_all(self) -> None:
+        with self._state_lock:
+            self._version = None
+            self._marks.clear()
+
+    # -- reads --------------------------------------------------------------
+    @staticmethod
+    def current_version(conn) -> tuple:
+        """The version a poll compares against (one primary-key read)."""
+        return cache_version.current(conn, VERSION_KEY)
+
+    @property
+    def etag(self) -> str | None:
+        v = self._version
+        if v is None:
+            return None
+        return f'W/"proposals-{zlib.crc32(repr(v[:-1]).encode()):08x}-{v[-1]}"'
+
+    def fresh_etag(self, version: tuple) -> str | None:
+        """The ETag if the listing was built at `version` (see current_version()) and no recompute is running."""
+        with self._state_lock:
+            if self._version == version and not self._busy:
+                return self.etag
+            return None
+
+    def not_modified(self, if_none_match: str | None, version: tuple) -> bool:
+        """True when the client's ETag still matches and the proposals haven't changed since."""
+        if not if_none_match:
+            return False
+        etag = self.fresh_etag(version)
+        if etag is not None and etag == if_none_match.strip():
+            with self._state_lock:
+                self.hits += 1
+            return True
+        return False
+
+    def get(self, conn) -> tuple[list[dict], str]:
+        """Proposals for the whole catalog plus their ETag, recomputing only dirty items when it can."""
+        with self._compute_lock:
+            version = self.current_version(conn)  # before reading items: a later write only causes another refresh
+            with self._state_lock:
+                built = self._version
+                marks = self._marks
+                self._marks = {v: ids for v, ids in marks.items() if v[:-1] == version[:-1] and v[-1] > version[-1]}
+                if built is None or built[:-1] != version[:-1] or version[-1] < built[-1]:
+                    full, dirty = True, []
+                else:
+                    seen = [(*version[:-1], v) for v in range(built[-1] + 1, version[-1] + 1)]
+                    full = any(v not in marks for v in seen)
+                    dirty = [] if full else sorted(set().union(*(marks[v] for v in seen)))
+                self._busy = True
+            try:
+                if full:
+                    self._rebuild(conn)
+                elif dirty:
+                    self._refresh(conn, dirty)
+                if version != built:
+                    self._relist(conn)
+                else:
+                    with self._state_lock:
+                        self.hits += 1
+                with self._state_lock:
+                    self._version = version
+            except Exception:
+                with self._state_lock:
+                    # retry the same work on the next poll
+                    for v, ids in marks.items():
+                        self._marks.setdefault(v, set()).update(ids)
+                raise
+            finally:
+                with self._state_lock:
+                    self._busy = False
+            return self._listing, self.etag
+
+    def _rebuild(self, conn) -> None:
+        items = planning.load_item_arrays(conn, use_forecast=True)
+        self._by_item = {p["item_id"]: p for p in planning.to_proposals(items, planning.plan(items))}
+        with self._state_lock:
+            self.misses += 1
+            self.full_rebuilds += 1
+            self.recomputed_items += len(items)
+
+    def _refresh(self, conn, dirty: list[int]) -> None:
+        items = planning.load_item_arrays(conn, dirty, use_forecast=True)
+        fresh = {p["item_id"]: p for p in planning.to_proposals(items, planning.plan(items))}
+        for item_id in dirty:
+            new = fresh.get(item_id)
+            if new is None:
+                self._by_item.pop(item_id, None)
+            else:
+                self._by_item[item_id] = new
+        with self._state_lock:
+            self.misses += 1
+            self.recomputed_items += len(dirty)
+
+    def stats(self) -> dict:
+        with self._state_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "recomputed_items": self.recomputed_items,
+                "full_rebuilds": self.full_rebuilds,
+                "cached_proposals": len(self._by_item),
+                "dirty_items": len(set().union(*self._marks.values())),
+                "etag": self.etag,
+            }
+
+    def _relist(self, conn) -> None:
+        # proposal_id is the planner agent's persisted proposal for the item (None until it has run)
+        ids = dict(conn.execute(_OPEN_PLANNER_PROPOSALS).all())
+        self._listing = [{"proposal_id": ids.get(k), **self._by_item[k]} for k in sorted(self._by_item)]
+
+
+proposal_cache = ProposalCache()
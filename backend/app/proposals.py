@@ -0,0 +1,141 @@
+# app/proposals.py
+"""
+Approve / reject persisted agent proposals in bulk.
+
+act(conn, rows) handles thousands of {proposal_id, action, qty?} rows in
+the caller's transaction with a fixed number of statements per ID_CHUNK:
+
+1. claim: UPDATE agent_proposal SET status = APPROVED|REJECTED
+   WHERE status = 'OPEN' AND id IN (...) RETURNING ... - only rows still
+   OPEN move, so two workers acting on the same proposal can't both win;
+2. one executemany INSERT ... RETURNING for the purchase orders of the
+   claimed REORDER approvals (purchase_order.proposal_id is unique, the
+   backstop if a claim ever slipped);
+3. one executemany INSERT ... RETURNING for the event_log rows.
+
+Acting is idempotent on proposal id: a row whose proposal already has the
+requested status is answered from the DB (with its existing po_id) and
+marked replayed, so a retried request doesn't order twice. Asking for the
+other status, or acting on a SUPERSEDED proposal, is a per-row error.
+"""
+from sqlalchemy import bindparam, column, insert, table, text
+
+from app.db import ID_CHUNK
+from app.events import record_events
+
+ACTIONS = {"APPROVE": "APPROVED", "REJECT": "REJECTED"}
+MAX_ACTIONS = 20_000
+
+_purchase_order = table("purchase_order", column("id"), column("item_id"), column("qty"), column("status"),
+                        column("due_day"), column("note"), column("proposal_id"))
+
+_CLAIM = text("""
+    UPDATE agent_proposal SET status = :status, acted_at = CURRENT_TIMESTAMP
+    WHERE status = 'OPEN' AND id IN :ids
+    RETURNING id, agent, kind, item_id, qty
+""").bindparams(bindparam("ids", expanding=True))
+
+_CURRENT = text("""
+    SELECT p.id, p.status, po.id AS po_id
+    FROM agent_proposal p
+    LEFT JOIN purchase_order po ON po.proposal_id = p.id
+    WHERE p.id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+_LEAD_TIMES = text("SELECT id, lead_time_days FROM item WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+
+
+def _chunked(conn, stmt, ids, **params) -> list:
+    ids = sorted(ids)
+    out = []
+    for i in range(0, len(ids), ID_CHUNK):
+        out += conn.execute(stmt, {**params, "ids": ids[i:i + ID_CHUNK]}).all()
+    return out
+
+
+def validate(rows: list) -> tuple[list[dict], dict[int, tuple[int, str, int | None]]]:
+    """Per-row results (provisionally ok) and proposal_id -> (index, action, qty override)."""
+    results: list[dict] = []
+    valid: dict[int, tuple[int, str, int | None]] = {}
+    for idx, row in enumerate(rows):
+        error = None
+        if not isinstance(row, dict):
+            error = "not an object"
+        elif row.get("action") not in ACTIONS:
+            error = "invalid action"
+        else:
+            try:
+                pid = int(row.get("proposal_id", 0))
+                qty = None if row.get("qty") is None else int(row["qty"])
+            except (TypeError, ValueError):
+                error = "proposal_id and qty must be integers"
+            else:
+                if pid <= 0:
+                    error = "invalid proposal_id"
+                elif qty is not None and qty <= 0:
+                    error = "invalid qty"
+                elif pid in valid:
+                    error = "duplicate proposal_id"
+        if error:
+            results.append({"index": idx, "ok": False, "error": error})
+        else:
+            results.append({"index": idx, "proposal_id": pid, "ok": True})
+            valid[pid] = (idx, row["action"], qty)
+    return results, valid
+
+
+def act(conn, rows: list) -> tuple[list[dict], list[dict], set[int]]:
+    """Apply the actions in `rows`; returns (per-row results, events to publish after commit, item ids that got a PO)."""
+    results, valid = validate(rows)
+
+    claimed = []
+    for action, status in ACTIONS.items():
+        ids = [pid for pid, (_, a, _) in valid.items() if a == action]
+        claimed += [(status, r) for r in _chunked(conn, _CLAIM, ids, status=status)]
+
+    # rows that didn't move: replays of an earlier request, or errors
+    unclaimed = set(valid) - {r.id for _, r in claimed}
+    found = set()
+    for pid, status, po_id in _chunked(conn, _CURRENT, unclaimed):
+        found.add(pid)
+        idx, action, _ = valid[pid]
+        if status == ACTIONS[action]:
+            results[idx].update(status=status, po_id=po_id, replayed=True)
+        else:
+            results[idx] = {"index": idx, "proposal_id": pid, "ok": False, "error": f"proposal is {status}"}
+    for pid in unclaimed - found:
+        idx = valid[pid][0]
+        results[idx] = {"index": idx, "proposal_id": pid, "ok": False, "error": "unknown proposal_id"}
+
+    orders = []
+    for status, r in claimed:
+        idx, _, qty = valid[r.id]
+        qty = qty or r.qty
+        results[idx].update(status=status, po_id=None, replayed=False)
+        if status == "APPROVED" and r.kind == "REORDER" and r.item_id and qty:
+            orders.append({"item_id": r.item_id, "qty": qty, "proposal_id": r.id, "agent": r.agent})
+
+    events = []
+    if orders:
+        day = conn.execute(text("SELECT current_day FROM sim_state WHERE id = 1")).scalar()
+        lead = dict(_chunked(conn, _LEAD_TIMES, {o["item_id"] for o in orders}))
+        created = conn.execute(insert(_purchase_order).returning(_purchase_order.c.id, _purchase_order.c.proposal_id), [
+            {"item_id": o["item_id"], "qty": o["qty"], "status": "OPEN",
+             "due_day": day + (lead.get(o["item_id"]) or 0) if day is not None else None,
+             "note": f"Agent proposal {o['proposal_id']}", "proposal_id": o["proposal_id"]}
+            for o in orders
+        ]).all()
+        po_ids = {pid: po_id for po_id, pid in created}
+        for o in orders:
+            o["po_id"] = po_ids[o["proposal_id"]]
+            results[valid[o["proposal_id"]][0]]["po_id"] = o["po_id"]
+
+    ordered = {o["proposal_id"]: o for o in orders}
+    for status, r in claimed:
+        o = ordered.get(r.id)
+        if o:
+            events.append((r.agent, "PO_CREATED", {"po_id": o["po_id"], "proposal_id": r.id,
+                                                   "item_id": o["item_id"], "qty": o["qty"]}))
+        else:
+            events.append((r.agent, f"PROPOSAL_{status}", {"proposal_id": r.id, "item_id": r.item_id}))
+    return results, record_events(conn, events), {o["item_id"] for o in orders}
@@ -0,0 +1,187 @@
+# app/queries.py
+"""
+Dialect-portable statements for the hot paths, as SQLAlchemy Core against
+the app/models.py tables.
+
+The statements are module-level objects, so SQLAlchemy compiles each one
+once per dialect and serves it from the engine's compiled cache afterwards
+(a cache key lookup per execute, no string building). Constructs that only
+exist per dialect (ON CONFLICT) are built once per dialect name by
+insert_ignore().
+
+Two column types carry the dialect differences the raw SQL used to
+spell out for SQLite:
+
+- Timestamp: event and movement timestamps. SQLite keeps UTC text
+  'YYYY-MM-DD HH:MM:SS' (what CURRENT_TIMESTAMP writes, so string order is
+  time order), Postgres a timestamptz. Binds accept datetimes (naive = UTC)
+  or that text; results come back as that text on both, so the API doesn't
+  change shape with the backend.
+- as_json(): a serialized JSON bind for a JSON column. Bound as is on SQLite
+  (no json() re-parse), CAST(... AS JSON) on Postgres.
+
+Inserted ids come back with RETURNING (SQLite >= 3.35, Postgres), never
+last_insert_rowid().
+"""
+from datetime import datetime, timedelta, timezone
+from functools import cache
+
+from sqlalchemy import String, Text, bindparam, cast, func, insert, select, type_coerce, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import DateTime, TypeDecorator
+
+from app.models import EventLog, Item, ItemMovement, PurchaseOrder, SimState
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+item = Item.__table__
+item_movement = ItemMovement.__table__
+event_log = EventLog.__table__
+purchase_order = PurchaseOrder.__table__
+sim_state = SimState.__table__
+
+
+def utc(value: datetime | str) -> datetime:
+    """Aware UTC datetime from a datetime (naive = UTC) or 'YYYY-MM-DD HH:MM:SS' text."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class Timestamp(TypeDecorator):
+    """UTC timestamp: text on SQLite, timestamptz elsewhere; always read back as 'YYYY-MM-DD HH:MM:SS'."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime(timezone=True))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = utc(value)
+        return value.strftime(TS_FORMAT) if dialect.name == "sqlite" else value
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value and value[:19]
+        return utc(value).strftime(TS_FORMAT)
+
+
+class as_json(FunctionElement):
+    """A bound, already serialized JSON document headed for a JSON column."""
+
+    inherit_cache = True
+    type = String()
+
+
+@compiles(as_json)
+def _as_json(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(as_json, "postgresql")
+def _as_json_pg(element, compiler, **kw):
+    return f"CAST({compiler.process(element.clauses, **kw)} AS JSON)"
+
+
+def ts_param(name: str):
+    return bindparam(name, type_=Timestamp())
+
+
+@cache
+def insert_ignore(dialect_name: str, table, *index_elements: str):
+    """INSERT ... ON CONFLICT (index_elements) DO NOTHING for `dialect_name`, built once."""
+    dialect_insert = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}[dialect_name]
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=list(index_elements))
+
+
+# --- items and movements ---------------------------------------------------------
+
+RECEIVE = (
+    update(item)
+    .where(item.c.id == bindparam("item"))
+    .values(on_hand=item.c.on_hand + bindparam("q"))
+)
+
+INSERT_MOVEMENT = insert(item_movement).values(
+    item_id=bindparam("item"), move_type=bindparam("t"), qty=bindparam("q"), note=bindparam("n"),
+)
+
+MOVEMENTS_SINCE = (
+    select(type_coerce(item_movement.c.ts, Timestamp()).label("ts"), item_movement.c.move_type,
+           item_movement.c.qty, func.coalesce(item_movement.c.note, "").label("note"))
+    .where(item_movement.c.item_id == bindparam("item_id"), item_movement.c.ts >= ts_param("since"))
+    .order_by(item_movement.c.ts.desc())
+)
+
+
+def movements_since_params(item_id: int, days: int) -> dict:
+    return {"item_id": item_id, "since": utcnow() - timedelta(days=days)}
+
+
+# keyset page for exports (see app/streaming.keyset_pages)
+MOVEMENT_PAGE = (
+    select(item_movement.c.id, item_movement.c.item_id, type_coerce(item_movement.c.ts, Timestamp()).label("ts"),
+           item_movement.c.move_type, item_movement.c.qty, func.coalesce(item_movement.c.note, "").label("note"))
+    .where(item_movement.c.item_id == bindparam("item_id"), item_movement.c.id > bindparam("after"))
+    .order_by(item_movement.c.id)
+    .limit(bindparam("limit"))
+)
+
+
+# --- purchase orders -----------------------------------------------------------------
+
+CURRENT_DAY = select(sim_state.c.current_day).where(sim_state.c.id == 1)
+
+INSERT_PO_DUE_AFTER_LEAD_TIME = (
+    insert(purchase_order)
+    .values(
+        item_id=bindparam("item_id"), qty=bindparam("qty"), status="OPEN", note=bindparam("note"),
+        due_day=CURRENT_DAY.scalar_subquery()
+        + select(item.c.lead_time_days).where(item.c.id == bindparam("item_id")).scalar_subquery(),
+    )
+    .returning(purchase_order.c.id)
+)
+
+
+# --- event log ---------------------------------------------------------------------------
+
+EVENT_COLUMNS = (
+    event_log.c.id,
+    type_coerce(event_log.c.ts, Timestamp()).label("ts"),
+    event_log.c.actor,
+    event_log.c.event_type,
+    # the stored JSON text, not a parsed value (psycopg would decode a json column): clients get it as is
+    cast(event_log.c.payload_json, Text()).label("payload_json"),
+)
+
+INSERT_EVENT = (
+    insert(event_log)
+    .values(ts=ts_param("ts"), actor=bindparam("actor"), event_type=bindparam("event_type"),
+            payload_json=as_json(bindparam("payload_json", type_=String())))
+    .returning(*EVENT_COLUMNS)
+)
+
+
+def event_filters(actor=None, event_type=None, since=None, until=None) -> list:
+    """WHERE conditions for event_log listings; since/until are datetimes (naive = UTC)."""
+    conds = []
+    if actor:
+        conds.append(event_log.c.actor == actor)
+    if event_type:
+        conds.append(event_log.c.event_type == event_type)
+    if since:
+        conds.append(event_log.c.ts >= bindparam("since", since, type_=Timestamp()))
+    if until:
+        conds.append(event_log.c.ts < bindparam("until", until, type_=Timestamp()))
+    return conds
@@ -0,0 +1,293 @@
+# app/reconcile.py
+"""
+Ledger replay and on_hand reconciliation.
+
+item.on_hand is kept by adding to it in place (add_movement, the sim, the
+allocator), so nothing notices when it drifts from the item_movement
+ledger. This job replays the ledger into ledger_balance (per item: signed
+qty total and movement count; ADJUST counts 0, as everywhere else) and
+compares every item's on_hand with it:
+
+    python -m app.reconcile [--repair] [--full] [--workers 4]
+
+Incremental, like the rollups: the "ledger_balance" rollup_checkpoint row
+holds the last item_movement.id replayed, so a run reads only movements
+that arrived since the last one. --full replays the ledger from id 0 and
+replaces ledger_balance. The checkpoint is the highest id seen, which on
+Postgres can be ahead of ids still in flight: ids missing below it go to
+rollup_gap (app/snapshots.py), and every run folds the ones that have
+committed since.
+
+The replay walks the pending ids RECONCILE_CHUNK at a time; the database
+sums each slice per item (GROUP BY over a primary key range) and NumPy
+folds the slices together (np.unique + np.bincount), so memory is bounded
+by the number of distinct items touched, not by the ledger. A slice that
+counts fewer movements than ids has holes; it is re-read row by row, so
+its totals and its missing ids come from the same statement.
+When more than RECONCILE_PARALLEL_MIN movements are pending it splits the
+pending id range into partitions and replays them across a process pool,
+each worker on its own connection. Partitions are movement id slices, not
+item ranges: item_movement is clustered on id, so an id slice is one
+primary key range scan, while an item range would either rescan every
+pending id or walk the (item_id, ts) index with a table lookup per row.
+The parent folds the partitions' per-item totals together and writes them
+and the new checkpoint in one transaction, so a crashed or interrupted run
+leaves the previous checkpoint in place.
+
+The comparison runs in that same transaction, against ledger_balance plus
+movements past the new checkpoint (committed while the workers ran), so
+it sees a consistent balance, and also counts movements that committed
+into a gap after the replay. --repair sets on_hand to the ledger value
+with a relative update (on_hand + diff), which stays right even if a
+movement lands between the comparison and the update on Postgres.
+"""
+import argparse
+import itertools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+from app.db import engine
+from app.events import event_bus, record_event
+from app.proposal_cache import proposal_cache
+from app.snapshots import GAP_MOVEMENTS, SIGNED_QTY, claim_checkpoint, missing_ranges, update_gaps
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT = "ledger_balance"
+RECONCILE_CHUNK = int(os.getenv("RECONCILE_CHUNK", "200000"))
+RECONCILE_WORKERS = int(os.getenv("RECONCILE_WORKERS", str(min(os.cpu_count() or 1, 8))))
+# below this many pending movements one in-process scan beats starting a pool
+RECONCILE_PARALLEL_MIN = int(os.getenv("RECONCILE_PARALLEL_MIN", "2000000"))
+PARTITIONS_PER_WORKER = 4
+WRITE_CHUNK = 50_000
+MAX_REPORTED = 100
+
+
+# --- replay ------------------------------------------------------------------
+
+def _fold(ids: np.ndarray, qty: np.ndarray, moves: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sum qty and moves per distinct item id; returns (ids, qty, moves) sorted by id."""
+    uniq, inv = np.unique(ids, return_inverse=True)
+    return (uniq,
+            np.bincount(inv, weights=qty, minlength=len(uniq)).round().astype(np.int64),
+            np.bincount(inv, weights=moves, minlength=len(uniq)).round().astype(np.int64))
+
+
+_SLICE_TOTALS = text(f"""
+    SELECT m.item_id, SUM({SIGNED_QTY}), COUNT(*)
+    FROM item_movement m
+    WHERE m.id > :after AND m.id <= :upto
+    GROUP BY m.item_id
+""")
+
+_SLICE_ROWS = text(f"""
+    SELECT m.id, m.item_id, {SIGNED_QTY}
+    FROM item_movement m
+    WHERE m.id > :after AND m.id <= :upto
+    ORDER BY m.id
+""")
+
+
+def _block(rows) -> np.ndarray:
+    return np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows)).reshape(-1, 3)
+
+
+def replay(conn, after: int, upto: int, chunk: int = RECONCILE_CHUNK):
+    """
+    Per-item (ids, signed qty, moves) over movements with after < id <= upto,
+    plus the (lo, hi) id ranges missing from it. Aggregates `chunk` ids at a
+    time in the database (one primary key range each) and folds the slices
+    together; partial totals are compacted whenever they outgrow a chunk.
+    """
+    parts: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    gaps: list[tuple[int, int]] = []
+    pending = 0
+    for start in range(after, upto, chunk):
+        params = {"after": start, "upto": min(start + chunk, upto)}
+        rows = conn.execute(_SLICE_TOTALS, params).all()
+        if sum(n for _, _, n in rows) < params["upto"] - start:
+            block = _block(conn.execute(_SLICE_ROWS, params).all())
+            gaps += missing_ranges(block[:, 0], start, params["upto"])
+            if not len(block):
+                continue
+            parts.append(_fold(block[:, 1], block[:, 2], np.ones(len(block))))
+        else:
+            block = _block(rows)
+            parts.append((block[:, 0], block[:, 1], block[:, 2]))
+        pending += len(parts[-1][0])
+        if pending > chunk and len(parts) > 1:
+            parts = [_merge(parts)]
+            pending = len(parts[0][0])
+    return (*_merge(parts), gaps)
+
+
+def _merge(parts: list[tuple[np.ndarray, np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Fold several (ids, qty, moves) results into one."""
+    if not parts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    return parts[0] if len(parts) == 1 else _fold(*(np.concatenate(cols) for cols in zip(*parts)))
+
+
+def _replay_worker(url: str, after: int, upto: int, chunk: int):
+    """Process pool entry point: replay one id slice on a connection of its own."""
+    eng = create_engine(url, poolclass=NullPool)
+    try:
+        with eng.connect() as conn:
+            return replay(conn, after, upto, chunk)
+    finally:
+        eng.dispose()
+
+
+def partitions(after: int, upto: int, n: int) -> list[tuple[int, int]]:
+    """Split movement ids (after, upto] into at most n contiguous (after, upto] slices."""
+    width = max(1, -(-(upto - after) // n))
+    return [(start, min(start + width, upto)) for start in range(after, upto, width)]
+
+
+# --- reconcile -----------------------------------------------------------------
+
+_UPSERT = text("""
+    INSERT INTO ledger_balance (item_id, balance, moves) VALUES (:i, :b, :n)
+    ON CONFLICT(item_id) DO UPDATE SET
+        balance = ledger_balance.balance + excluded.balance,
+        moves = ledger_balance.moves + excluded.moves
+""")
+
+# ledger_balance plus what was committed past the checkpoint or into a gap, against on_hand
+_MISMATCHES = text(f"""
+    SELECT i.id, i.sku, i.on_hand, COALESCE(b.balance, 0) + COALESCE(t.delta, 0) AS ledger
+    FROM item i
+    LEFT JOIN ledger_balance b ON b.item_id = i.id
+    LEFT JOIN (
+        SELECT item_id, SUM(delta) AS delta FROM (
+            SELECT m.item_id, {SIGNED_QTY} AS delta FROM item_movement m WHERE m.id > :upto
+            UNION ALL
+            SELECT m.item_id, {SIGNED_QTY} FROM {GAP_MOVEMENTS}
+        ) u
+        GROUP BY item_id
+    ) t ON t.item_id = i.id
+    WHERE i.on_hand <> COALESCE(b.balance, 0) + COALESCE(t.delta, 0)
+    ORDER BY i.id
+""")
+
+_REPAIR = text("UPDATE item SET on_hand = on_hand + :diff WHERE id = :id")
+
+
+def reconcile(bind=None, repair: bool = False, full: bool = False, workers: int = RECONCILE_WORKERS,
+              chunk: int = RECONCILE_CHUNK, parallel_min: int = RECONCILE_PARALLEL_MIN) -> dict:
+    """
+    Replay new movements into ledger_balance and report (optionally repair)
+    items whose on_hand differs from the ledger. Returns a summary with the
+    first MAX_REPORTED mismatches.
+    """
+    bind = bind if bind is not None else engine
+    t0 = time.perf_counter()
+    with bind.connect() as conn:
+        after = 0 if full else conn.execute(
+            text("SELECT COALESCE(MAX(last_id), 0) FROM rollup_checkpoint WHERE name = :n"), {"n": CHECKPOINT}
+        ).scalar_one()
+        upto = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM item_movement")).scalar_one()
+        items = conn.execute(text("SELECT COUNT(*) FROM item")).scalar_one()
+
+    slices = [(after, upto)] if upto > after else []
+    if slices and workers > 1 and upto - after >= parallel_min:
+        slices = partitions(after, upto, workers * PARTITIONS_PER_WORKER)
+        url = bind.url.render_as_string(hide_password=False)
+        # spawn: workers build their own engine instead of inheriting the parent's pooled connections
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            ids, qty, moves = _merge([])
+            gaps = []
+            for *part, part_gaps in pool.map(_replay_worker, *zip(*((url, a, b, chunk) for a, b in slices))):
+                ids, qty, moves = _merge([(ids, qty, moves), tuple(part)])
+                gaps += part_gaps
+    else:
+        with bind.connect() as conn:
+            ids, qty, moves, gaps = replay(conn, after, upto, chunk) if slices else (*_merge([]), [])
+
+    mismatches: list[dict] = []
+    found = 0
+    event = None
+    with bind.begin() as conn:
+        if claim_checkpoint(conn, CHECKPOINT) != after and not full:
+            # another run moved the checkpoint while we replayed; its totals already cover ours
+            log.info("ledger replay from %d skipped: checkpoint moved", after)
+            return {"status": "skipped", "replayed": 0, "last_id": after}
+        if full:
+            conn.execute(text("DELETE FROM ledger_balance"))
+            conn.execute(text("DELETE FROM rollup_gap WHERE name = :n"), {"n": CHECKPOINT})
+        # earlier runs' gaps: whatever has committed into them since
+        late = _block(conn.execute(text(f"SELECT m.id, m.item_id, {SIGNED_QTY} FROM {GAP_MOVEMENTS}"),
+                                   {"cp": CHECKPOINT}).all())
+        if len(late):
+            ids, qty, moves = _merge([(ids, qty, moves), _fold(late[:, 1], late[:, 2], np.ones(len(late)))])
+        update_gaps(conn, CHECKPOINT, late[:, 0], gaps)
+        replayed = int(moves.sum())
+        for i in range(0, len(ids), WRITE_CHUNK):
+            conn.execute(_UPSERT, [{"i": a, "b": b, "n": n} for a, b, n in zip(
+                ids[i:i + WRITE_CHUNK].tolist(), qty[i:i + WRITE_CHUNK].tolist(), moves[i:i + WRITE_CHUNK].tolist())])
+        conn.execute(text("UPDATE rollup_checkpoint SET last_id = :last WHERE name = :n"), {"last": upto, "n": CHECKPOINT})
+
+        repairs = []
+        for r in conn.execute(_MISMATCHES, {"upto": upto, "cp": CHECKPOINT}):
+            found += 1
+            if len(mismatches) < MAX_REPORTED:
+                mismatches.append({"item_id": r.id, "sku": r.sku, "on_hand": r.on_hand, "ledger": r.ledger,
+                                   "diff": r.ledger - r.on_hand})
+            if repair:
+                repairs.append({"id": r.id, "diff": r.ledger - r.on_hand})
+        for i in range(0, len(repairs), WRITE_CHUNK):
+            conn.execute(_REPAIR, repairs[i:i + WRITE_CHUNK])
+        version = proposal_cache.touch(conn) if repairs else None
+        if found:
+            event = record_event(conn, "reconcile", "STOCK_RECONCILED" if repair else "STOCK_MISMATCH",
+                                 {"mismatches": found, "repaired": repair, "last_id": upto})
+
+    if event:
+        event_bus.publish(event)
+    if repair and found:
+        proposal_cache.mark_dirty((r["id"] for r in repairs), version)
+    return {
+        "status": "ok",
+        "full": full,
+        "replayed": replayed,
+        "late": len(late),
+        "after": after,
+        "last_id": upto,
+        "partitions": len(slices),
+        "items_checked": items,
+        "mismatches": found,
+        "repaired": found if repair else 0,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "first_mismatches": mismatches,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Replay item_movement and reconcile item.on_hand against it.")
+    ap.add_argument("--repair", action="store_true", help="set on_hand to the ledger balance where they differ")
+    ap.add_argument("--full", action="store_true", help="replay the whole ledger instead of new movements only")
+    ap.add_argument("--workers", type=int, default=RECONCILE_WORKERS)
+    ap.add_argument("--chunk", type=int, default=RECONCILE_CHUNK)
+    args = ap.parse_args()
+
+    result = reconcile(repair=args.repair, full=args.full, workers=args.workers, chunk=args.chunk)
+    if result["status"] != "ok":
+        print("another reconcile run moved the checkpoint; nothing done")
+        return
+    print(f"replayed {result['replayed']:,} movements (ids {result['after']}..{result['last_id']}) "
+          f"in {result['partitions']} partition(s), {result['seconds']} s; "
+          f"{result['mismatches']} mismatched item(s){', repaired' if result['repaired'] else ''}")
+    for m in result["first_mismatches"]:
+        print(f"  {m['sku']}: on_hand {m['on_hand']}, ledger {m['ledger']} ({m['diff']:+d})")
+
+
+if __name__ == "__main__":
+    main()
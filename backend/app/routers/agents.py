@@ -1,87 +1,329 @@
-from fastapi import APIRouter, Body, HTTPException
-from sqlalchemy import text
-from app.db import engine
+import asyncio
+import json
+from datetime import datetime
+
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import bindparam, select, text
+from starlette.concurrency import run_in_threadpool
+from app import forecast, mrp, proposals, queries
+from app.agent_runtime import AgentBusy
+from app.agents import runtime
+from app.db import async_engine, engine, run_write
+from app.event_writer import emitter
+from app.events import event_bus
+from app.proposal_cache import proposal_cache
+from app.queries import event_log
+from app.streaming import export_response, keyset_pages
 
 
 router = APIRouter(tags=["agents"])
 
-@router.get("/agents/planner/proposals")
-def planner_proposals():
+def _cached_proposals() -> tuple[list[dict], str]:
     with engine.connect() as conn:
-        rows = conn.execute(text("""
-            SELECT id, sku, name, on_hand, reorder_point, reorder_qty, safety_stock
-            FROM item
-            ORDER BY id
-        """)).mappings().all()
-
-    proposals = []
-    for r in rows:
-        on_hand = r["on_hand"] or 0
-        rp = r.get("reorder_point") or 0
-        rq = r.get("reorder_qty") or 0
-        ss = r.get("safety_stock") or 0
-        if on_hand < rp:
-            # easy heuristic
-            need = max(rq, (rp - on_hand) + ss)
-            proposals.append({
-                "proposal_id": f"PLN-{r['id']}",     # synthetic id
-                "item_id": r["id"],
-                "sku": r["sku"],
-                "name": r["name"],
-                "suggested_qty": int(need),
-                "reason": f"on_hand {on_hand} < reorder_point {rp}, ss {ss}",
-            })
+        return proposal_cache.get(conn)
+
+@router.get("/agents/planner/proposals")
+async def planner_proposals(request: Request, response: Response):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        async with async_engine.connect() as conn:
+            version = await conn.run_sync(proposal_cache.current_version)
+        if proposal_cache.not_modified(if_none_match, version):
+            return Response(status_code=304, headers={"ETag": if_none_match.strip()})
+    # planning is CPU-bound NumPy work: keep it off the event loop
+    proposals, etag = await run_in_threadpool(_cached_proposals)
+    response.headers["ETag"] = etag
     return proposals
 
-@router.post("/agents/planner/act")
-def planner_act(payload: dict = Body(...)):
-    action = payload.get("action")  # "APPROVE" | "REJECT"
-    item_id = int(payload.get("item_id", 0))
-    qty = int(payload.get("qty", 0))
-    sku = payload.get("sku", "")
-    proposal_id = payload.get("proposal_id", "")
-
-    if action not in ("APPROVE", "REJECT"):
-        raise HTTPException(status_code=400, detail="invalid action")
-    if item_id <= 0:
-        raise HTTPException(status_code=400, detail="invalid item_id")
-
-    with engine.begin() as conn:
-        if action == "APPROVE":
-            if qty <= 0:
-                raise HTTPException(status_code=400, detail="invalid qty")
-            # create PO
-            r = conn.execute(
-                text("""
-                    INSERT INTO purchase_order (item_id, qty, status, note)
-                    VALUES (:item_id, :qty, 'OPEN', :note)
-                """),
-                {"item_id": item_id, "qty": qty, "note": f"Planner proposal {proposal_id} for {sku}"},
-            )
-            po_id = conn.execute(text("SELECT last_insert_rowid()")).scalar_one()
-            # event
-            conn.execute(text("""
-                INSERT INTO event_log (actor, event_type, payload_json)
-                VALUES ('planner', 'PO_CREATED', json(:payload))
-            """), {"payload": f'{{"po_id":{po_id},"item_id":{item_id},"qty":{qty},"sku":"{sku}"}}'})
-            msg = f"📝 Created PO-{po_id} {qty} pcs for {sku}"
-            return {"ok": True, "message": msg, "po_id": po_id}
-
-        else:  # REJECT
-            conn.execute(text("""
-                INSERT INTO event_log (actor, event_type, payload_json)
-                VALUES ('planner', 'PROPOSAL_REJECTED', json(:payload))
-            """), {"payload": f'{{"proposal_id":"{proposal_id}","item_id":{item_id},"sku":"{sku}"}}'})
-            return {"ok": True, "message": f"❌ Rejected {proposal_id} for {sku}"}
-        
-    # Events log
-@router.get("/events")
-def events():
+@router.get("/agents/planner/cache")
+async def planner_cache_stats():
+    return proposal_cache.stats()
+
+@router.post("/agents/planner/forecast")
+async def planner_forecast_refresh(full: bool = Query(False)):
+    """Fold newly completed demand buckets into the forecasts behind the planner's reorder points."""
+    return await run_in_threadpool(forecast.refresh, None, full)
+
+# --- MRP (BOM explosion and netting, app/mrp.py) ---
+
+MRP_MAX_HORIZON_DAYS = 730
+MRP_MAX_LIMIT = 10_000
+
+def _mrp_plan(horizon_days: int, bucket_days: int, release_within_days: int | None, limit: int) -> dict:
     with engine.connect() as conn:
-        rows = conn.execute(text("""
-            SELECT id, ts, actor, event_type, payload_json
-            FROM event_log
+        items, result = mrp.plan_mrp(conn, horizon_days, bucket_days)
+    orders = mrp.planned_orders(items, result, release_within_days)
+    return {
+        "horizon_days": horizon_days,
+        "bucket_days": bucket_days,
+        "items": len(items),
+        "levels": int(result.llc.max(initial=0)) + 1,
+        "total": len(orders),
+        "planned_orders": orders[:limit],
+    }
+
+@router.get("/agents/mrp/plan")
+async def mrp_plan(
+    horizon_days: int = Query(mrp.MRP_HORIZON_DAYS, ge=1, le=MRP_MAX_HORIZON_DAYS),
+    bucket_days: int = Query(mrp.MRP_BUCKET_DAYS, ge=1, le=31),
+    release_within_days: int | None = Query(None, ge=1),
+    limit: int = Query(500, ge=1, le=MRP_MAX_LIMIT),
+):
+    """Planned orders from exploding demand through the BOM, earliest release first."""
+    try:
+        return await run_in_threadpool(_mrp_plan, horizon_days, bucket_days, release_within_days, limit)
+    except mrp.BomCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+# --- Agent runtime (registered agents, runs, persisted proposals) ---
+
+AGENT_LIST_MAX_LIMIT = 1000
+
+@router.get("/agents")
+async def list_agents():
+    """Registered agents with their timeout and latest run."""
+    async with async_engine.connect() as conn:
+        latest = {r["agent"]: dict(r) for r in (await conn.execute(text("""
+            SELECT r.agent, r.id AS run_id, r.tick_id, r.started_at, r.status, r.duration_ms,
+                   r.rows_read, r.proposals, r.error
+            FROM agent_run r
+            JOIN (SELECT agent, MAX(id) AS id FROM agent_run GROUP BY agent) m ON m.id = r.id
+        """))).mappings()}
+    return {
+        "runtime": runtime.stats(),
+        "agents": [
+            {"name": a.name, "description": a.description, "timeout_s": a.timeout_s, "last_run": latest.get(a.name)}
+            for a in runtime.agents.values()
+        ],
+    }
+
+@router.post("/agents/tick")
+async def agents_tick(agent: list[str] | None = Query(None)):
+    """Run the given agents (repeat `agent`; default all) concurrently and persist their proposals."""
+    try:
+        return await runtime.tick(agent)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except AgentBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+
+@router.get("/agents/runs")
+async def agent_runs(
+    response: Response,
+    agent: str | None = None,
+    before_id: int | None = Query(None, ge=1),
+    limit: int = Query(100, ge=1, le=AGENT_LIST_MAX_LIMIT),
+):
+    """Agent runs, newest first; page back with ?before_id= (also sent as X-Next-Before-Id)."""
+    clauses, params = [], {"limit": limit}
+    if agent:
+        clauses.append("agent = :agent")
+        params["agent"] = agent
+    if before_id is not None:
+        clauses.append("id < :before_id")
+        params["before_id"] = before_id
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    async with async_engine.connect() as conn:
+        rows = (await conn.execute(text(f"""
+            SELECT id, tick_id, agent, started_at, status, duration_ms, rows_read, proposals, error
+            FROM agent_run
+            {where}
             ORDER BY id DESC
-            LIMIT 100
-        """)).mappings().all()
+            LIMIT :limit
+        """), params)).mappings().all()
+    if len(rows) == limit:
+        response.headers["X-Next-Before-Id"] = str(rows[-1]["id"])
+    return [dict(r) for r in rows]
+
+@router.get("/agents/proposals")
+async def agent_proposals(
+    response: Response,
+    agent: str | None = None,
+    status: str | None = Query("OPEN"),
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=AGENT_LIST_MAX_LIMIT),
+):
+    """Persisted agent proposals, oldest first; page with ?after_id= (also sent as X-Next-After-Id)."""
+    clauses, params = ["id > :after"], {"after": after_id, "limit": limit}
+    if agent:
+        clauses.append("agent = :agent")
+        params["agent"] = agent
+    if status:
+        clauses.append("status = :status")
+        params["status"] = status
+    async with async_engine.connect() as conn:
+        rows = (await conn.execute(text(f"""
+            SELECT id, run_id, agent, kind, item_id, qty, reason, payload_json, status, created_at
+            FROM agent_proposal
+            WHERE {' AND '.join(clauses)}
+            ORDER BY id
+            LIMIT :limit
+        """), params)).mappings().all()
+    if len(rows) == limit:
+        response.headers["X-Next-After-Id"] = str(rows[-1]["id"])
+    return [{**r, "payload_json": json.loads(r["payload_json"]) if isinstance(r["payload_json"], str) else r["payload_json"]}
+            for r in rows]
+
+def _act_on_proposals(conn, rows: list) -> tuple:
+    results, events, ordered_items = proposals.act(conn, rows)
+    return results, events, ordered_items, proposal_cache.touch(conn) if ordered_items else None
+
+@router.post("/agents/proposals:act")
+async def act_on_proposals(rows: list = Body(...)):
+    """
+    Approve or reject many persisted proposals in one transaction. Body is a
+    JSON array of {proposal_id, action: APPROVE|REJECT, qty?}; approving a
+    REORDER proposal creates its PO (qty overrides the suggestion). Safe to
+    retry: proposals already in the requested state are reported as replayed.
+    """
+    if len(rows) > proposals.MAX_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"at most {proposals.MAX_ACTIONS} actions per request")
+    results, events, ordered_items, version = await run_write(_act_on_proposals, rows)
+
+    if events:
+        event_bus.publish(*events)
+    proposal_cache.mark_dirty(ordered_items, version)
+    done = [r for r in results if r["ok"]]
+    return {
+        "ok": True,
+        "applied": sum(not r["replayed"] for r in done),
+        "replayed": sum(r["replayed"] for r in done),
+        "rejected": len(results) - len(done),
+        "results": results,
+    }
+
+# --- Events log ---
+
+EVENTS_MAX_LIMIT = 1000
+
+@router.get("/events")
+async def events(
+    before_id: int | None = Query(None, ge=1),
+    after_id: int | None = Query(None, ge=0),
+    actor: str | None = None,
+    event_type: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int = Query(100, ge=1, le=EVENTS_MAX_LIMIT),
+):
+    """
+    Keyset-paginated event log. Newest first by default; page back with
+    ?before_id=<smallest id seen> (also sent as X-Next-Before-Id). With
+    ?after_id= the page is the oldest events after that id, ascending.
+    """
+    conds = queries.event_filters(actor, event_type, since, until)
+    if before_id is not None:
+        conds.append(event_log.c.id < before_id)
+    if after_id is not None:
+        conds.append(event_log.c.id > after_id)
+    ascending = after_id is not None and before_id is None
+    stmt = (select(*queries.EVENT_COLUMNS).where(*conds)
+            .order_by(event_log.c.id if ascending else event_log.c.id.desc()).limit(limit))
+
+    async with async_engine.connect() as conn:
+        rows = (await conn.execute(stmt)).mappings().all()
+    # ORJSONResponse directly: skips FastAPI's per-row jsonable_encoder pass
+    headers = ({"X-Next-After-Id" if ascending else "X-Next-Before-Id": str(rows[-1]["id"])}
+               if len(rows) == limit else None)
+    return ORJSONResponse([dict(r) for r in rows], headers=headers)
+
+@router.get("/events/writer")
+async def event_writer_stats():
+    return emitter.stats()
+
+EVENT_EXPORT_COLUMNS = ["id", "ts", "actor", "event_type", "payload_json"]
+
+@router.get("/events/export")
+async def export_events(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    after_id: int = Query(0, ge=0),
+    actor: str | None = None,
+    event_type: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    """Event log (optionally filtered), oldest first, streamed page by page."""
+    stmt = (select(*queries.EVENT_COLUMNS)
+            .where(event_log.c.id > bindparam("after"), *queries.event_filters(actor, event_type, since, until))
+            .order_by(event_log.c.id).limit(bindparam("limit")))
+    pages = keyset_pages(stmt, {"after": after_id})
+    return export_response(pages, format, EVENT_EXPORT_COLUMNS, "events")
+
+# --- Live event stream (Server-Sent Events) ---
+
+STREAM_KEEPALIVE_S = 15
+STREAM_BACKLOG_PAGE = 500
+
+_EVENTS_AFTER = (select(*queries.EVENT_COLUMNS).where(event_log.c.id > bindparam("after"))
+                 .order_by(event_log.c.id).limit(bindparam("limit")))
+
+async def _events_after(after_id: int, limit: int) -> list[dict]:
+    async with async_engine.connect() as conn:
+        rows = (await conn.execute(_EVENTS_AFTER, {"after": after_id, "limit": limit})).mappings().all()
     return [dict(r) for r in rows]
+
+async def _latest_event_id() -> int:
+    async with async_engine.connect() as conn:
+        return (await conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM event_log"))).scalar_one()
+
+def _sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: event_log\ndata: {json.dumps(event, default=str)}\n\n"
+
+@router.get("/events/stream")
+async def events_stream(request: Request, last_id: int | None = Query(None, ge=0)):
+    """
+    Server-Sent Events feed of new event_log rows. Resumes after `last_id`
+    (or the Last-Event-ID header a reconnecting EventSource sends); without
+    either it starts with events written from now on.
+    """
+    header = request.headers.get("last-event-id", "")
+    if last_id is None and header.isdigit():
+        last_id = int(header)
+    # subscribe before reading the backlog so nothing falls in between
+    sub = event_bus.subscribe()
+
+    async def catch_up(after: int):
+        while True:
+            page = await _events_after(after, STREAM_BACKLOG_PAGE)
+            for ev in page:
+                yield ev
+            if len(page) < STREAM_BACKLOG_PAGE:
+                return
+            after = page[-1]["id"]
+
+    async def stream():
+        sent = last_id if last_id is not None else await _latest_event_id()
+        # ids up to `floor` came from a DB read; pushes at or below it are duplicates
+        floor = sent
+        try:
+            async for ev in catch_up(sent):
+                sent = floor = ev["id"]
+                yield _sse(ev)
+            while not await request.is_disconnected():
+                try:
+                    ev = await asyncio.wait_for(sub.queue.get(), timeout=STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if sub.overflowed:
+                    # we fell behind the publishers; drop the queue and re-read from the DB
+                    sub.overflowed = False
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    async for missed in catch_up(sent):
+                        sent = floor = missed["id"]
+                        yield _sse(missed)
+                    continue
+                if ev["id"] <= floor:
+                    continue
+                sent = max(sent, ev["id"])
+                yield _sse(ev)
+        finally:
+            event_bus.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
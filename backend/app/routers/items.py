@@ -1,39 +1,440 @@
-from fastapi import APIRouter, Body, HTTPException
-from sqlalchemy import text
-from app.db import engine
+import json
+import math
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from fastapi import APIRouter, Body, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from app import analytics, forecast, item_import, mrp, queries, snapshots
+from app.allocation import TAKE_AVAILABLE
+from app.db import ID_CHUNK, async_engine, run_write
+from app.event_writer import emitter
+from app.events import event_bus, record_event
+from app.item_master import MASTER_FIELDS, bump_version, item_master
+from app.proposal_cache import proposal_cache
 
 router = APIRouter(tags=["items"])
 
+MOVE_TYPES = ("IN", "OUT", "ADJUST")
+# on_hand effect per movement type (ADJUST is recorded but doesn't move stock)
+MOVE_SIGN = {"IN": 1, "OUT": -1, "ADJUST": 0}
+
+ITEMS_DEFAULT_LIMIT = 500
+ITEMS_MAX_LIMIT = 5000
+# read from the item table on every call; the rest comes from the item master cache
+ITEM_STOCK_FIELDS = ("on_hand", "allocated")
+ITEM_FIELDS = ("id", *MASTER_FIELDS, *ITEM_STOCK_FIELDS)
+ITEM_DEFAULT_FIELDS = "id,sku,name,on_hand,reorder_point"
+
+def _sku_range(prefix: str) -> tuple[str, str]:
+    """[lo, hi) bounds matching every sku that starts with `prefix`, in code point order."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+def _sku_range_clause(dialect_name: str) -> str:
+    """
+    sku in [:sku_lo, :sku_hi). A prefix is one range only in code point order:
+    SQLite's default BINARY collation, while a Postgres database collation
+    such as en_US ignores punctuation and can put 'AB-1' outside ['AB-', 'AB.').
+    There the comparison runs under "C", on the ix_item_sku_c index.
+    """
+    col = 'sku COLLATE "C"' if dialect_name == "postgresql" else "sku"
+    return f"{col} >= :sku_lo AND {col} < :sku_hi"
+
+def _item_rows(conn, stock: list, fields: tuple[str, ...], stock_fields: tuple[str, ...]) -> list[dict]:
+    """Join (id, *stock_fields) rows with cached master fields, keeping only `fields`."""
+    master_fields = [f for f in fields if f in MASTER_FIELDS]
+    master = item_master.get_many(conn, [r[0] for r in stock]) if master_fields else {}
+    out = []
+    for r in stock:
+        values = dict(zip(("id", *stock_fields), r))
+        if master_fields:
+            m = master.get(r[0])
+            if m is None:  # deleted between the two reads
+                continue
+            for f in master_fields:
+                values[f] = m[f]
+        out.append({f: values[f] for f in fields})
+    return out
+
 @router.get("/items")
-def list_items():
-    with engine.connect() as conn:
-        rows = conn.execute(text("""
-            SELECT id, sku, name, on_hand, reorder_point
+async def list_items(
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(ITEMS_DEFAULT_LIMIT, ge=1, le=ITEMS_MAX_LIMIT),
+    fields: str = Query(ITEM_DEFAULT_FIELDS),
+    below_reorder_point: bool = False,
+    sku_prefix: str | None = Query(None, min_length=1),
+    uom: str | None = None,
+):
+    """
+    Items by id, one keyset page at a time: pass the X-Next-After-Id header
+    of a full page as ?after_id= for the next one. `fields` is a comma list
+    of the columns to return (id always included), so a table that shows
+    four columns doesn't pay for ten.
+    """
+    wanted = tuple(dict.fromkeys(["id", *(f.strip() for f in fields.split(",") if f.strip())]))
+    unknown = [f for f in wanted if f not in ITEM_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields {unknown}; choose from {', '.join(ITEM_FIELDS)}")
+
+    clauses, params = ["id > :after"], {"after": after_id, "limit": limit}
+    if below_reorder_point:
+        clauses.append("on_hand < reorder_point")
+    if sku_prefix:
+        clauses.append(_sku_range_clause(async_engine.dialect.name))
+        params["sku_lo"], params["sku_hi"] = _sku_range(sku_prefix)
+    if uom:
+        clauses.append("uom = :uom")
+        params["uom"] = uom
+    stock_fields = tuple(f for f in ITEM_STOCK_FIELDS if f in wanted)
+
+    async with async_engine.connect() as conn:
+        stock = (await conn.execute(text(f"""
+            SELECT {", ".join(("id", *stock_fields))}
             FROM item
+            WHERE {" AND ".join(clauses)}
             ORDER BY id
-        """)).mappings().all()
-        return [dict(r) for r in rows]
+            LIMIT :limit
+        """), params)).all()
+        rows = await conn.run_sync(_item_rows, stock, wanted, stock_fields)
+
+    # ORJSONResponse directly: skips FastAPI's per-row jsonable_encoder pass
+    headers = {"X-Next-After-Id": str(stock[-1][0])} if len(stock) == limit else None
+    return ORJSONResponse(rows, headers=headers)
+
+@router.get("/items/cache")
+async def item_cache_stats():
+    return item_master.stats()
+
+# master fields a PATCH may change, with the type each is coerced to
+ITEM_EDITABLE = {"sku": str, "name": str, "uom": str, "reorder_point": int, "reorder_qty": int,
+                 "safety_stock": int, "lead_time_days": int}
+
+def _update_item(conn, item_id: int, values: dict) -> dict:
+    assignments = ", ".join(f"{k} = :{k}" for k in values)
+    if conn.execute(text(f"UPDATE item SET {assignments} WHERE id = :id"), {**values, "id": item_id}).rowcount == 0:
+        raise HTTPException(status_code=404, detail="item not found")
+    bump_version(conn)
+    return record_event(conn, "items", "ITEM_UPDATED", {"item_id": item_id, **values}), proposal_cache.touch(conn)
+
+@router.patch("/items/{item_id}")
+async def update_item(item_id: int, payload: dict = Body(...)):
+    """Change item master fields; every worker's master cache drops its copy."""
+    unknown = sorted(set(payload) - set(ITEM_EDITABLE))
+    if unknown or not payload:
+        raise HTTPException(status_code=400, detail=f"editable fields: {', '.join(ITEM_EDITABLE)}")
+    try:
+        values = {k: ITEM_EDITABLE[k](v) for k, v in payload.items()}
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="invalid field value")
+    if any(isinstance(v, int) and v < 0 for v in values.values()) or any(v == "" for v in values.values()):
+        raise HTTPException(status_code=400, detail="invalid field value")
+
+    try:
+        event, version = await run_write(_update_item, item_id, values)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="sku already in use")
+
+    event_bus.publish(event)
+    item_master.invalidate([item_id])
+    proposal_cache.mark_dirty([item_id], version)
+    return {"ok": True, "item_id": item_id, **values}
+
+def _book_movement(conn, item_id: int, move_type: str, qty: int, note: str) -> int | None:
+    if move_type == "OUT":
+        # guarded: never below zero, never into stock reserved for sales orders
+        if conn.execute(TAKE_AVAILABLE, {"id": item_id, "q": qty}).rowcount == 0:
+            raise HTTPException(status_code=409, detail="unknown item or insufficient available stock")
+    elif move_type == "IN":
+        conn.execute(queries.RECEIVE, {"item": item_id, "q": qty})
+    conn.execute(queries.INSERT_MOVEMENT, {"item": item_id, "t": move_type, "q": qty, "n": note})
+    # ADJUST doesn't move stock, so the proposals stand
+    return proposal_cache.touch(conn) if move_type != "ADJUST" else None
 
 @router.post("/items/{item_id}/movements")
-def add_movement(item_id: int, payload: dict = Body(...)):
-    move_type = payload.get("move_type")
-    qty = int(payload.get("qty", 0))
-    note = payload.get("note", "")
-
-    if move_type not in ("IN", "OUT", "ADJUST") or qty <= 0:
-        raise HTTPException(status_code=400, detail="invalid payload")
-
-    with engine.begin() as conn:
-        conn.execute(
-            text("""
-                INSERT INTO item_movement (item_id, move_type, qty, note)
-                VALUES (:id, :t, :q, :n)
-            """),
-            {"id": item_id, "t": move_type, "q": qty, "n": note},
-        )
-        if move_type == "IN":
-            conn.execute(text("UPDATE item SET on_hand = on_hand + :q WHERE id = :id"), {"id": item_id, "q": qty})
-        elif move_type == "OUT":
-            conn.execute(text("UPDATE item SET on_hand = on_hand - :q WHERE id = :id"), {"id": item_id, "q": qty})
-
-    return {"ok": True}
\ No newline at end of file
+async def add_movement(item_id: int, payload: dict = Body(...)):
+    # the same checks as one row of /movements:batch
+    params, error = _validate_movement({**payload, "item_id": item_id})
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    move_type, qty, note = params["t"], params["q"], params["n"]
+
+    version = await run_write(_book_movement, item_id, move_type, qty, note)
+
+    await emitter.aemit("items", "MOVEMENT", {"item_id": item_id, "move_type": move_type, "qty": qty})
+    proposal_cache.mark_dirty([item_id], version)
+    return {"ok": True}
+
+
+# --- Historical balance (stock_snapshot + movements since the last rollup) ---
+
+@router.get("/items/{item_id}/balance")
+async def item_balance(item_id: int, at: date | None = None):
+    """Ledger on_hand at the end of day `at` (UTC, default today)."""
+    at = at or datetime.now(timezone.utc).date()
+    async with async_engine.connect() as conn:
+        return await conn.run_sync(snapshots.balance_at, item_id, at)
+
+@router.get("/items/{item_id}/balance/history")
+async def item_balance_history(item_id: int, start: date, end: date | None = None):
+    """Daily closing on_hand and in/out totals for every day in [start, end]."""
+    end = end or datetime.now(timezone.utc).date()
+    if end < start or (end - start).days >= snapshots.MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"need start <= end and at most {snapshots.MAX_RANGE_DAYS} days")
+    async with async_engine.connect() as conn:
+        days = await conn.run_sync(snapshots.balance_range, item_id, start, end)
+    return {"item_id": item_id, "start": start.isoformat(), "end": end.isoformat(), "days": days}
+
+
+# --- Bill of materials (app/mrp.py) ---
+
+@router.get("/items/{item_id}/bom")
+async def item_bom(item_id: int):
+    """The item's components and the items it is a component of."""
+    async with async_engine.connect() as conn:
+        components = (await conn.execute(text("""
+            SELECT b.component_id, i.sku, i.name, b.qty_per
+            FROM bom_line b JOIN item i ON i.id = b.component_id
+            WHERE b.parent_id = :id
+            ORDER BY b.component_id
+        """), {"id": item_id})).all()
+        used_in = (await conn.execute(text("""
+            SELECT b.parent_id, i.sku, b.qty_per
+            FROM bom_line b JOIN item i ON i.id = b.parent_id
+            WHERE b.component_id = :id
+            ORDER BY b.parent_id
+        """), {"id": item_id})).all()
+    return {
+        "item_id": item_id,
+        "components": [{"component_id": r[0], "sku": r[1], "name": r[2], "qty_per": r[3]} for r in components],
+        "used_in": [{"parent_id": r[0], "sku": r[1], "qty_per": r[2]} for r in used_in],
+    }
+
+def _replace_bom(conn, item_id: int, components: dict[int, float]) -> tuple[int, dict]:
+    if len(existing_item_ids(conn, [item_id, *components])) < len(components) + 1:
+        raise HTTPException(status_code=404, detail="unknown item or component")
+    try:
+        written = mrp.replace_components(conn, item_id, components)
+    except mrp.BomCycleError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return written, record_event(conn, "items", "BOM_UPDATED", {"item_id": item_id, "components": written})
+
+@router.put("/items/{item_id}/bom")
+async def replace_item_bom(item_id: int, lines: list = Body(...)):
+    """Replace the item's components ([{component_id, qty_per}]); 409 if that would make the BOM cyclic."""
+    try:
+        components = {int(line["component_id"]): float(line["qty_per"]) for line in lines}
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="lines: [{component_id, qty_per}]")
+    if len(components) < len(lines) or item_id in components or \
+            any(not math.isfinite(q) or q <= 0 for q in components.values()):
+        raise HTTPException(status_code=400, detail="components must be distinct other items with qty_per > 0")
+
+    written, event = await run_write(_replace_bom, item_id, components)
+
+    event_bus.publish(event)
+    mrp.bom_cache.invalidate()
+    return {"ok": True, "item_id": item_id, "components": written}
+
+
+# --- Demand forecast (app/forecast.py) ---
+
+@router.get("/items/{item_id}/forecast")
+async def item_forecast(item_id: int):
+    """The item's typed-in reorder point and safety stock next to the forecast's recommendation."""
+    async with async_engine.connect() as conn:
+        item = (await conn.execute(text("SELECT sku, reorder_point, safety_stock FROM item WHERE id = :id"),
+                                   {"id": item_id})).first()
+        if item is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        fc = await conn.run_sync(forecast.item_forecast, item_id)
+    planned = fc is not None and fc["reorder_point"] is not None and forecast.FORECAST_PLANNING
+    return {
+        "item_id": item_id,
+        "sku": item.sku,
+        "reorder_point": item.reorder_point,
+        "safety_stock": item.safety_stock,
+        "forecast": fc,
+        "planner_uses": "forecast" if planned else "item",
+    }
+
+
+# --- Movement analytics (precomputed movement_rollup buckets) ---
+
+@router.get("/movements/summary")
+async def movement_summary(
+    start: date,
+    end: date | None = None,
+    grain: str = Query("day", pattern="^(day|week|month)$"),
+    item_id: list[int] | None = Query(None),
+):
+    """
+    IN/OUT/ADJUST totals and movement counts per item per day, week or month
+    bucket. Repeat `item_id` to pick items; omit it for every item.
+    """
+    end = end or datetime.now(timezone.utc).date()
+    if end < start or (end - start).days >= snapshots.MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"need start <= end and at most {snapshots.MAX_RANGE_DAYS} days")
+    async with async_engine.connect() as conn:
+        rows = await conn.run_sync(analytics.movement_summary, grain, start, end, item_id)
+    return {"grain": grain, "start": analytics.bucket_of(start, grain).isoformat(), "end": end.isoformat(), "rows": rows}
+
+
+# --- Batch ingestion ---
+
+def _decode_batch(body: bytes, content_type: str) -> list:
+    """JSON array by default; NDJSON (one object per line) when the client says so."""
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    rows = json.loads(body or b"[]")
+    if not isinstance(rows, list):
+        raise ValueError("expected a JSON array of movements")
+    return rows
+
+def _validate_movement(row) -> tuple[dict | None, str | None]:
+    if not isinstance(row, dict):
+        return None, "not an object"
+    move_type = row.get("move_type")
+    if move_type not in MOVE_TYPES:
+        return None, "invalid move_type"
+    try:
+        item_id = int(row.get("item_id", 0))
+        qty = int(row.get("qty", 0))
+    except (TypeError, ValueError):
+        return None, "item_id and qty must be integers"
+    if item_id <= 0:
+        return None, "invalid item_id"
+    if qty <= 0:
+        return None, "invalid qty"
+    return {"id": item_id, "t": move_type, "q": qty, "n": str(row.get("note") or "")}, None
+
+def existing_item_ids(conn, item_ids) -> set[int]:
+    """Which of `item_ids` exist, looked up in chunks of ID_CHUNK."""
+    ids = sorted(set(item_ids))
+    stmt = text("SELECT id FROM item WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+    found: set[int] = set()
+    for i in range(0, len(ids), ID_CHUNK):
+        found.update(conn.execute(stmt, {"ids": ids[i:i + ID_CHUNK]}).scalars())
+    return found
+
+def validate_batch(rows: list) -> tuple[list[dict], list[tuple[int, dict]]]:
+    """Per-row results (provisionally ok) and the (index, params) pairs that passed validation."""
+    results: list[dict] = []
+    valid: list[tuple[int, dict]] = []
+    for idx, row in enumerate(rows):
+        params, error = _validate_movement(row)
+        if error:
+            results.append({"index": idx, "ok": False, "error": error})
+        else:
+            results.append({"index": idx, "ok": True})
+            valid.append((idx, params))
+    return results, valid
+
+def apply_batch(conn, results: list[dict], valid: list[tuple[int, dict]]) -> tuple[list[dict], list[dict], dict | None]:
+    """
+    Insert the movements of known items with one executemany and apply one
+    aggregated on_hand delta per item; returns (accepted, updates, event).
+    An item whose net delta would take more than its available (unreserved)
+    stock has all of its rows in the batch rejected.
+    """
+    known = existing_item_ids(conn, (p["id"] for _, p in valid))
+    candidates = []
+    for idx, params in valid:
+        if params["id"] in known:
+            candidates.append((idx, params))
+        else:
+            results[idx] = {"index": idx, "ok": False, "error": "unknown item_id"}
+
+    deltas: dict[int, int] = defaultdict(int)
+    for _, p in candidates:
+        deltas[p["id"]] += MOVE_SIGN[p["t"]] * p["q"]
+    # net takes are guarded one item at a time; receipts go in one executemany
+    short = {item_id for item_id, d in deltas.items()
+             if d < 0 and conn.execute(TAKE_AVAILABLE, {"id": item_id, "q": -d}).rowcount == 0}
+    accepted = []
+    for idx, params in candidates:
+        if params["id"] in short:
+            results[idx] = {"index": idx, "ok": False, "error": "insufficient available stock"}
+        else:
+            accepted.append(params)
+    if not accepted:
+        return accepted, [], None
+
+    conn.execute(text("""
+        INSERT INTO item_movement (item_id, move_type, qty, note)
+        VALUES (:id, :t, :q, :n)
+    """), accepted)
+
+    updates = [{"id": item_id, "d": d} for item_id, d in deltas.items() if d and item_id not in short]
+    receipts = [u for u in updates if u["d"] > 0]
+    if receipts:
+        conn.execute(text("UPDATE item SET on_hand = on_hand + :d WHERE id = :id"), receipts)
+    event = record_event(conn, "items", "MOVEMENTS_BATCH",
+                         {"accepted": len(accepted), "items": len(deltas) - len(short)})
+    return accepted, updates, event
+
+def _apply_movements(conn, results: list[dict], valid: list[tuple[int, dict]]) -> tuple:
+    accepted, updates, event = apply_batch(conn, results, valid)
+    return accepted, updates, event, proposal_cache.touch(conn) if updates else None
+
+async def ingest_movements(rows: list) -> dict:
+    """
+    Validate and apply many movements in one transaction: a single executemany
+    INSERT into item_movement plus one aggregated on_hand UPDATE per item.
+    Invalid rows are reported and skipped; they don't abort the batch.
+
+    Validating thousands of rows is CPU-bound, so it runs in the threadpool;
+    the transaction goes through run_write like every other write.
+    """
+    results, valid = await run_in_threadpool(validate_batch, rows)
+    accepted, updates, event, version = await run_write(_apply_movements, results, valid)
+
+    if event:
+        event_bus.publish(event)
+    proposal_cache.mark_dirty((u["id"] for u in updates), version)
+    return {
+        "ok": True,
+        "accepted": len(accepted),
+        "rejected": len(rows) - len(accepted),
+        "results": results,
+    }
+
+@router.post("/movements:batch")
+async def batch_movements(request: Request):
+    """
+    Bulk movement ingestion. Body is a JSON array of
+    {item_id, move_type, qty, note?} objects, or NDJSON when sent with
+    Content-Type: application/x-ndjson.
+    """
+    body = await request.body()
+    try:
+        rows = _decode_batch(body, request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"invalid batch body: {e}")
+    return await ingest_movements(rows)
+
+
+# --- Item master import ---
+
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+@router.post("/items:import")
+async def import_items(request: Request, format: str = Query("csv", pattern="^(csv|parquet)$"),
+                       chunk: int = Query(item_import.IMPORT_CHUNK, ge=100, le=100_000)):
+    """
+    Upsert items keyed on sku from a CSV or Parquet file sent as the raw
+    request body (not multipart). The body is spooled to a temp file past
+    8 MB and imported chunk by chunk in the threadpool; see app/item_import.py.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for part in request.stream():
+            spool.write(part)
+        spool.seek(0)
+        try:
+            result = await run_in_threadpool(item_import.import_items, spool, format, chunk)
+        except item_import.ImportFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return result
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from app import allocation
+from app.db import run_write
+from app.event_writer import emitter
+from app.proposal_cache import proposal_cache
+
+router = APIRouter(tags=["orders"])
+
+# Allocation reads and writes thousands of lines per transaction on the sync
+# engine, so it runs in the threadpool like the simulation does.
+
+def _allocate(batch: int) -> dict:
+    totals = allocation.allocate(batch=batch)
+    items = totals.pop("items")
+    emitter.emit("orders", "ALLOCATION", {**totals, "items": len(items)})
+    return {**totals, "items": len(items)}
+
+@router.post("/sales-orders/allocate")
+async def allocate_sales_orders(batch: int = Query(allocation.ALLOCATION_BATCH, ge=1, le=50_000)):
+    """Reserve available stock for open sales order lines by customer priority, then ship_by."""
+    return await run_in_threadpool(_allocate, batch)
+
+def _ship(conn, so_id: int) -> tuple[dict | None, int | None]:
+    result = allocation.ship_order(conn, so_id)
+    return result, proposal_cache.touch(conn) if result and result["items"] else None
+
+@router.post("/sales-orders/{so_id}/ship")
+async def ship_sales_order(so_id: int):
+    """Ship the allocated quantity of every line; the order closes once it has shipped in full."""
+    try:
+        result, version = await run_write(_ship, so_id)
+    except allocation.AllocationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="unknown sales order")
+    items = result.pop("items")
+    if items:
+        await emitter.aemit("orders", "SHIPMENT", {**result, "items": len(items)})
+        proposal_cache.mark_dirty(items, version)
+    return {**result, "items": len(items)}
@@ -1,38 +1,110 @@
-from fastapi import APIRouter
+import math
+import os
+from dataclasses import fields, replace
+
+from fastapi import APIRouter, Body, HTTPException, Query
 from sqlalchemy import text
-from app.db import engine
+from starlette.concurrency import run_in_threadpool
+from app import analytics, scenarios, simulation, snapshots
+from app.db import engine, run_write
+from app.event_writer import emitter
+from app.proposal_cache import proposal_cache
 
 router = APIRouter(tags=["sim"])
 
+def _current_day(conn) -> int:
+    # ensure a row exists (defensive)
+    conn.execute(text("""
+        INSERT INTO sim_state (id, current_day)
+        VALUES (1, 1)
+        ON CONFLICT(id) DO NOTHING
+    """))
+    return conn.execute(text("SELECT current_day FROM sim_state WHERE id = 1")).scalar_one()
+
 @router.get("/sim/day")
-def sim_day():
-    with engine.connect() as conn:
-        # ensure a row exists (defensive)
-        conn.execute(text("""
-            INSERT INTO sim_state (id, current_day)
-            VALUES (1, 1)
-            ON CONFLICT(id) DO NOTHING
-        """))
-        day = conn.execute(text("SELECT current_day FROM sim_state WHERE id = 1")).scalar_one()
-    return {"day": day}
+async def sim_day():
+    return {"day": await run_write(_current_day)}
+
+# Ticks and runs write through run_write like every other handler; on SQLite
+# that is the sync engine in the threadpool, behind the per-process writer lock.
+
+def _tick(conn, seed: int) -> tuple:
+    summary, touched = simulation.tick(conn, seed=seed)
+    return summary, touched, proposal_cache.touch(conn) if touched else None
+
+def _run(conn, days: int, seed: int, auto_reorder: bool) -> tuple:
+    summary, touched = simulation.fast_forward(conn, days, seed=seed, auto_reorder=auto_reorder)
+    return summary, touched, proposal_cache.touch(conn) if touched else None
+
+def _rollups() -> None:
+    snapshots.rollup()
+    analytics.rollup()
+
+async def _after_commit(event_type: str, summary: dict, touched: list[int], version: int | None) -> dict:
+    await emitter.aemit("sim", event_type, summary)
+    proposal_cache.mark_dirty(touched, version)
+    await run_in_threadpool(_rollups)
+    return summary
 
 @router.post("/sim/tick")
-def sim_tick():
-    with engine.begin() as conn:
-        # Ensure the row exists, then advance the day
-        conn.execute(text("""
-            INSERT INTO sim_state (id, current_day)
-            VALUES (1, 1)
-            ON CONFLICT(id) DO NOTHING
-        """))  # SQLite syntax; harmless if row exists
-
-        conn.execute(text("UPDATE sim_state SET current_day = current_day + 1 WHERE id = 1"))
-        day = conn.execute(text("SELECT current_day FROM sim_state WHERE id = 1")).scalar_one()
-
-        # Log the event (works even if JSON1 isn't present; SQLite will store as text/JSON)
-        conn.execute(text("""
-            INSERT INTO event_log (actor, event_type, payload_json)
-            VALUES ('sim', 'TICK', json('{"note":"advanced one day"}'))
-        """))
-
-    return {"day": day, "new_sos": 1, "pos_received": 0, "pos_late": 1}
+async def sim_tick(seed: int = Query(simulation.DEFAULT_SEED)):
+    return await _after_commit("TICK", *await run_write(_tick, seed))
+
+@router.post("/sim/run")
+async def sim_run(
+    days: int = Query(..., ge=1, le=3650),
+    seed: int = Query(simulation.DEFAULT_SEED),
+    auto_reorder: bool = Query(False),
+):
+    """Fast-forward `days` days in memory and persist the result in one transaction."""
+    return await _after_commit("RUN", *await run_write(_run, days, seed, auto_reorder))
+
+def _load_snapshot() -> scenarios.Snapshot:
+    with engine.connect() as conn:
+        return scenarios.load_snapshot(conn)
+
+_SCENARIO_FLOATS = ("rp_scale", "rq_scale", "ss_scale")
+
+def _scenario_params(payload) -> scenarios.ScenarioParams:
+    """ScenarioParams from a JSON body; 400 on unknown fields or values of the wrong type."""
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="body must be a JSON object")
+    known = [f.name for f in fields(scenarios.ScenarioParams)]
+    unknown = sorted(set(payload) - set(known))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields {unknown}; choose from {', '.join(known)}")
+    for name, value in payload.items():
+        if name in _SCENARIO_FLOATS:
+            ok = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) and value >= 0
+        else:
+            ok = isinstance(value, int) and not isinstance(value, bool) or (name == "workers" and value is None)
+        if not ok:
+            kind = "a non-negative number" if name in _SCENARIO_FLOATS else "an integer"
+            raise HTTPException(status_code=400, detail=f"{name} must be {kind}")
+    return scenarios.ScenarioParams(**payload)
+
+@router.post("/sim/scenarios")
+async def start_scenarios(payload: dict = Body(default={})):
+    """
+    Start a Monte Carlo policy evaluation in the background. Body fields
+    (all optional): seeds, days, first_seed, rp_scale, rq_scale, ss_scale, workers.
+    """
+    params = _scenario_params(payload)
+    if not (1 <= params.seeds <= 100_000) or not (1 <= params.days <= 3650):
+        raise HTTPException(status_code=400, detail="seeds must be 1..100000 and days 1..3650")
+    if params.workers is not None:
+        # each worker is a process running the whole model; more than the CPUs only adds memory
+        params = replace(params, workers=min(max(params.workers, 1), os.cpu_count() or 1))
+    snapshot = await run_in_threadpool(_load_snapshot)
+    job_id = scenarios.scenario_jobs.submit(snapshot, params)
+    return {"job_id": job_id, "status": "QUEUED"}
+
+@router.get("/sim/scenarios/{job_id}")
+async def scenario_status(job_id: str, items: bool = Query(False)):
+    """Job status; the result's per-item rows are included only with ?items=true."""
+    job = scenarios.scenario_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="unknown job")
+    if "result" in job and not items:
+        job["result"] = {k: v for k, v in job["result"].items() if k != "items"}
+    return job
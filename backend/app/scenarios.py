@@ -0,0 +1,256 @@
+# app/scenarios.py
+"""
+Monte Carlo evaluation of reorder policies.
+
+A scenario takes an in-memory snapshot of the item and supplier tables,
+optionally scales the reorder policy (reorder_point, reorder_qty,
+safety_stock), and runs the SimModel with auto-reorder for many random seeds.
+Seeds are fanned out over a process pool; each worker receives the snapshot
+once (pool initializer) and returns per-item sums for its chunk of seeds, so
+the parent only adds arrays together.
+
+Run from the CLI:
+
+    python -m app.scenarios --seeds 1000 --days 365 --workers 8
+
+or through the API (POST /sim/scenarios, then poll GET /sim/scenarios/{job_id}).
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+from sqlalchemy import inspect, text
+
+from app.planning import ItemArrays, load_item_arrays
+from app.simulation import DEFAULT_RELIABILITY, SimModel, daily_demand_mean
+
+
+@dataclass
+class Snapshot:
+    items: ItemArrays
+    reliability: np.ndarray   # per item, from its supplier
+
+
+@dataclass
+class ScenarioParams:
+    seeds: int = 100
+    days: int = 365
+    first_seed: int = 1
+    rp_scale: float = 1.0
+    rq_scale: float = 1.0
+    ss_scale: float = 1.0
+    workers: int | None = None
+
+
+def load_snapshot(conn) -> Snapshot:
+    """
+    Items plus supplier reliability and lead time. Items carry no supplier
+    link yet, so suppliers are assigned round-robin by item id; without any
+    supplier rows the item's own lead time and DEFAULT_RELIABILITY are used.
+    """
+    items = load_item_arrays(conn)
+    reliability = np.full(len(items), DEFAULT_RELIABILITY)
+    suppliers = []
+    if inspect(conn).has_table("supplier"):
+        suppliers = conn.execute(text("""
+            SELECT COALESCE(reliability, :rel), COALESCE(avg_lead_days, 0)
+            FROM supplier
+            ORDER BY id
+        """), {"rel": DEFAULT_RELIABILITY}).all()
+    if suppliers and len(items):
+        rel = np.array([s[0] for s in suppliers], dtype=float)
+        lead = np.array([s[1] for s in suppliers], dtype=np.int64)
+        which = (items.ids - 1) % len(suppliers)
+        reliability = rel[which]
+        lead_days = np.where(lead[which] > 0, lead[which], items.lead_time_days)
+        items = replace(items, lead_time_days=lead_days)
+    return Snapshot(items=items, reliability=reliability)
+
+
+def apply_policy(snapshot: Snapshot, params: ScenarioParams) -> Snapshot:
+    """Scale the reorder policy columns by the scenario's factors."""
+    items = snapshot.items
+
+    def scaled(col, factor):
+        return col if factor == 1.0 else np.rint(col * factor).astype(np.int64)
+
+    return Snapshot(
+        items=replace(
+            items,
+            reorder_point=scaled(items.reorder_point, params.rp_scale),
+            reorder_qty=scaled(items.reorder_qty, params.rq_scale),
+            safety_stock=scaled(items.safety_stock, params.ss_scale),
+        ),
+        reliability=snapshot.reliability,
+    )
+
+
+# --- worker side -----------------------------------------------------------
+
+_worker_snapshot: Snapshot | None = None
+_worker_demand_mean: np.ndarray | None = None
+
+
+def _init_worker(snapshot: Snapshot, demand_mean: np.ndarray) -> None:
+    global _worker_snapshot, _worker_demand_mean
+    _worker_snapshot = snapshot
+    _worker_demand_mean = demand_mean
+
+
+def _run_seeds(seeds: list[int], days: int) -> dict:
+    """Simulate each seed; return per-item sums and per-seed catalog fill rates."""
+    snap = _worker_snapshot
+    n = len(snap.items)
+    sums = {k: np.zeros(n, dtype=np.int64) for k in ("demand", "shipped", "stockout_days", "holding")}
+    fill_rates = []
+    for seed in seeds:
+        model = SimModel(snap.items, seed=seed, reliability=snap.reliability, auto_reorder=True,
+                         demand_mean=_worker_demand_mean)
+        model.run(1, days)
+        demand = model.shipped_total + model.lost_total
+        sums["demand"] += demand
+        sums["shipped"] += model.shipped_total
+        sums["stockout_days"] += model.stockout_days
+        sums["holding"] += model.holding_total
+        total = int(demand.sum())
+        fill_rates.append(float(model.shipped_total.sum() / total) if total else 1.0)
+    return {"sums": sums, "fill_rates": fill_rates}
+
+
+# --- driver ----------------------------------------------------------------
+
+def run_scenarios(snapshot: Snapshot, params: ScenarioParams, progress=None) -> dict:
+    """Run params.seeds simulations over a process pool and aggregate the results."""
+    # demand is a property of the catalog, not of the policy under test
+    demand_mean = daily_demand_mean(snapshot.items)
+    snap = apply_policy(snapshot, params)
+    workers = params.workers or os.cpu_count() or 1
+    seeds = list(range(params.first_seed, params.first_seed + params.seeds))
+    # a few chunks per worker keeps the pool busy without per-seed IPC
+    n_chunks = max(1, min(len(seeds), workers * 4))
+    chunks = [c.tolist() for c in np.array_split(np.array(seeds), n_chunks) if len(c)]
+
+    n = len(snap.items)
+    sums = {k: np.zeros(n, dtype=np.int64) for k in ("demand", "shipped", "stockout_days", "holding")}
+    fill_rates: list[float] = []
+    started = time.perf_counter()
+
+    def absorb(part):
+        for k in sums:
+            sums[k] += part["sums"][k]
+        fill_rates.extend(part["fill_rates"])
+        if progress:
+            progress(len(fill_rates), len(seeds))
+
+    if workers == 1:
+        _init_worker(snap, demand_mean)
+        for chunk in chunks:
+            absorb(_run_seeds(chunk, params.days))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(snap, demand_mean)) as pool:
+            for part in pool.map(_run_seeds, chunks, [params.days] * len(chunks)):
+                absorb(part)
+
+    elapsed = time.perf_counter() - started
+    runs = len(seeds)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        item_fill = np.where(sums["demand"] > 0, sums["shipped"] / sums["demand"], 1.0)
+    total_demand = int(sums["demand"].sum())
+    return {
+        "params": params.__dict__,
+        "runs": runs,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "runs_per_sec": round(runs / elapsed, 2) if elapsed else None,
+        "fill_rate": float(sums["shipped"].sum() / total_demand) if total_demand else 1.0,
+        "fill_rate_p5_p50_p95": [float(x) for x in np.percentile(fill_rates, [5, 50, 95])],
+        "avg_stockout_days_per_item": float(sums["stockout_days"].mean() / runs) if n else 0.0,
+        "avg_units_held_per_day": float(sums["holding"].sum() / (runs * params.days)),
+        "items": [
+            {
+                "item_id": int(snap.items.ids[i]),
+                "fill_rate": round(float(item_fill[i]), 4),
+                "stockout_days": round(float(sums["stockout_days"][i] / runs), 2),
+                "avg_on_hand": round(float(sums["holding"][i] / (runs * params.days)), 2),
+            }
+            for i in range(n)
+        ],
+    }
+
+
+class ScenarioJobs:
+    """In-process registry of scenario runs executing on background threads."""
+
+    def __init__(self, keep: int = 50):
+        self._lock = threading.Lock()
+        self._jobs: dict[str, dict] = {}
+        self._keep = keep
+
+    def submit(self, snapshot: Snapshot, params: ScenarioParams) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            # forget the oldest finished jobs
+            finished = [k for k, j in self._jobs.items() if j["status"] in ("DONE", "FAILED")]
+            for k in finished[: max(0, len(self._jobs) - self._keep + 1)]:
+                del self._jobs[k]
+            self._jobs[job_id] = {"job_id": job_id, "status": "QUEUED", "done": 0, "total": params.seeds}
+        threading.Thread(target=self._run, args=(job_id, snapshot, params), daemon=True).start()
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(self, job_id: str, snapshot: Snapshot, params: ScenarioParams) -> None:
+        self._update(job_id, status="RUNNING")
+        try:
+            result = run_scenarios(snapshot, params, progress=lambda done, total: self._update(job_id, done=done))
+            self._update(job_id, status="DONE", result=result)
+        except Exception as e:  # surfaced to the poller
+            self._update(job_id, status="FAILED", error=str(e))
+
+
+scenario_jobs = ScenarioJobs()
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Monte Carlo reorder-policy evaluation")
+    ap.add_argument("--seeds", type=int, default=100)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--first-seed", type=int, default=1)
+    ap.add_argument("--rp-scale", type=float, default=1.0)
+    ap.add_argument("--rq-scale", type=float, default=1.0)
+    ap.add_argument("--ss-scale", type=float, default=1.0)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--out", help="write the full JSON result (incl. per-item rows) here")
+    args = ap.parse_args(argv)
+
+    from app.db import engine
+
+    params = ScenarioParams(seeds=args.seeds, days=args.days, first_seed=args.first_seed,
+                            rp_scale=args.rp_scale, rq_scale=args.rq_scale, ss_scale=args.ss_scale,
+                            workers=args.workers)
+    with engine.connect() as conn:
+        snapshot = load_snapshot(conn)
+    result = run_scenarios(snapshot, params)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f)
+    summary = {k: v for k, v in result.items() if k != "items"}
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Startup schema check.
+
+The schema belongs to Alembic (backend/migrations). Each worker reads
+alembic_version once on boot and compares it with the script head:
+
+- current: nothing else happens; no DDL, no seeding.
+- behind, DB_AUTO_MIGRATE on (the default): upgrade to head. On Postgres the
+  upgrade runs under an advisory lock, so when many workers start together
+  one migrates and the rest wait and find the schema current.
+- behind, DB_AUTO_MIGRATE=0: refuse to start. Production runs
+  `alembic upgrade head` as a deploy step and boots workers with this off.
+
+Databases made by the old import-time bootstrap (tables, no alembic_version)
+are adopted by the same upgrade: the early migrations skip what exists.
+Demo rows are not created here; see `python -m app.seed`.
+"""
+import logging
+import os
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+
+from app.db import engine
+
+log = logging.getLogger(__name__)
+
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1").lower() not in ("0", "false", "no")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# Head of migrations/versions. Pinned so the boot-time check is one SELECT,
+# without importing Alembic or parsing the scripts directory;
+# tests/test_schema.py fails if a new migration lands without bumping it.
+SCHEMA_HEAD = "f3a9d6c1e058"
+
+# arbitrary constant shared by every worker; pg_advisory_lock takes a bigint
+_MIGRATE_LOCK_KEY = 0x45525053434845  # "ERPSCHE"
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def alembic_config():
+    from alembic.config import Config
+
+    # no ini file: keeps Alembic from reconfiguring the app's logging
+    cfg = Config()
+    cfg.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return cfg
+
+
+def head_revisions(cfg=None) -> set[str]:
+    from alembic.script import ScriptDirectory
+
+    return set(ScriptDirectory.from_config(cfg or alembic_config()).get_heads())
+
+
+def current_revisions(conn) -> set[str]:
+    if not inspect(conn).has_table("alembic_version"):
+        return set()
+    return set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+
+
+def ensure_schema(bind=None, auto_migrate: bool | None = None) -> str:
+    """
+    Make sure the database is at the Alembic head. Returns "current" when
+    nothing had to be done, "upgraded" after running migrations; raises
+    SchemaOutOfDate when behind and auto-migration is off.
+    """
+    bind = bind if bind is not None else engine
+    auto_migrate = DB_AUTO_MIGRATE if auto_migrate is None else auto_migrate
+    heads = {SCHEMA_HEAD}
+
+    with bind.connect() as conn:
+        current = current_revisions(conn)
+    if current == heads:
+        return "current"
+    if not auto_migrate:
+        raise SchemaOutOfDate(
+            f"database is at {sorted(current) or 'no revision'}, code expects {sorted(heads)}; "
+            "run `alembic upgrade head` (or set DB_AUTO_MIGRATE=1)"
+        )
+
+    with bind.connect() as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _MIGRATE_LOCK_KEY})
+            conn.commit()
+        try:
+            # another worker may have migrated while we waited for the lock
+            if current_revisions(conn) != heads:
+                from alembic import command
+
+                log.info("migrating schema %s -> %s", sorted(current) or "base", sorted(heads))
+                cfg = alembic_config()
+                cfg.attributes["connection"] = conn
+                command.upgrade(cfg, "head")
+                conn.commit()
+        finally:
+            if postgres:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _MIGRATE_LOCK_KEY})
+                conn.commit()
+    return "upgraded"
@@ -0,0 +1,62 @@
+"""
+Demo data, run explicitly once the schema is migrated:
+
+    alembic upgrade head
+    python -m app.seed
+
+Idempotent: inserts the three starter items and their bill of materials
+only into an empty item table (on_hand = 0 by design) and the sim_state row
+if missing.
+"""
+from sqlalchemy import text
+
+from app.db import engine, reset_id_sequences
+from app.item_master import bump_version
+from app.mrp import bump_bom_version
+
+DEMO_ITEMS = [
+    # id, sku, name, uom, reorder_point, reorder_qty, safety_stock, lead_time_days
+    (1, "FG-BOLT", "Hex Bolt", "pcs", 60, 80, 20, 7),
+    (2, "FG-NUT", "Hex Nut", "pcs", 50, 80, 10, 7),
+    (3, "RM-STEEL", "Steel Rod", "kg", 200, 200, 50, 10),
+]
+
+DEMO_BOM = [
+    # parent_id, component_id, qty_per (kg of steel rod per piece)
+    (1, 3, 0.05),
+    (2, 3, 0.02),
+]
+
+
+def seed(conn) -> int:
+    """Seed demo rows on `conn`; returns how many items were inserted."""
+    conn.execute(text("""
+        INSERT INTO sim_state (id, current_day)
+        VALUES (1, 1)
+        ON CONFLICT(id) DO NOTHING
+    """))
+    if conn.execute(text("SELECT COUNT(*) FROM item")).scalar_one():
+        return 0
+    conn.execute(text("""
+        INSERT INTO item (id, sku, name, uom, reorder_point, reorder_qty, safety_stock, lead_time_days, on_hand)
+        VALUES (:id, :sku, :name, :uom, :rp, :rq, :ss, :lt, 0)
+    """), [
+        {"id": i, "sku": sku, "name": name, "uom": uom, "rp": rp, "rq": rq, "ss": ss, "lt": lt}
+        for i, sku, name, uom, rp, rq, ss, lt in DEMO_ITEMS
+    ])
+    conn.execute(text("INSERT INTO bom_line (parent_id, component_id, qty_per) VALUES (:p, :c, :q)"),
+                 [{"p": p, "c": c, "q": q} for p, c, q in DEMO_BOM])
+    reset_id_sequences(conn, "item")
+    bump_version(conn)
+    bump_bom_version(conn)
+    return len(DEMO_ITEMS)
+
+
+def main() -> None:
+    with engine.begin() as conn:
+        n = seed(conn)
+    print(f"Seeded {n} items." if n else "Items already present; nothing to seed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# app/snapshots.py
+"""
+Daily stock snapshots.
+
+stock_snapshot keeps, per item and per UTC day that had movements, the
+closing ledger balance (running sum of signed item_movement qty; ADJUST
+counts 0, as everywhere else) plus the day's in/out totals. Rows are
+sparse: the balance on a quiet day is the closest earlier row.
+
+rollup() folds new movements in incrementally. rollup_checkpoint records
+the last item_movement.id already applied, so a historical lookup reads
+one snapshot row plus the movements past the checkpoint (whatever arrived
+since the last rollup) instead of replaying the whole ledger.
+
+Ids are handed out at INSERT but become visible at COMMIT, so on Postgres a
+rollup can read id 7 while id 6 is still in flight. The checkpoint advances
+past it anyway and rollup_gap keeps the skipped ids: every run re-reads
+them and folds what has committed since, and the reads count them as tail,
+until ROLLUP_GAP_GRACE_S has passed and the insert is taken as rolled back.
+SQLite commits in id order and leaves no gaps.
+
+The rollup runs after every /sim/tick and /sim/run, and every
+SNAPSHOT_INTERVAL_S seconds from the app's lifespan task (0 disables it),
+together with the other movement rollups (app/analytics.py).
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import bindparam, text
+from starlette.concurrency import run_in_threadpool
+
+from app.db import ID_CHUNK, engine
+from app.queries import ts_param
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT = "stock_snapshot"
+ROLLUP_CHUNK = 50_000
+SNAPSHOT_INTERVAL_S = float(os.getenv("SNAPSHOT_INTERVAL_S", "300"))
+MAX_RANGE_DAYS = 3660
+ROLLUP_GAP_GRACE_S = float(os.getenv("ROLLUP_GAP_GRACE_S", "600"))
+
+# item_movement m as a signed quantity; ADJUST counts 0
+SIGNED_QTY = "CASE m.move_type WHEN 'IN' THEN m.qty WHEN 'OUT' THEN -m.qty ELSE 0 END"
+
+# FROM clause: the item_movement rows m in the gaps of the rollup named :cp
+GAP_MOVEMENTS = "rollup_gap g JOIN item_movement m ON g.name = :cp AND m.id >= g.lo AND m.id <= g.hi"
+
+# WHERE term for item_movement m joined to the rollup's checkpoint row cp: not folded in yet
+NOT_ROLLED_UP = (
+    "(m.id > cp.last_id OR EXISTS (SELECT 1 FROM rollup_gap g WHERE g.name = :cp AND m.id >= g.lo AND m.id <= g.hi))"
+)
+
+
+def day_of(ts) -> date:
+    """UTC calendar day of an item_movement.ts ('YYYY-MM-DD HH:MM:SS' text or datetime)."""
+    return date.fromisoformat(str(ts)[:10])
+
+
+def day_start(day: date) -> datetime:
+    """UTC midnight opening `day`: bound as a Timestamp, the item_movement.ts cut-off for that day."""
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _day_end(day: date) -> datetime:
+    """Exclusive upper bound on item_movement.ts for movements on or before `day`."""
+    return day_start(day + timedelta(days=1))
+
+
+# --- rollup ----------------------------------------------------------------
+
+def claim_checkpoint(conn, name: str) -> int:
+    """
+    Read a rollup's checkpoint after touching its row. The touch is a write,
+    so it takes SQLite's write lock / the row lock on Postgres first and
+    concurrent rollups (one per worker) queue instead of double counting.
+    """
+    conn.execute(text("""
+        INSERT INTO rollup_checkpoint (name, last_id) VALUES (:n, 0)
+        ON CONFLICT(name) DO UPDATE SET last_id = rollup_checkpoint.last_id
+    """), {"n": name})
+    return conn.execute(text("SELECT last_id FROM rollup_checkpoint WHERE name = :n"), {"n": name}).scalar_one()
+
+
+def missing_ranges(ids, after: int, upto: int | None = None) -> list[tuple[int, int]]:
+    """(lo, hi) runs of ids in (after, upto] absent from the sorted `ids`; `upto` defaults to the last one."""
+    ids = np.asarray(ids, dtype=np.int64)
+    if upto is None:
+        upto = int(ids[-1]) if len(ids) else after
+    if len(ids) == upto - after:
+        return []
+    bounds = np.concatenate(([after], ids, [upto + 1]))
+    step = np.diff(bounds) > 1
+    return list(zip((bounds[:-1][step] + 1).tolist(), (bounds[1:][step] - 1).tolist()))
+
+
+def update_gaps(conn, name: str, found, new: list[tuple[int, int]]) -> None:
+    """
+    Take the ids in `found` (now folded) out of rollup `name`'s gaps, add the
+    `new` (lo, hi) ranges, and drop gaps older than ROLLUP_GAP_GRACE_S.
+    """
+    now = time.time()
+    gaps = conn.execute(text("SELECT lo, hi, seen_at FROM rollup_gap WHERE name = :n ORDER BY lo"), {"n": name}).all()
+    if not gaps and not new:
+        return
+    found = np.sort(np.asarray(list(found), dtype=np.int64))
+    keep, expired = [], []
+    for lo, hi, seen_at in gaps:
+        inside = found[np.searchsorted(found, lo):np.searchsorted(found, hi, side="right")]
+        for run in missing_ranges(inside, lo - 1, hi):
+            (expired if now - seen_at > ROLLUP_GAP_GRACE_S else keep).append((*run, seen_at))
+    keep += [(lo, hi, now) for lo, hi in new]
+    if expired:
+        log.warning("%s rollup: movement ids %s not committed after %ss, taken as rolled back",
+                    name, ", ".join(f"{lo}-{hi}" for lo, hi, _ in expired), ROLLUP_GAP_GRACE_S)
+    conn.execute(text("DELETE FROM rollup_gap WHERE name = :n"), {"n": name})
+    if keep:
+        conn.execute(text("INSERT INTO rollup_gap (name, lo, hi, seen_at) VALUES (:n, :lo, :hi, :t)"),
+                     [{"n": name, "lo": lo, "hi": hi, "t": t} for lo, hi, t in keep])
+
+
+def claim_movements(conn, name: str, limit: int) -> tuple[list, int]:
+    """
+    Claim rollup `name` and read what it has not folded yet: movements that
+    have committed into its gaps, then up to `limit` past the checkpoint.
+    Moves the checkpoint and the gaps on as if those rows were folded, so
+    call it in the transaction that folds them. Returns (rows, checkpoint),
+    rows being (id, item_id, ts, move_type, qty, note) with the late ones first.
+    """
+    after = claim_checkpoint(conn, name)
+    late = conn.execute(text(f"""
+        SELECT m.id, m.item_id, m.ts, m.move_type, m.qty, m.note FROM {GAP_MOVEMENTS} ORDER BY m.id
+    """), {"cp": name}).all()
+    rows = conn.execute(text("""
+        SELECT id, item_id, ts, move_type, qty, note
+        FROM item_movement
+        WHERE id > :after
+        ORDER BY id
+        LIMIT :limit
+    """), {"after": after, "limit": limit}).all()
+    update_gaps(conn, name, [r.id for r in late], missing_ranges([r.id for r in rows], after))
+    if not rows:
+        return late, after
+    conn.execute(text("UPDATE rollup_checkpoint SET last_id = :last WHERE name = :n"), {"last": rows[-1].id, "n": name})
+    return late + rows, rows[-1].id
+
+
+def _latest_snapshot_days(conn, item_ids) -> dict[int, date]:
+    stmt = text("""
+        SELECT item_id, MAX(snap_date) FROM stock_snapshot
+        WHERE item_id IN :ids
+        GROUP BY item_id
+    """).bindparams(bindparam("ids", expanding=True))
+    ids = sorted(item_ids)
+    latest = {}
+    for i in range(0, len(ids), ID_CHUNK):
+        latest.update((item_id, day_of(d)) for item_id, d in conn.execute(stmt, {"ids": ids[i:i + ID_CHUNK]}))
+    return latest
+
+
+_UPSERT = text("""
+    INSERT INTO stock_snapshot (item_id, snap_date, on_hand, qty_in, qty_out, moves)
+    VALUES (:id, :d, :delta + COALESCE((
+        SELECT s.on_hand FROM stock_snapshot s
+        WHERE s.item_id = :id AND s.snap_date < :d
+        ORDER BY s.snap_date DESC LIMIT 1
+    ), 0), :qin, :qout, :n)
+    ON CONFLICT(item_id, snap_date) DO UPDATE SET
+        on_hand = stock_snapshot.on_hand + :delta,
+        qty_in = stock_snapshot.qty_in + :qin,
+        qty_out = stock_snapshot.qty_out + :qout,
+        moves = stock_snapshot.moves + :n
+""")
+
+# a movement dated before an item's latest snapshot moves every later closing balance
+_SHIFT_LATER = text("UPDATE stock_snapshot SET on_hand = on_hand + :delta WHERE item_id = :id AND snap_date > :d")
+
+
+def apply_movements(conn, rows) -> int:
+    """
+    Fold (item_id, ts, move_type, qty) rows into stock_snapshot; returns the
+    number of (item, day) rows written. Days at or after an item's latest
+    snapshot (the normal case) go in one executemany.
+    """
+    groups: dict[tuple[int, date], list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    for item_id, ts, move_type, qty in rows:
+        g = groups[(item_id, day_of(ts))]
+        if move_type == "IN":
+            g[0] += qty
+            g[1] += qty
+        elif move_type == "OUT":
+            g[0] -= qty
+            g[2] += qty
+        g[3] += 1
+    if not groups:
+        return 0
+
+    latest = _latest_snapshot_days(conn, {item_id for item_id, _ in groups})
+    backdated, current = [], []
+    for (item_id, day), (delta, qin, qout, n) in sorted(groups.items()):
+        params = {"id": item_id, "d": day, "delta": delta, "qin": qin, "qout": qout, "n": n}
+        (backdated if item_id in latest and day < latest[item_id] else current).append(params)
+
+    for params in backdated:
+        if params["delta"]:
+            conn.execute(_SHIFT_LATER, params)
+        conn.execute(_UPSERT, params)
+    if current:
+        conn.execute(_UPSERT, current)
+    return len(groups)
+
+
+def rollup_chunk(conn, limit: int = ROLLUP_CHUNK) -> tuple[int, int]:
+    """Apply up to `limit` movements past the checkpoint, and any late ones; returns (applied, new checkpoint)."""
+    rows, last_id = claim_movements(conn, CHECKPOINT, limit)
+    apply_movements(conn, [(r.item_id, r.ts, r.move_type, r.qty) for r in rows])
+    return len(rows), last_id
+
+
+def run_chunks(step, bind=None, chunk: int = ROLLUP_CHUNK) -> dict:
+    """Call step(conn, chunk) -> (applied, last_id), one transaction each, until caught up."""
+    bind = bind if bind is not None else engine
+    total = 0
+    while True:
+        with bind.begin() as conn:
+            applied, last_id = step(conn, chunk)
+        total += applied
+        if applied < chunk:
+            return {"movements": total, "last_id": last_id}
+
+
+def rollup(bind=None, chunk: int = ROLLUP_CHUNK) -> dict:
+    """Catch stock_snapshot up with item_movement."""
+    return run_chunks(rollup_chunk, bind, chunk)
+
+
+async def run_periodically(jobs: dict, interval: float = SNAPSHOT_INTERVAL_S) -> None:
+    """Lifespan task: run each rollup in `jobs` ({name: fn}) every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        for name, job in jobs.items():
+            try:
+                result = await run_in_threadpool(job)
+                if result["movements"]:
+                    log.info("%s rollup: %s", name, result)
+            except Exception:
+                log.exception("%s rollup failed", name)
+
+
+# --- reads -----------------------------------------------------------------
+
+# One statement, so the checkpoint, the snapshot row and the tail come from the
+# same read snapshot even while a rollup commits concurrently.
+_BALANCE_AT = text(f"""
+    WITH cp AS (
+        SELECT COALESCE(MAX(last_id), 0) AS last_id FROM rollup_checkpoint WHERE name = :cp
+    ), snap AS (
+        SELECT snap_date, on_hand FROM stock_snapshot
+        WHERE item_id = :id AND snap_date <= :d
+        ORDER BY snap_date DESC LIMIT 1
+    )
+    SELECT (SELECT snap_date FROM snap) AS snap_date,
+           COALESCE((SELECT on_hand FROM snap), 0) AS base,
+           COALESCE(SUM({SIGNED_QTY}), 0) AS tail,
+           COUNT(m.id) AS tail_n
+    FROM cp
+    LEFT JOIN item_movement m
+      ON m.item_id = :id AND m.ts < :until AND {NOT_ROLLED_UP}
+""").bindparams(ts_param("until"))
+
+
+def balance_at(conn, item_id: int, day: date) -> dict:
+    """Ledger balance of one item at the end of `day`."""
+    r = conn.execute(_BALANCE_AT, {"cp": CHECKPOINT, "id": item_id, "d": day, "until": _day_end(day)}).one()
+    return {
+        "item_id": item_id,
+        "at": day.isoformat(),
+        "on_hand": r.base + r.tail,
+        "snapshot_date": str(r.snap_date) if r.snap_date is not None else None,
+        "tail_movements": r.tail_n,
+    }
+
+
+_BALANCE_RANGE = text(f"""
+    WITH cp AS (
+        SELECT COALESCE(MAX(last_id), 0) AS last_id FROM rollup_checkpoint WHERE name = :cp
+    )
+    SELECT 'open' AS kind, o.snap_date AS day, o.on_hand AS qty, 0 AS qty_in, 0 AS qty_out
+    FROM (
+        SELECT snap_date, on_hand FROM stock_snapshot
+        WHERE item_id = :id AND snap_date < :start
+        ORDER BY snap_date DESC LIMIT 1
+    ) o
+    UNION ALL
+    SELECT 'snap', snap_date, on_hand, qty_in, qty_out
+    FROM stock_snapshot
+    WHERE item_id = :id AND snap_date >= :start AND snap_date <= :end
+    UNION ALL
+    SELECT 'tail', m.ts, {SIGNED_QTY},
+           CASE m.move_type WHEN 'IN' THEN m.qty ELSE 0 END,
+           CASE m.move_type WHEN 'OUT' THEN m.qty ELSE 0 END
+    FROM item_movement m, cp
+    WHERE m.item_id = :id AND m.ts < :until AND {NOT_ROLLED_UP}
+""").bindparams(ts_param("until"))
+
+
+def balance_range(conn, item_id: int, start: date, end: date) -> list[dict]:
+    """Daily closing balance and in/out totals for every day in [start, end]."""
+    params = {"cp": CHECKPOINT, "id": item_id, "start": start, "end": end, "until": _day_end(end)}
+    opening = 0
+    snaps: dict[date, tuple[int, int, int]] = {}
+    tail: dict[date, list[int]] = defaultdict(lambda: [0, 0, 0])
+    for kind, day, qty, qty_in, qty_out in conn.execute(_BALANCE_RANGE, params):
+        if kind == "open":
+            opening = qty
+        elif kind == "snap":
+            snaps[day_of(day)] = (qty, qty_in, qty_out)
+        else:
+            t = tail[max(day_of(day), start - timedelta(days=1))]
+            t[0] += qty
+            t[1] += qty_in
+            t[2] += qty_out
+
+    # movements not rolled up yet dated before the range shift the opening balance
+    tail_total = tail.pop(start - timedelta(days=1), [0])[0]
+    ledger = opening
+    out = []
+    for i in range((end - start).days + 1):
+        day = start + timedelta(days=i)
+        qty_in = qty_out = 0
+        if day in snaps:
+            ledger, qty_in, qty_out = snaps[day]
+        if day in tail:
+            delta, t_in, t_out = tail[day]
+            tail_total += delta
+            qty_in += t_in
+            qty_out += t_out
+        out.append({"date": day.isoformat(), "on_hand": ledger + tail_total, "qty_in": qty_in, "qty_out": qty_out})
+    return out
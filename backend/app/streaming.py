@@ -0,0 +1,72 @@
+# app/streaming.py
+"""
+Generator-backed exports: page through a table with keyset pagination and
+stream each page out as NDJSON or CSV, so memory stays flat and the first
+page is on the wire before the last one has been read.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterable, AsyncIterator
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.sql.expression import Executable
+
+from app.db import async_engine
+
+PAGE_SIZE = 2000
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def keyset_pages(sql: str | Executable, params: dict, page_size: int = PAGE_SIZE,
+                       key: str = "id") -> AsyncIterator[list[dict]]:
+    """
+    Yield pages of rows for `sql` (text or a Core statement), which must
+    filter on `{key} > :after`, ORDER BY `key` and LIMIT :limit. Each page
+    uses a short-lived connection, so a slow client never pins a transaction
+    open.
+    """
+    stmt = text(sql) if isinstance(sql, str) else sql
+    after = params.pop("after", 0)
+    while True:
+        async with async_engine.connect() as conn:
+            rows = (await conn.execute(stmt, {**params, "after": after, "limit": page_size})).mappings().all()
+        if not rows:
+            return
+        yield [dict(r) for r in rows]
+        if len(rows) < page_size:
+            return
+        after = rows[-1][key]
+
+
+async def ndjson_chunks(pages: AsyncIterable[list[dict]]) -> AsyncIterator[str]:
+    async for page in pages:
+        yield "".join(json.dumps(r, default=str) + "\n" for r in page)
+
+
+async def csv_chunks(pages: AsyncIterable[list[dict]], columns: list[str]) -> AsyncIterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    async for page in pages:
+        writer.writerows(page)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def export_response(pages: AsyncIterable[list[dict]], fmt: str, columns: list[str], filename: str) -> StreamingResponse:
+    """Wrap a page iterator in a StreamingResponse of the requested format."""
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    chunks = ndjson_chunks(pages) if fmt == "ndjson" else csv_chunks(pages, columns)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
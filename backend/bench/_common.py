@@ -0,0 +1,77 @@
+"""Shared helpers for the benchmark scripts in this folder.
+
+Benchmarks run the FastAPI app in-process against a throwaway SQLite file, so
+they never touch dev.db. Run them from backend/, e.g.
+
+    python -m bench.bench_movements
+
+BENCH_DATABASE_URL runs them against another database instead (it is wiped
+first, so its name must contain "bench" or "test"), e.g. the docker compose
+db-test Postgres for a SQLite vs Postgres comparison.
+"""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def use_temp_database(name: str = "bench.db") -> str:
+    """
+    Point DATABASE_URL at a fresh temp file (or an emptied BENCH_DATABASE_URL),
+    migrate it to head and load the demo items. Call before importing app.*
+    anywhere else.
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="erp-bench-"), name)
+    os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{path}"
+    from sqlalchemy import text
+    from app.db import engine
+    from app.schema import ensure_schema
+    from app.seed import seed
+
+    if engine.dialect.name == "postgresql":
+        if not any(tag in (engine.url.database or "") for tag in ("bench", "test")):
+            raise SystemExit(f"BENCH_DATABASE_URL points at database {engine.url.database!r}; it is wiped first, "
+                             "so use one whose name contains 'bench' or 'test'")
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE"))
+            conn.execute(text("CREATE SCHEMA public"))
+    ensure_schema(auto_migrate=True)
+    with engine.begin() as conn:
+        seed(conn)
+    return path
+
+
+@contextmanager
+def timer():
+    """Yields a dict whose "s" key holds the elapsed seconds once the block exits."""
+    out = {}
+    start = time.perf_counter()
+    try:
+        yield out
+    finally:
+        out["s"] = time.perf_counter() - start
+
+
+def percentiles(samples: list[float], ps=(50, 90, 99)) -> dict:
+    """Latency percentiles (same unit as `samples`)."""
+    if not samples:
+        return {f"p{p}": 0.0 for p in ps}
+    qs = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {f"p{p}": qs[p - 1] for p in ps}
+
+
+def report(title: str, rows: list[dict]) -> None:
+    """Print a small aligned table."""
+    print(f"\n== {title}")
+    if not rows:
+        return
+    cols = list(rows[0])
+    widths = {c: max(len(c), *(len(_fmt(r[c])) for r in rows)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in rows:
+        print("  ".join(_fmt(r[c]).ljust(widths[c]) for c in cols))
+
+
+def _fmt(v) -> str:
+    return f"{v:,.2f}" if isinstance(v, float) else str(v)
@@ -0,0 +1,78 @@
+"""Sales order allocation throughput, single allocator vs several in parallel.
+
+Loads `--lines` open lines over `--items` items (stock for about half of the
+demand), then times allocate() at a few batch sizes and with `--threads`
+allocators racing over the same backlog.
+
+    python -m bench.bench_allocation [--items 500] [--lines 50000] [--threads 4]
+"""
+import argparse
+import random
+import threading
+from datetime import date, timedelta
+
+from bench._common import report, timer, use_temp_database
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=500)
+    ap.add_argument("--lines", type=int, default=50_000)
+    ap.add_argument("--threads", type=int, default=4)
+    args = ap.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import text
+    from app import allocation
+    from app.db import engine
+
+    rng = random.Random(7)
+    n_orders = args.lines // 5
+    lines = [{"so": rng.randint(1, n_orders), "item": rng.randint(1, args.items), "q": rng.randint(1, 10)}
+             for _ in range(args.lines)]
+    demand = [0] * (args.items + 1)
+    for line in lines:
+        demand[line["item"]] += line["q"]
+
+    def reset() -> None:
+        with engine.begin() as conn:
+            for table in ("sales_order_line", "sales_order", "customer", "item"):
+                conn.execute(text(f"DELETE FROM {table}"))
+            conn.execute(text("INSERT INTO item (id, sku, name, on_hand) VALUES (:id, :sku, :sku, :oh)"),
+                         [{"id": i, "sku": f"A-{i}", "oh": demand[i] // 2} for i in range(1, args.items + 1)])
+            conn.execute(text("INSERT INTO customer (id, name, priority) VALUES (1, 'A', 1), (2, 'B', 2), (3, 'C', 3)"))
+            conn.execute(text("""
+                INSERT INTO sales_order (id, customer_id, order_date, ship_by, status)
+                VALUES (:id, :c, :d, :s, 'Open')
+            """), [{"id": so, "c": rng.randint(1, 3), "d": date(2026, 1, 1),
+                    "s": date(2026, 1, 1) + timedelta(days=rng.randint(0, 60))} for so in range(1, n_orders + 1)])
+            conn.execute(text("INSERT INTO sales_order_line (so_id, item_id, qty, allocated_qty) VALUES (:so, :item, :q, 0)"), lines)
+
+    rows = []
+    for batch in (500, 5_000, 50_000):
+        reset()
+        with timer() as t:
+            totals = allocation.allocate(batch=batch)
+        rows.append({"allocators": 1, "batch": batch, "allocated lines": totals["allocated_lines"],
+                     "seconds": t["s"], "lines/s": args.lines / t["s"]})
+
+    reset()
+    allocated = []
+    threads = [threading.Thread(target=lambda: allocated.append(allocation.allocate()["allocated_lines"]))
+               for _ in range(args.threads)]
+    with timer() as t:
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+    rows.append({"allocators": args.threads, "batch": allocation.ALLOCATION_BATCH, "allocated lines": sum(allocated),
+                 "seconds": t["s"], "lines/s": args.lines / t["s"]})
+    report(f"allocation of {args.lines} lines over {args.items} items", rows)
+
+    with engine.connect() as conn:
+        bad = conn.execute(text("SELECT COUNT(*) FROM item WHERE allocated > on_hand OR allocated < 0")).scalar_one()
+    print(f"items with allocated outside [0, on_hand]: {bad}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Movement dashboards: raw item_movement scans vs the movement_rollup table.
+
+    python -m bench.bench_analytics [--items 2000] [--days 365] [--per-day 1]
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from bench._common import report, timer, use_temp_database
+
+DAY0 = date(2025, 1, 1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=2_000)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--per-day", type=int, default=1)
+    args = ap.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import text
+    from app import analytics
+    from app.db import engine
+
+    rng = random.Random(5)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM item"))
+        conn.execute(text("INSERT INTO item (id, sku, name) VALUES (:id, :sku, :sku)"),
+                     [{"id": i, "sku": f"A-{i}"} for i in range(1, args.items + 1)])
+        for d in range(args.days):
+            day = DAY0 + timedelta(days=d)
+            conn.execute(text("INSERT INTO item_movement (item_id, move_type, qty, ts) VALUES (:id, :t, :q, :ts)"), [
+                {"id": i, "t": rng.choice(("IN", "OUT", "OUT", "ADJUST")), "q": rng.randint(1, 20),
+                 "ts": f"{day} {rng.randint(0, 23):02d}:00:00"}
+                for i in range(1, args.items + 1) for _ in range(args.per_day)
+            ])
+    total = args.items * args.days * args.per_day
+    start, end = DAY0, DAY0 + timedelta(days=args.days - 1)
+
+    rows = []
+    with timer() as t:
+        analytics.rollup()
+    rows.append({"query": "initial rollup (all grains)", "rows out": None, "seconds": t["s"]})
+
+    with engine.connect() as conn:
+        with timer() as t:
+            n = len(conn.execute(text("SELECT item_id, ts, move_type, qty FROM item_movement WHERE ts >= :s"),
+                                 {"s": f"{start} 00:00:00"}).all())
+        rows.append({"query": "raw rows to client (all items)", "rows out": n, "seconds": t["s"]})
+        with timer() as t:
+            n = len(conn.execute(text("""
+                SELECT item_id, strftime('%Y-%m', ts) AS month, move_type, SUM(qty)
+                FROM item_movement WHERE ts >= :s
+                GROUP BY item_id, month, move_type
+            """), {"s": f"{start} 00:00:00"}).all())
+        rows.append({"query": "GROUP BY month over raw rows", "rows out": n, "seconds": t["s"]})
+        for grain in ("month", "week"):
+            with timer() as t:
+                n = len(analytics.movement_summary(conn, grain, start, end))
+            rows.append({"query": f"movement_rollup, {grain} (all items)", "rows out": n, "seconds": t["s"]})
+        ids = list(range(1, 51))
+        with timer() as t:
+            n = len(analytics.movement_summary(conn, "day", start, end, ids))
+        rows.append({"query": "movement_rollup, day (50 items)", "rows out": n, "seconds": t["s"]})
+
+        recent = text("""
+            SELECT ts, move_type, qty FROM item_movement
+            WHERE item_id = :id AND ts >= :s ORDER BY ts DESC
+        """)
+        for label in ("with ix_item_movement_item_id_ts", "without index"):
+            if label == "without index":
+                conn.execute(text("DROP INDEX ix_item_movement_item_id_ts"))
+            with timer() as t:
+                for i in range(1, 201):
+                    conn.execute(recent, {"id": i, "s": f"{end - timedelta(days=60)} 00:00:00"}).all()
+            rows.append({"query": f"200 x one item, last 60 days ({label})", "rows out": None, "seconds": t["s"]})
+        conn.rollback()
+
+    report(f"movement analytics ({total:,} movements, {args.items} items)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Historical on_hand lookups: full ledger replay vs stock_snapshot + tail.
+
+Builds `--days` of movement history for `--items` items, rolls it up, then
+answers random "on hand at day X" questions both ways.
+
+    python -m bench.bench_balance [--items 100] [--days 1095] [--per-day 3]
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from bench._common import percentiles, report, timer, use_temp_database
+
+DAY0 = date(2023, 1, 1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100)
+    ap.add_argument("--days", type=int, default=1095)
+    ap.add_argument("--per-day", type=int, default=3, help="movements per item per day")
+    ap.add_argument("--lookups", type=int, default=300)
+    args = ap.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import text
+    from app import snapshots
+    from app.db import engine
+
+    rng = random.Random(11)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM item"))
+        conn.execute(text("INSERT INTO item (id, sku, name) VALUES (:id, :sku, :sku)"),
+                     [{"id": i, "sku": f"B-{i}"} for i in range(1, args.items + 1)])
+        for d in range(args.days):
+            day = DAY0 + timedelta(days=d)
+            conn.execute(text("INSERT INTO item_movement (item_id, move_type, qty, ts) VALUES (:id, :t, :q, :ts)"), [
+                {"id": i, "t": rng.choice(("IN", "OUT")), "q": rng.randint(1, 20), "ts": f"{day} 12:00:00"}
+                for i in range(1, args.items + 1) for _ in range(args.per_day)
+            ])
+    total = args.items * args.days * args.per_day
+
+    with timer() as t:
+        snapshots.rollup()
+    rows = [{"step": "initial rollup", "movements": total, "seconds": t["s"], "p50 ms": None, "p99 ms": None}]
+
+    replay = text("""
+        SELECT COALESCE(SUM(CASE move_type WHEN 'IN' THEN qty WHEN 'OUT' THEN -qty ELSE 0 END), 0)
+        FROM item_movement WHERE item_id = :id AND ts < :until
+    """)
+    questions = [(rng.randint(1, args.items), DAY0 + timedelta(days=rng.randrange(args.days)))
+                 for _ in range(args.lookups)]
+    with engine.connect() as conn:
+        for name, ask in (
+            ("full replay", lambda i, d: conn.execute(replay, {"id": i, "until": f"{d + timedelta(days=1)} 00:00:00"}).scalar_one()),
+            ("snapshot + tail", lambda i, d: snapshots.balance_at(conn, i, d)["on_hand"]),
+        ):
+            samples, answers = [], []
+            for i, d in questions:
+                with timer() as t:
+                    answers.append(ask(i, d))
+                samples.append(t["s"] * 1e3)
+            pct = percentiles(samples, (50, 99))
+            rows.append({"step": name, "movements": total, "seconds": sum(samples) / 1e3,
+                         "p50 ms": pct["p50"], "p99 ms": pct["p99"]})
+            if name == "full replay":
+                expected = answers
+        assert answers == expected
+
+    report(f"balance lookups ({args.lookups} random item/day pairs)", rows)
+
+
+if __name__ == "__main__":
+    main()
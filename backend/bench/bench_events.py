@@ -0,0 +1,80 @@
+"""Event writes: inline in the caller's transaction vs. the write-behind emitter.
+
+Simulates a burst of planner approvals from several threads: each one
+inserts a purchase order and records a PO_CREATED event, either
+
+- inline: record_event() in the same transaction (json.dumps + SQLite json()),
+- write-behind: commit the PO alone, then emitter.emit() (orjson, group commit).
+
+Reports approvals/s and per-approval latency as the caller sees it; for the
+emitter the total includes the final flush, so every event is on disk.
+
+    python -m bench.bench_events [--approvals 5000] [--threads 1 8]
+"""
+import argparse
+import threading
+
+from bench._common import percentiles, report, timer, use_temp_database
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--approvals", type=int, default=5_000)
+    ap.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    args = ap.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import text
+    from app.db import engine
+    from app.event_writer import EventEmitter
+    from app.events import record_event
+
+    insert_po = text("""
+        INSERT INTO purchase_order (item_id, qty, status, due_day, note)
+        VALUES (:item_id, :qty, 'OPEN', 10, 'bench') RETURNING id
+    """)
+
+    def inline(i: int, _em) -> None:
+        with engine.begin() as conn:
+            po_id = conn.execute(insert_po, {"item_id": 1 + i % 3, "qty": 10}).scalar_one()
+            record_event(conn, "planner", "PO_CREATED", {"po_id": po_id, "item_id": 1 + i % 3, "qty": 10, "sku": "FG-BOLT"})
+
+    def write_behind(i: int, em) -> None:
+        with engine.begin() as conn:
+            po_id = conn.execute(insert_po, {"item_id": 1 + i % 3, "qty": 10}).scalar_one()
+        em.emit("planner", "PO_CREATED", {"po_id": po_id, "item_id": 1 + i % 3, "qty": 10, "sku": "FG-BOLT"})
+
+    rows = []
+    for threads in args.threads:
+        for name, fn in (("inline", inline), ("write-behind", write_behind)):
+            em = EventEmitter(bind=engine)
+            latencies: list[float] = []
+            lock = threading.Lock()
+
+            def worker(start: int) -> None:
+                mine = []
+                for i in range(start, args.approvals, threads):
+                    with timer() as t:
+                        fn(i, em)
+                    mine.append(t["s"] * 1000)
+                with lock:
+                    latencies.extend(mine)
+
+            with timer() as total:
+                pool = [threading.Thread(target=worker, args=(k,)) for k in range(threads)]
+                for th in pool:
+                    th.start()
+                for th in pool:
+                    th.join()
+                em.flush()
+            stats = em.stats()
+            em.close()
+            rows.append({"threads": threads, "mode": name, "approvals/s": args.approvals / total["s"],
+                         **{k + " ms": v for k, v in percentiles(latencies).items()},
+                         "event commits": stats["batches"] if name == "write-behind" else args.approvals})
+
+    report(f"{args.approvals:,} approvals", rows)
+
+
+if __name__ == "__main__":
+    main()
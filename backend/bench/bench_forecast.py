@@ -0,0 +1,119 @@
+"""Demand forecasting: per-item Python loop vs the vectorized fold in app.forecast.
+
+In memory, `--items` items x `--weeks` weekly buckets of demand (a mix of
+steady and intermittent items): the per-item loop (SES + Croston, one item
+and one bucket at a time) is timed on `--sample` items and scaled up; the
+fold runs every item at once, bucket by bucket, then recommend().
+
+Then end to end against a temp database: `--db-items` items of weekly
+movement_rollup rows, a full refresh (read, fold, rewrite demand_forecast)
+and an incremental one that folds the next week only.
+
+    python -m bench.bench_forecast [--items 200000] [--weeks 52] [--db-items 50000]
+"""
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+
+from bench._common import report, timer, use_temp_database
+
+
+def synthetic_demand(n: int, weeks: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rate = rng.gamma(2.0, 20.0, n)
+    # a third of the items sell in only some weeks
+    p = np.where(rng.random(n) < 1 / 3, rng.uniform(0.1, 0.6, n), 1.0)
+    return np.where(rng.random((n, weeks)) < p[:, None], rng.poisson(rate[:, None], (n, weeks)), 0).astype(np.float64)
+
+
+def per_item_loop(series: np.ndarray, alpha: float) -> list[float]:
+    out = []
+    for row in series.tolist():
+        buckets = nonzero = since = 0
+        level = mad = size = interval = croston_mad = 0.0
+        for y in row:
+            if not buckets and not y:
+                continue
+            if buckets:
+                err, c_err = abs(y - level), abs(y - (1 - alpha / 2) * size / interval)
+                mad = err if buckets == 1 else mad + alpha * (err - mad)
+                croston_mad = c_err if buckets == 1 else croston_mad + alpha * (c_err - croston_mad)
+                level += alpha * (y - level)
+            else:
+                level = y
+            if y:
+                if nonzero:
+                    size += alpha * (y - size)
+                    interval += alpha * (since + 1 - interval)
+                else:
+                    size, interval = y, 1.0
+                since = 0
+                nonzero += 1
+            else:
+                since += 1
+            buckets += 1
+        croston = nonzero and buckets > 1.32 * nonzero
+        out.append((1 - alpha / 2) * size / interval if croston else level)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=200_000)
+    ap.add_argument("--weeks", type=int, default=52)
+    ap.add_argument("--sample", type=int, default=20_000, help="items the per-item loop is timed on")
+    ap.add_argument("--db-items", type=int, default=50_000)
+    args = ap.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import text
+    from app import forecast
+    from app.db import engine
+
+    demand = synthetic_demand(args.items, args.weeks)
+    lead = np.random.default_rng(1).integers(1, 30, args.items)
+    rows = []
+    with timer() as t:
+        per_item_loop(demand[:args.sample], forecast.FORECAST_ALPHA)
+    rows.append({"run": f"per-item loop (scaled from {args.sample:,})", "items": args.items,
+                 "seconds": t["s"] * args.items / args.sample})
+    by_week = np.ascontiguousarray(demand.T)    # one contiguous row per bucket, as refresh() folds them
+    with timer() as t:
+        state = forecast.ForecastState.empty(np.arange(1, args.items + 1))
+        for week in by_week:
+            forecast.fold(state, week)
+        forecast.recommend(state, lead, 7)
+    rows.append({"run": "vectorized fold + recommend", "items": args.items, "seconds": t["s"]})
+
+    # end to end: weekly movement_rollup rows for the last `weeks` complete weeks
+    n = min(args.db_items, args.items)
+    today = date.today()
+    first = forecast.last_complete_bucket(today, "week") - timedelta(weeks=args.weeks - 1)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO item (id, sku, name, on_hand, reorder_point, reorder_qty, safety_stock, lead_time_days)
+            VALUES (:id, :sku, :sku, 0, 10, 10, 0, :lt)
+        """), [{"id": 1000 + i, "sku": f"FC-{i}", "lt": int(lead[i])} for i in range(n)])
+        ids, weeks = np.nonzero(demand[:n])
+        conn.execute(text("""
+            INSERT INTO movement_rollup (grain, item_id, bucket, qty_in, qty_out, qty_adjust, moves)
+            VALUES ('week', :id, :b, 0, :q, 0, 1)
+        """), [{"id": 1000 + i, "b": first + timedelta(weeks=w), "q": int(demand[i, w])}
+               for i, w in zip(ids.tolist(), weeks.tolist())])
+    full = forecast.refresh(full=True, today=today)
+    rows.append({"run": f"refresh --full ({full['buckets']} weeks)", "items": full["items"], "seconds": full["seconds"]})
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO movement_rollup (grain, item_id, bucket, qty_in, qty_out, qty_adjust, moves)
+            VALUES ('week', :id, :b, 0, 5, 0, 1)
+        """), [{"id": 1000 + i, "b": first + timedelta(weeks=args.weeks)} for i in range(0, n, 2)])
+    step = forecast.refresh(today=today + timedelta(weeks=1))
+    rows.append({"run": f"refresh, incremental ({step['buckets']} week)", "items": step["items"],
+                 "seconds": step["seconds"]})
+
+    report(f"{args.items:,} items x {args.weeks} weeks in memory; {n:,} items in the database", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Item master import throughput: CSV and Parquet, fresh inserts vs. updates.
+
+Each size is imported twice into the same database, so the second pass
+takes the ON CONFLICT ... DO UPDATE path for every row. For scale, the
+row-at-a-time alternative (SELECT by sku, then INSERT or UPDATE) is timed
+on the smallest size.
+
+    python -m bench.bench_import [--sizes 10000 200000] [--chunk 10000]
+"""
+import argparse
+import csv
+import io
+
+from bench._common import report, timer, use_temp_database
+
+
+def _csv(n: int, rename: str) -> bytes:
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(["sku", "name", "uom", "reorder_point", "reorder_qty"])
+    for i in range(n):
+        w.writerow([f"IMP-{i:07d}", f"{rename} item {i}", "pcs", i % 50, 100])
+    return buf.getvalue().encode()
+
+
+def _parquet(data: bytes) -> bytes | None:
+    try:
+        import pyarrow.csv as pacsv
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    out = io.BytesIO()
+    pq.write_table(pacsv.read_csv(io.BytesIO(data)), out)
+    return out.getvalue()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 200_000])
+    ap.add_argument("--chunk", type=int, default=10_000)
+    args = ap.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import text
+    from app.db import engine
+    from app.item_import import import_items
+
+    def row_at_a_time(data: bytes) -> None:
+        with engine.begin() as conn:
+            for row in csv.DictReader(io.StringIO(data.decode())):
+                found = conn.execute(text("SELECT id FROM item WHERE sku = :sku"), row).scalar()
+                if found is None:
+                    conn.execute(text("""
+                        INSERT INTO item (sku, name, uom, reorder_point, reorder_qty)
+                        VALUES (:sku, :name, :uom, :reorder_point, :reorder_qty)
+                    """), row)
+                else:
+                    conn.execute(text("""
+                        UPDATE item SET name = :name, uom = :uom, reorder_point = :reorder_point,
+                                        reorder_qty = :reorder_qty
+                        WHERE id = :id
+                    """), {**row, "id": found})
+
+    rows = []
+    for n in args.sizes:
+        for fmt in ("csv", "parquet"):
+            for rename in ("insert", "update"):
+                data = _csv(n, rename)
+                if fmt == "parquet":
+                    data = _parquet(data)
+                    if data is None:
+                        continue
+                with timer() as t:
+                    result = import_items(io.BytesIO(data), fmt, args.chunk)
+                rows.append({"rows": n, "format": fmt, "pass": rename, "rejected": result["rejected"],
+                             "s": t["s"], "rows/s": n / t["s"]})
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM item WHERE sku LIKE 'IMP-%'"))
+
+    n = min(args.sizes)
+    for rename in ("insert", "update"):
+        with timer() as t:
+            row_at_a_time(_csv(n, rename))
+        rows.append({"rows": n, "format": "csv", "pass": f"{rename} (row at a time)", "rejected": 0,
+                     "s": t["s"], "rows/s": n / t["s"]})
+
+    report("item import", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""GET /items at catalog scale: payload size and latency per page shape.
+
+For each catalog size, times the first page with the default fields, a
+sparse page, and a full keyset walk, plus the pre-pagination behaviour
+(every row as a dict through FastAPI's default JSON encoding) for scale.
+
+    python -m bench.bench_items [--sizes 10000 200000] [--repeat 5]
+"""
+import argparse
+import json
+import statistics
+
+from bench._common import report, timer, use_temp_database
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 200_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    use_temp_database()
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+    from app.db import engine
+    from app.item_master import bump_version
+    from app.main import app
+
+    def legacy() -> int:
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, sku, name, on_hand, reorder_point FROM item ORDER BY id")).mappings().all()
+        return len(json.dumps(jsonable_encoder([dict(r) for r in rows])).encode())
+
+    rows = []
+    with TestClient(app) as client:
+        for n in args.sizes:
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM item"))
+                conn.execute(text("""
+                    INSERT INTO item (id, sku, name, uom, on_hand, reorder_point, reorder_qty)
+                    VALUES (:id, :sku, :name, 'pcs', :oh, 50, 100)
+                """), [{"id": i, "sku": f"SKU-{i:07d}", "name": f"Item number {i}", "oh": i % 97}
+                       for i in range(1, n + 1)])
+                bump_version(conn)
+
+            def walk(**params) -> int:
+                size, after = 0, 0
+                while True:
+                    r = client.get("/items", params={**params, "after_id": after})
+                    size += len(r.content)
+                    if "x-next-after-id" not in r.headers:
+                        return size
+                    after = int(r.headers["x-next-after-id"])
+
+            cases = {
+                "legacy: all rows, default encoder": legacy,
+                "page (500, default fields)": lambda: len(client.get("/items").content),
+                "page (500, fields=id,on_hand)": lambda: len(client.get("/items", params={"fields": "id,on_hand"}).content),
+                "page (5000, default fields)": lambda: len(client.get("/items", params={"limit": 5000}).content),
+                "full walk (5000/page)": lambda: walk(limit=5000),
+                "full walk (5000/page, id,on_hand)": lambda: walk(limit=5000, fields="id,on_hand"),
+            }
+            walk(limit=5000)  # warm the master cache
+            for name, fn in cases.items():
+                samples = []
+                for _ in range(args.repeat):
+                    with timer() as t:
+                        size = fn()
+                    samples.append(t["s"] * 1000)
+                rows.append({"items": n, "case": name, "KiB": size / 1024, "median ms": statistics.median(samples)})
+
+    report("GET /items", rows)
+
+
+if __name__ == "__main__":
+    main()
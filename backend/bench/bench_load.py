@@ -0,0 +1,187 @@
+"""HTTP load test: req/s and latency percentiles against a single uvicorn worker.
+
+Starts uvicorn (one worker) on a temp SQLite file, seeds a few hundred items,
+then hammers a mix of read and write endpoints with N concurrent clients.
+
+Client-side latency includes the client's own scheduling, which dominates
+when client and server share a CPU or two. The server runs with
+METRICS_ENABLED=1, so the run also reports server-side latency per route,
+from the /metrics histograms (interpolated within buckets; skipped for a
+tree without /metrics).
+
+    python -m bench.bench_load [--concurrency 64] [--requests 4000]
+
+To compare two trees (e.g. before/after a change), point --app-dir at a
+checkout of the other revision's backend/ folder:
+
+    git worktree add /tmp/before <rev>
+    python -m bench.bench_load --app-dir /tmp/before/backend
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench._common import percentiles, report
+
+ENDPOINTS = [
+    ("GET", "/items", None),
+    ("GET", "/events", None),
+    ("GET", "/items/1/movements?days=30", None),
+    ("POST", "/items/{item}/movements", {"move_type": "IN", "qty": 1}),
+    ("GET", "/db/ping", None),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(app_dir: str, port: int, db_path: str) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "PYTHONPATH": app_dir, "METRICS_ENABLED": "1"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", "1",
+         "--log-level", "warning", "--app-dir", app_dir],
+        cwd=app_dir, env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not come up")
+
+
+_BUCKET = re.compile(r'^http_request_duration_seconds_bucket\{method="(\w+)",route="([^"]*)",status="\w+",le="([^"]+)"\} (\d+)$')
+
+
+def _server_histograms(base: str) -> dict[str, dict[float, int]] | None:
+    """Cumulative request-latency buckets per 'METHOD route' from /metrics; None if the server has none."""
+    try:
+        r = httpx.get(f"{base}/metrics", timeout=10)
+    except httpx.HTTPError:
+        return None
+    if r.status_code != 200:
+        return None
+    out: dict[str, dict[float, int]] = {}
+    for line in r.text.splitlines():
+        if m := _BUCKET.match(line):
+            method, route, le, n = m.groups()
+            buckets = out.setdefault(f"{method} {route}", {})
+            buckets[float(le)] = buckets.get(float(le), 0) + int(n)     # summed over status classes
+    return out
+
+
+def _quantile_ms(buckets: dict[float, int], q: float) -> float:
+    """Prometheus-style histogram_quantile: linear within the bucket the q-th request falls in."""
+    bounds = sorted(buckets)
+    rank, lo, below = q * buckets[bounds[-1]], 0.0, 0
+    for bound in bounds:
+        if buckets[bound] >= rank and buckets[bound] > below:
+            if bound == float("inf"):
+                return lo * 1e3
+            return (lo + (bound - lo) * (rank - below) / (buckets[bound] - below)) * 1e3
+        lo, below = bound, buckets[bound]
+    return 0.0
+
+
+def _server_rows(concurrency: int, before: dict, after: dict) -> list[dict]:
+    rows, everything = [], {}
+    for key, buckets in sorted(after.items()):
+        if key.endswith("/metrics"):
+            continue
+        delta = {b: n - before.get(key, {}).get(b, 0) for b, n in buckets.items()}
+        for b, n in delta.items():
+            everything[b] = everything.get(b, 0) + n
+        rows.append((key, delta))
+    return [{"concurrency": concurrency, "route": key, "requests": delta[float("inf")],
+             **{f"p{p} ms": _quantile_ms(delta, p / 100) for p in (50, 90, 99)}}
+            for key, delta in [("all", everything), *rows] if delta.get(float("inf"))]
+
+
+async def _drive(base: str, concurrency: int, total: int, item_ids: list[int]) -> tuple[dict[str, list[float]], int, float]:
+    latencies: dict[str, list[float]] = {p: [] for _, p, _ in ENDPOINTS}
+    errors = 0
+    remaining = total
+    rng = random.Random(1)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                method, route, body = rng.choice(ENDPOINTS)
+                path = route.format(item=rng.choice(item_ids))
+                t0 = time.perf_counter()
+                try:
+                    r = await client.request(method, path, json=body)
+                    errors += r.status_code >= 400
+                except httpx.HTTPError:
+                    errors += 1
+                latencies[route].append((time.perf_counter() - t0) * 1e3)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[16, 64])
+    ap.add_argument("--requests", type=int, default=4_000)
+    ap.add_argument("--items", type=int, default=300)
+    args = ap.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="erp-load-"), "load.db")
+    port = _free_port()
+    proc = _start_server(args.app_dir, port, db_path)
+    try:
+        import sqlite3
+        with sqlite3.connect(db_path) as c:
+            c.executemany(
+                "INSERT OR IGNORE INTO item (id, sku, name, uom, reorder_point, reorder_qty, safety_stock, "
+                "lead_time_days, on_hand) VALUES (?, ?, ?, 'pcs', 50, 80, 10, 7, 100)",
+                [(i, f"LOAD-{i}", f"Load item {i}") for i in range(1, args.items + 1)],
+            )
+        item_ids = list(range(1, args.items + 1))
+        base = f"http://127.0.0.1:{port}"
+        rows, by_route, server = [], [], []
+        for c in args.concurrency:
+            before = _server_histograms(base)
+            latencies, errors, elapsed = asyncio.run(_drive(base, c, args.requests, item_ids))
+            if before is not None:
+                server += _server_rows(c, before, _server_histograms(base))
+            everything = [ms for route in latencies.values() for ms in route]
+            rows.append({"concurrency": c, "requests": len(everything), "errors": errors,
+                         "req/s": len(everything) / elapsed,
+                         **{k + " ms": v for k, v in percentiles(everything).items()}})
+            for route, ms in latencies.items():
+                by_route.append({"concurrency": c, "route": route,
+                                 **{k + " ms": v for k, v in percentiles(ms).items()}})
+        report(f"load test ({args.app_dir})", rows)
+        report("latency by route", by_route)
+        if server:
+            report("server-side latency by route (/metrics)", server)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Per-row POST /items/{id}/movements vs POST /movements:batch.
+
+    python -m bench.bench_movements [--single 2000] [--batch 100000]
+"""
+import argparse
+import random
+
+from bench._common import report, timer, use_temp_database
+
+
+def _movements(n: int, item_ids: list[int], rng: random.Random) -> list[dict]:
+    return [
+        {"item_id": rng.choice(item_ids), "move_type": rng.choice(("IN", "IN", "OUT")), "qty": rng.randint(1, 20)}
+        for _ in range(n)
+    ]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--single", type=int, default=2_000, help="movements posted one request at a time")
+    ap.add_argument("--batch", type=int, default=100_000, help="movements posted in one batch request")
+    args = ap.parse_args()
+
+    use_temp_database()
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    rng = random.Random(42)
+    item_ids = [1, 2, 3]
+    rows = []
+    with TestClient(app) as client:
+        single = _movements(args.single, item_ids, rng)
+        with timer() as t:
+            for m in single:
+                client.post(f"/items/{m['item_id']}/movements", json={"move_type": m["move_type"], "qty": m["qty"]})
+        rows.append({"path": "per-row", "movements": args.single, "seconds": t["s"], "rows/s": args.single / t["s"]})
+
+        batch = _movements(args.batch, item_ids, rng)
+        with timer() as t:
+            r = client.post("/movements:batch", json=batch)
+        assert r.json()["accepted"] == args.batch
+        rows.append({"path": "batch", "movements": args.batch, "seconds": t["s"], "rows/s": args.batch / t["s"]})
+
+    report("movement ingestion", rows)
+
+
+if __name__ == "__main__":
+    main()
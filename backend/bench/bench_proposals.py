@@ -0,0 +1,54 @@
+"""Approving planner proposals: one POST /agents/proposals:act per proposal vs
+one for all of them.
+
+    python -m bench.bench_proposals [--single 1000] [--bulk 5000]
+"""
+import argparse
+
+from bench._common import report, timer, use_temp_database
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--single", type=int, default=1_000, help="proposals approved one request at a time")
+    ap.add_argument("--bulk", type=int, default=5_000, help="proposals approved in one bulk request")
+    args = ap.parse_args()
+
+    use_temp_database()
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+    from app.db import engine
+    from app.main import app
+
+    with engine.begin() as conn:
+        run_id = conn.execute(text("INSERT INTO agent_run (tick_id, agent, status) VALUES ('bench', 'planner', 'ok') RETURNING id")).scalar_one()
+        conn.execute(text("""
+            INSERT INTO agent_proposal (run_id, agent, kind, item_id, qty, reason)
+            VALUES (:r, 'planner', 'REORDER', 1, 10, 'bench')
+        """), [{"r": run_id}] * (args.single + args.bulk))
+        every = conn.execute(text("SELECT id FROM agent_proposal ORDER BY id")).scalars().all()
+    single, ids = every[:args.single], every[args.single:]
+
+    rows = []
+    with TestClient(app) as client:
+        with timer() as t:
+            for i in single:
+                client.post("/agents/proposals:act", json=[{"proposal_id": i, "action": "APPROVE"}])
+        rows.append({"path": "per-proposal", "proposals": args.single, "seconds": t["s"], "proposals/s": args.single / t["s"]})
+
+        body = [{"proposal_id": i, "action": "APPROVE"} for i in ids]
+        with timer() as t:
+            r = client.post("/agents/proposals:act", json=body).json()
+        assert r["applied"] == args.bulk
+        rows.append({"path": "bulk", "proposals": args.bulk, "seconds": t["s"], "proposals/s": args.bulk / t["s"]})
+
+        with timer() as t:
+            r = client.post("/agents/proposals:act", json=body).json()
+        assert r["replayed"] == args.bulk
+        rows.append({"path": "bulk retry (replayed)", "proposals": args.bulk, "seconds": t["s"], "proposals/s": args.bulk / t["s"]})
+
+    report("proposal approval", rows)
+
+
+if __name__ == "__main__":
+    main()
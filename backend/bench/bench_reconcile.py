@@ -0,0 +1,83 @@
+"""Ledger replay for on_hand reconciliation: Python row loop vs app.reconcile.
+
+Generates a ledger with app.datagen, then times a full replay as a plain
+per-row Python loop, app.reconcile in-process (per-slice GROUP BY, NumPy
+folded) and across a process pool, and finally an incremental run after a
+small batch of new movements. "peak MB" comes from a second,
+tracemalloc-traced pass (tracing slows the run, so it isn't timed): the row
+loop's dict grows with the items, the replay with the distinct items per
+slice. Pool workers hold their own slices and aren't traced; the pool only
+pays off with more cores than the spawn start-up costs.
+
+    python -m bench.bench_reconcile [--items 20000] [--days 365] [--rate 1.0] [--workers 4]
+"""
+import argparse
+import tracemalloc
+
+from bench._common import report, timer, use_temp_database
+
+
+def _peak_mb(fn) -> float:
+    """Peak MB allocated by Python and NumPy while fn() runs."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=20_000)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--rate", type=float, default=1.0, help="movements per item per day")
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+
+    use_temp_database()
+    from sqlalchemy import text
+    from app import reconcile
+    from app.datagen import Scale, generate
+    from app.db import engine
+
+    scale = Scale(items=args.items, days=args.days, movement_rate=args.rate, sales_orders=0, purchase_orders=0,
+                  customers=1, suppliers=1, events=0)
+    with timer() as t, engine.begin() as conn:
+        counts = generate(conn, scale, seed=7)
+    print(f"generated {counts['item_movement']:,} movements in {t['s']:.1f} s")
+    n = counts["item_movement"]
+
+    def row_loop():
+        balance: dict[int, int] = {}
+        with engine.connect() as conn:
+            for item_id, move_type, qty in conn.execute(text("SELECT item_id, move_type, qty FROM item_movement")):
+                balance[item_id] = balance.get(item_id, 0) + {"IN": qty, "OUT": -qty}.get(move_type, 0)
+        return balance
+
+    rows = []
+    with timer() as t:
+        row_loop()
+    rows.append({"run": "python row loop (full)", "movements/s": n / t["s"], "seconds": t["s"],
+                 "peak MB": _peak_mb(row_loop)})
+
+    for label, workers in (("reconcile full, in-process", 1), (f"reconcile full, {args.workers} processes", args.workers)):
+        def run():
+            return reconcile.reconcile(full=True, workers=workers, parallel_min=0)
+        result = run()
+        assert result["mismatches"] == 0, result["first_mismatches"]
+        rows.append({"run": label, "movements/s": result["replayed"] / result["seconds"], "seconds": result["seconds"],
+                     "peak MB": _peak_mb(run) if workers == 1 else None})
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO item_movement (item_id, move_type, qty) VALUES (:i, 'ADJUST', 1)"),
+                     [{"i": 1 + k % args.items} for k in range(1_000)])
+    result = reconcile.reconcile()
+    rows.append({"run": "incremental (+1,000 movements)", "movements/s": result["replayed"] / result["seconds"],
+                 "seconds": result["seconds"], "peak MB": None})
+
+    report(f"{n:,} movements, {args.items:,} items", rows)
+
+
+if __name__ == "__main__":
+    main()
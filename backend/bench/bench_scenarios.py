@@ -0,0 +1,39 @@
+"""Monte Carlo scenario throughput vs process-pool size.
+
+    python -m bench.bench_scenarios [--items 5000] [--seeds 64] [--days 365]
+"""
+import argparse
+import os
+
+from bench._common import report
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=5_000)
+    ap.add_argument("--seeds", type=int, default=64)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--workers", type=int, nargs="+", default=None)
+    args = ap.parse_args()
+
+    import numpy as np
+    from app.scenarios import ScenarioParams, Snapshot, run_scenarios
+    from bench.bench_planning import synthetic_items
+
+    items = synthetic_items(args.items)
+    snapshot = Snapshot(items=items, reliability=np.full(args.items, 0.9))
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, 8, cpus} & set(range(1, cpus + 1))) or [1]
+
+    rows = []
+    base = None
+    for w in worker_counts:
+        result = run_scenarios(snapshot, ScenarioParams(seeds=args.seeds, days=args.days, workers=w))
+        base = base or result["runs_per_sec"]
+        rows.append({"workers": w, "runs": result["runs"], "seconds": result["seconds"],
+                     "runs/s": result["runs_per_sec"], "speedup": result["runs_per_sec"] / base})
+    report(f"scenarios ({args.items} items x {args.days} days, {cpus} cpus)", rows)
+
+
+if __name__ == "__main__":
+    main()
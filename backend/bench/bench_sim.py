@@ -0,0 +1,61 @@
+"""Simulation throughput: in-memory SimModel and the end-to-end POST /sim/run.
+
+    python -m bench.bench_sim [--items 50000] [--days 365]
+"""
+import argparse
+
+from bench._common import report, timer, use_temp_database
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=50_000)
+    ap.add_argument("--days", type=int, default=365)
+    args = ap.parse_args()
+
+    use_temp_database()
+    # app.* (and bench modules that import it) only after DATABASE_URL is set
+    from bench.bench_planning import synthetic_items
+    from sqlalchemy import text
+    from fastapi.testclient import TestClient
+    from app.db import engine
+    from app.item_master import bump_version
+    from app.main import app
+    from app.simulation import SimModel
+
+    rows = []
+    items = synthetic_items(args.items)
+    for auto_reorder in (False, True):
+        model = SimModel(items, auto_reorder=auto_reorder)
+        with timer() as t:
+            model.run(1, args.days)
+        rows.append({"mode": f"in-memory (auto_reorder={auto_reorder})", "items": args.items,
+                     "days": args.days, "seconds": t["s"], "days/s": args.days / t["s"]})
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM item"))
+        conn.execute(text("""
+            INSERT INTO item (id, sku, name, uom, reorder_point, reorder_qty, safety_stock, lead_time_days, on_hand)
+            VALUES (:id, :sku, :name, 'pcs', :rp, :rq, :ss, :lt, :oh)
+        """), [
+            {"id": int(items.ids[i]), "sku": items.sku[i], "name": items.name[i], "rp": int(items.reorder_point[i]),
+             "rq": int(items.reorder_qty[i]), "ss": int(items.safety_stock[i]), "lt": int(items.lead_time_days[i]),
+             "oh": int(items.on_hand[i])}
+            for i in range(args.items)
+        ])
+        bump_version(conn)
+    with TestClient(app) as client:
+        with timer() as t:
+            r = client.post("/sim/run", params={"days": args.days, "auto_reorder": True})
+        assert r.status_code == 200, r.text
+        rows.append({"mode": "POST /sim/run (auto_reorder=True)", "items": args.items,
+                     "days": args.days, "seconds": t["s"], "days/s": args.days / t["s"]})
+        with timer() as t:
+            client.post("/sim/tick")
+        rows.append({"mode": "POST /sim/tick", "items": args.items, "days": 1, "seconds": t["s"], "days/s": 1 / t["s"]})
+
+    report("simulation", rows)
+
+
+if __name__ == "__main__":
+    main()
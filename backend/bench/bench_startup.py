@@ -0,0 +1,80 @@
+"""Worker cold start: import app.main and run its lifespan startup.
+
+Launches N fresh interpreters at once against the same already-initialised
+SQLite file (the rolling-restart / scale-out case) and reports per-process
+import and startup times plus the wall time until every worker is ready.
+
+    python -m bench.bench_startup [--workers 1 4 8]
+
+Use --app-dir <other checkout>/backend to time another revision.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench._common import percentiles, report
+
+_WORKER = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+from app.main import app
+t1 = time.perf_counter()
+
+async def boot():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(boot())
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1e3, "startup_ms": (t2 - t1) * 1e3}))
+"""
+
+
+def _spawn(app_dir: str, env: dict) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-c", _WORKER], cwd=app_dir, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def _collect(procs: list[subprocess.Popen]) -> list[dict]:
+    out = []
+    for p in procs:
+        stdout, stderr = p.communicate(timeout=300)
+        if p.returncode:
+            raise RuntimeError(stderr)
+        out.append(json.loads(stdout.strip().splitlines()[-1]))
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--app-dir", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = ap.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="erp-startup-"), "startup.db")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "PYTHONPATH": args.app_dir}
+
+    # first boot creates/migrates the schema; not what we're measuring
+    first = _collect([_spawn(args.app_dir, env)])[0]
+    rows = [{"workers": "first boot", "import p50 ms": first["import_ms"],
+             "startup p50 ms": first["startup_ms"], "startup max ms": first["startup_ms"], "all ready s": None}]
+
+    for n in args.workers:
+        started = time.perf_counter()
+        results = _collect([_spawn(args.app_dir, env) for _ in range(n)])
+        wall = time.perf_counter() - started
+        startup = [r["startup_ms"] for r in results]
+        rows.append({"workers": n,
+                     "import p50 ms": percentiles([r["import_ms"] for r in results], (50,))["p50"],
+                     "startup p50 ms": percentiles(startup, (50,))["p50"],
+                     "startup max ms": max(startup),
+                     "all ready s": wall})
+    report(f"worker cold start ({args.app_dir})", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""End-to-end benchmark suite over the hot endpoints, on a generated dataset.
+
+Builds a temp database with app.datagen at the requested scale, then drives
+the app in-process (TestClient, lifespan included) one endpoint at a time
+and reports req/s and latency percentiles per case. Results are saved as
+JSON so a later run can be compared against them:
+
+    python -m bench.bench_suite --items 20000 --out bench/results/base.json
+    # ... change something ...
+    python -m bench.bench_suite --items 20000 --compare bench/results/base.json
+
+--compare prints the p50 / req/s change per case and marks cases whose p50
+grew by more than --threshold (default 20%) as regressions; with
+--fail-on-regression the exit status is 1 if there are any. Compare runs on
+the same machine, scale and seed only; the saved "meta" block records them.
+
+With BENCH_DATABASE_URL set (see bench/_common.py) the same suite runs on
+Postgres; --compare against a SQLite run gives the per-backend comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+from bench._common import percentiles, report, timer, use_temp_database
+
+# name -> (method, path template, json body, share of --requests)
+CASES = {
+    "GET /items": ("GET", "/items", None, 1.0),
+    "GET /items below_reorder_point": ("GET", "/items?below_reorder_point=true&limit=5000", None, 0.5),
+    "GET /items/{id}/movements": ("GET", "/items/{item}/movements?days=30", None, 1.0),
+    "POST /items/{id}/movements": ("POST", "/items/{item}/movements", {"move_type": "IN", "qty": 5}, 1.0),
+    "GET /agents/planner/proposals": ("GET", "/agents/planner/proposals", None, 0.25),
+    "GET /events": ("GET", "/events?limit=200", None, 1.0),
+    "GET /events actor=planner": ("GET", "/events?actor=planner&limit=200", None, 1.0),
+    "POST /sim/tick": ("POST", "/sim/tick", None, 0.05),
+}
+WARMUP = 3
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_case(client, method: str, path: str, body, n: int, item_ids: list[int], rng: random.Random) -> dict:
+    latencies, errors = [], 0
+    for k in range(WARMUP + n):
+        url = path.format(item=rng.choice(item_ids))
+        t0 = time.perf_counter()
+        r = client.request(method, url, json=body)
+        ms = (time.perf_counter() - t0) * 1000
+        if k >= WARMUP:
+            latencies.append(ms)
+            errors += r.status_code >= 400
+    return {"requests": n, "errors": errors, "req/s": 1000 * n / sum(latencies),
+            **{k + " ms": v for k, v in percentiles(latencies).items()}}
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> tuple[list[dict], int]:
+    """Per-case change against a saved run; returns (rows, number of regressions)."""
+    before = {r["case"]: r for r in baseline["results"]}
+    rows, regressions = [], 0
+    for r in results:
+        b = before.get(r["case"])
+        if b is None:
+            continue
+        p50 = r["p50 ms"] / b["p50 ms"] - 1 if b["p50 ms"] else 0.0
+        regressed = p50 > threshold
+        regressions += regressed
+        rows.append({"case": r["case"], "p50 ms": r["p50 ms"], "was": b["p50 ms"], "p50 %": 100 * p50,
+                     "req/s %": 100 * (r["req/s"] / b["req/s"] - 1) if b["req/s"] else 0.0,
+                     "flag": "REGRESSION" if regressed else ""})
+    return rows, regressions
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=20_000)
+    ap.add_argument("--days", type=int, default=90)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--requests", type=int, default=200, help="per case, scaled by the case's share")
+    ap.add_argument("--cases", nargs="+", choices=list(CASES), help="default: all")
+    ap.add_argument("--out", help="save results as JSON (default: bench/results/<rev>-<time>.json)")
+    ap.add_argument("--compare", help="a saved results file to compare against")
+    ap.add_argument("--threshold", type=float, default=0.2)
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    use_temp_database()
+    from fastapi.testclient import TestClient
+    from sqlalchemy import text
+    from app import analytics, snapshots
+    from app.datagen import Scale, generate
+    from app.db import engine
+    from app.main import app
+
+    scale = Scale(items=args.items, days=args.days, sales_orders=args.items, purchase_orders=args.items // 4,
+                  events=args.items * 5)
+    with timer() as t, engine.begin() as conn:
+        counts = generate(conn, scale, seed=args.seed)
+    snapshots.rollup()
+    analytics.rollup()
+    print(f"generated {', '.join(f'{v:,} {k}' for k, v in counts.items())} in {t['s']:.1f} s")
+    with engine.connect() as conn:
+        item_ids = conn.execute(text("SELECT id FROM item ORDER BY id")).scalars().all()
+
+    rng = random.Random(args.seed)
+    results = []
+    with TestClient(app) as client:
+        for name in args.cases or CASES:
+            method, path, body, share = CASES[name]
+            n = max(5, int(args.requests * share))
+            results.append({"case": name, **run_case(client, method, path, body, n, item_ids, rng)})
+    report(f"bench suite ({args.items:,} items, seed {args.seed})", results)
+
+    run = {
+        "meta": {"rev": _git_rev(), "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 "python": sys.version.split()[0], "platform": platform.platform(),
+                 "database": engine.dialect.name,
+                 "scale": asdict(scale), "seed": args.seed, "rows": counts},
+        "results": results,
+    }
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                   f"{run['meta']['rev'] or 'run'}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nsaved {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("scale") != run["meta"]["scale"]:
+            print("warning: baseline was run at a different scale")
+        if baseline["meta"].get("database", "sqlite") != run["meta"]["database"]:
+            print(f"note: baseline ran on {baseline['meta'].get('database', 'sqlite')}, this run on {run['meta']['database']}")
+        rows, regressions = compare(results, baseline, args.threshold)
+        report(f"vs {args.compare} (rev {baseline['meta'].get('rev')})", rows)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
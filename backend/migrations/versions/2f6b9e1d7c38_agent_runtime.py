@@ -0,0 +1,59 @@
+"""agent_run and agent_proposal
+
+Revision ID: 2f6b9e1d7c38
+Revises: 61b0e5d8c7a4
+Create Date: 2026-10-18 22:41:09.514207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6b9e1d7c38'
+down_revision: Union[str, None] = '61b0e5d8c7a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('agent_run',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tick_id', sa.String(length=32), nullable=False),
+    sa.Column('agent', sa.String(length=64), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('duration_ms', sa.Float(), server_default=sa.text('0'), nullable=False),
+    sa.Column('rows_read', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('proposals', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_agent_run_agent_id', 'agent_run', ['agent', 'id'], unique=False)
+    op.create_index('ix_agent_run_tick_id', 'agent_run', ['tick_id'], unique=False)
+    op.create_table('agent_proposal',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('agent', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=True),
+    sa.Column('qty', sa.Integer(), nullable=True),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('payload_json', sa.JSON(), nullable=True),
+    sa.Column('status', sa.String(length=16), server_default='OPEN', nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+    sa.ForeignKeyConstraint(['run_id'], ['agent_run.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_agent_proposal_agent_status_id', 'agent_proposal', ['agent', 'status', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_agent_proposal_agent_status_id', table_name='agent_proposal')
+    op.drop_table('agent_proposal')
+    op.drop_index('ix_agent_run_tick_id', table_name='agent_run')
+    op.drop_index('ix_agent_run_agent_id', table_name='agent_run')
+    op.drop_table('agent_run')
@@ -0,0 +1,41 @@
+"""stock snapshots
+
+Revision ID: 4c8e1b7a2d05
+Revises: e7a4c2d9f1b3
+Create Date: 2026-10-18 19:12:08.554310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8e1b7a2d05'
+down_revision: Union[str, None] = 'e7a4c2d9f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rollup_checkpoint',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('last_id', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('stock_snapshot',
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('snap_date', sa.Date(), nullable=False),
+    sa.Column('on_hand', sa.Integer(), nullable=False),
+    sa.Column('qty_in', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('qty_out', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('moves', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+    sa.PrimaryKeyConstraint('item_id', 'snap_date')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('stock_snapshot')
+    op.drop_table('rollup_checkpoint')
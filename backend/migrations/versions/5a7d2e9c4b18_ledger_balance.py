@@ -0,0 +1,32 @@
+"""ledger_balance
+
+Revision ID: 5a7d2e9c4b18
+Revises: c3e8a4f1b692
+Create Date: 2026-10-19 02:41:08.531207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7d2e9c4b18'
+down_revision: Union[str, None] = 'c3e8a4f1b692'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ledger_balance',
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('moves', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+    sa.PrimaryKeyConstraint('item_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ledger_balance')
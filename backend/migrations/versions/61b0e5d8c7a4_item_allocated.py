@@ -0,0 +1,27 @@
+"""item.allocated for sales order allocation
+
+Revision ID: 61b0e5d8c7a4
+Revises: 9d3f6a0c4e12
+Create Date: 2026-10-18 21:26:50.114903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '61b0e5d8c7a4'
+down_revision: Union[str, None] = '9d3f6a0c4e12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('item', sa.Column('allocated', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('item') as batch_op:
+        batch_op.drop_column('allocated')
@@ -0,0 +1,37 @@
+"""bom_line
+
+Revision ID: 7e2b9c5d1a46
+Revises: 5a7d2e9c4b18
+Create Date: 2026-10-19 04:17:52.204611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e2b9c5d1a46'
+down_revision: Union[str, None] = '5a7d2e9c4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('bom_line',
+    sa.Column('parent_id', sa.Integer(), nullable=False),
+    sa.Column('component_id', sa.Integer(), nullable=False),
+    sa.Column('qty_per', sa.Float(), nullable=False),
+    sa.CheckConstraint('qty_per > 0', name='ck_bom_line_qty_per_positive'),
+    sa.CheckConstraint('parent_id <> component_id', name='ck_bom_line_not_self'),
+    sa.ForeignKeyConstraint(['component_id'], ['item.id'], ),
+    sa.ForeignKeyConstraint(['parent_id'], ['item.id'], ),
+    sa.PrimaryKeyConstraint('parent_id', 'component_id')
+    )
+    op.create_index('ix_bom_line_component_id', 'bom_line', ['component_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_bom_line_component_id', table_name='bom_line')
+    op.drop_table('bom_line')
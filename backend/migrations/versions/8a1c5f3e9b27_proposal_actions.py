@@ -0,0 +1,36 @@
+"""agent_proposal.acted_at and purchase_order.proposal_id
+
+Revision ID: 8a1c5f3e9b27
+Revises: 2f6b9e1d7c38
+Create Date: 2026-10-18 23:27:51.006318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a1c5f3e9b27'
+down_revision: Union[str, None] = '2f6b9e1d7c38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('agent_proposal', sa.Column('acted_at', sa.DateTime(timezone=True), nullable=True))
+    # batch mode: SQLite can't add a foreign key with ALTER TABLE
+    with op.batch_alter_table('purchase_order') as batch_op:
+        batch_op.add_column(sa.Column('proposal_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_purchase_order_proposal_id', 'agent_proposal', ['proposal_id'], ['id'])
+        batch_op.create_index('ux_purchase_order_proposal_id', ['proposal_id'], unique=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('purchase_order') as batch_op:
+        batch_op.drop_index('ux_purchase_order_proposal_id')
+        batch_op.drop_constraint('fk_purchase_order_proposal_id', type_='foreignkey')
+        batch_op.drop_column('proposal_id')
+    with op.batch_alter_table('agent_proposal') as batch_op:
+        batch_op.drop_column('acted_at')
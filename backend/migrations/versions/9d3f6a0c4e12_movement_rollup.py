@@ -0,0 +1,40 @@
+"""movement rollup and item_movement (item_id, ts) index
+
+Revision ID: 9d3f6a0c4e12
+Revises: 4c8e1b7a2d05
+Create Date: 2026-10-18 20:03:27.918442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6a0c4e12'
+down_revision: Union[str, None] = '4c8e1b7a2d05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('movement_rollup',
+    sa.Column('grain', sa.String(length=8), nullable=False),
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.Date(), nullable=False),
+    sa.Column('qty_in', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('qty_out', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('qty_adjust', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('moves', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+    sa.PrimaryKeyConstraint('grain', 'item_id', 'bucket')
+    )
+    op.create_index('ix_movement_rollup_grain_bucket', 'movement_rollup', ['grain', 'bucket'], unique=False)
+    op.create_index('ix_item_movement_item_id_ts', 'item_movement', ['item_id', 'ts'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_item_movement_item_id_ts', table_name='item_movement')
+    op.drop_index('ix_movement_rollup_grain_bucket', table_name='movement_rollup')
+    op.drop_table('movement_rollup')
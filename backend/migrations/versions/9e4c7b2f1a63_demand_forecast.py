@@ -0,0 +1,42 @@
+"""demand_forecast
+
+Revision ID: 9e4c7b2f1a63
+Revises: 7e2b9c5d1a46
+Create Date: 2026-10-19 06:02:37.118524
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4c7b2f1a63'
+down_revision: Union[str, None] = '7e2b9c5d1a46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('demand_forecast',
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('buckets', sa.Integer(), nullable=False),
+    sa.Column('nonzero', sa.Integer(), nullable=False),
+    sa.Column('level', sa.Float(), nullable=False),
+    sa.Column('level_mad', sa.Float(), nullable=False),
+    sa.Column('demand_size', sa.Float(), nullable=False),
+    sa.Column('demand_interval', sa.Float(), nullable=False),
+    sa.Column('since_demand', sa.Integer(), nullable=False),
+    sa.Column('croston_mad', sa.Float(), nullable=False),
+    sa.Column('method', sa.String(length=8), nullable=False),
+    sa.Column('per_day', sa.Float(), nullable=False),
+    sa.Column('safety_stock', sa.Integer(), nullable=True),
+    sa.Column('reorder_point', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+    sa.PrimaryKeyConstraint('item_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('demand_forecast')
@@ -0,0 +1,31 @@
+"""event_log indexes
+
+Revision ID: b48a70b96315
+Revises: 725395d71440
+Create Date: 2026-10-18 16:40:12.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b48a70b96315'
+down_revision: Union[str, None] = '725395d71440'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the old bootstrap in app/main.py created these too
+    op.create_index('ix_event_log_actor_id', 'event_log', ['actor', 'id'], unique=False, if_not_exists=True)
+    op.create_index('ix_event_log_event_type_id', 'event_log', ['event_type', 'id'], unique=False, if_not_exists=True)
+    op.create_index('ix_event_log_ts', 'event_log', ['ts'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_log_ts', table_name='event_log')
+    op.drop_index('ix_event_log_event_type_id', table_name='event_log')
+    op.drop_index('ix_event_log_actor_id', table_name='event_log')
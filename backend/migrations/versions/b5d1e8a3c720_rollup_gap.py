@@ -0,0 +1,32 @@
+"""rollup_gap
+
+Revision ID: b5d1e8a3c720
+Revises: 9e4c7b2f1a63
+Create Date: 2026-10-19 09:14:52.406318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1e8a3c720'
+down_revision: Union[str, None] = '9e4c7b2f1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rollup_gap',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('lo', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('hi', sa.Integer(), nullable=False),
+    sa.Column('seen_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'lo')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rollup_gap')
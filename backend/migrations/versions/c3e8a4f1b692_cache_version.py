@@ -0,0 +1,30 @@
+"""cache_version
+
+Revision ID: c3e8a4f1b692
+Revises: 8a1c5f3e9b27
+Create Date: 2026-10-19 00:12:40.771935
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a4f1b692'
+down_revision: Union[str, None] = '8a1c5f3e9b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cache_version',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('cache_version')
@@ -0,0 +1,38 @@
+"""movement_rollup_sim
+
+Revision ID: d28f4a6b9e15
+Revises: b5d1e8a3c720
+Create Date: 2026-10-19 11:40:08.531947
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd28f4a6b9e15'
+down_revision: Union[str, None] = 'b5d1e8a3c720'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# existing rollup rows do not split out the simulation's shipments: rebuild
+# movement_rollup from the ledger, and the forecasts from it, on the next run
+_RESET = (
+    "DELETE FROM movement_rollup",
+    "DELETE FROM rollup_gap WHERE name = 'movement_rollup'",
+    "DELETE FROM demand_forecast",
+    "DELETE FROM rollup_checkpoint WHERE name IN ('movement_rollup', 'demand_forecast')",
+    "UPDATE cache_version SET version = version + 1 WHERE name = 'forecast'",
+)
+
+
+def upgrade() -> None:
+    op.add_column('movement_rollup', sa.Column('qty_out_sim', sa.Integer(), server_default=sa.text('0'), nullable=False))
+    for stmt in _RESET:
+        op.execute(stmt)
+
+
+def downgrade() -> None:
+    op.drop_column('movement_rollup', 'qty_out_sim')
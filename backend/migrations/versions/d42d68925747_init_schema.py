@@ -19,93 +19,109 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
+    # Databases created by the old import-time bootstrap in app/main.py already
+    # have some of these tables (item, event_log, sim_state, purchase_order);
+    # skip those so `alembic upgrade head` adopts them instead of failing.
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
     # ### commands auto generated by Alembic - please adjust! ###
-    op.create_table('customer',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('name', sa.String(length=200), nullable=False),
-    sa.Column('priority', sa.Integer(), nullable=False),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('event_log',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('ts', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
-    sa.Column('actor', sa.String(length=64), nullable=False),
-    sa.Column('event_type', sa.String(length=64), nullable=False),
-    sa.Column('payload_json', sa.JSON(), nullable=True),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('item',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('sku', sa.String(length=64), nullable=False),
-    sa.Column('name', sa.String(length=200), nullable=False),
-    sa.Column('uom', sa.String(length=16), nullable=False),
-    sa.Column('reorder_point', sa.Integer(), nullable=False),
-    sa.Column('reorder_qty', sa.Integer(), nullable=False),
-    sa.Column('safety_stock', sa.Integer(), nullable=False),
-    sa.Column('lead_time_days', sa.Integer(), nullable=False),
-    sa.Column('on_hand', sa.Integer(), nullable=False),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_index(op.f('ix_item_sku'), 'item', ['sku'], unique=True)
-    op.create_table('sim_state',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('current_day', sa.Integer(), nullable=False),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('supplier',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('name', sa.String(length=200), nullable=False),
-    sa.Column('reliability', sa.Float(), nullable=False),
-    sa.Column('avg_lead_days', sa.Integer(), nullable=False),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('purchase_order',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('supplier_id', sa.Integer(), nullable=False),
-    sa.Column('expected_date', sa.Date(), nullable=False),
-    sa.Column('status', sa.String(length=32), nullable=False),
-    sa.ForeignKeyConstraint(['supplier_id'], ['supplier.id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('sales_order',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('customer_id', sa.Integer(), nullable=False),
-    sa.Column('order_date', sa.Date(), nullable=False),
-    sa.Column('ship_by', sa.Date(), nullable=False),
-    sa.Column('status', sa.String(length=32), nullable=False),
-    sa.ForeignKeyConstraint(['customer_id'], ['customer.id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('stock_movement',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('item_id', sa.Integer(), nullable=False),
-    sa.Column('type', sa.String(length=16), nullable=False),
-    sa.Column('qty', sa.Integer(), nullable=False),
-    sa.Column('ref', sa.String(length=64), nullable=True),
-    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
-    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('purchase_order_line',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('po_id', sa.Integer(), nullable=False),
-    sa.Column('item_id', sa.Integer(), nullable=False),
-    sa.Column('qty', sa.Integer(), nullable=False),
-    sa.Column('received_qty', sa.Integer(), nullable=False),
-    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
-    sa.ForeignKeyConstraint(['po_id'], ['purchase_order.id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_table('sales_order_line',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('so_id', sa.Integer(), nullable=False),
-    sa.Column('item_id', sa.Integer(), nullable=False),
-    sa.Column('qty', sa.Integer(), nullable=False),
-    sa.Column('allocated_qty', sa.Integer(), nullable=False),
-    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
-    sa.ForeignKeyConstraint(['so_id'], ['sales_order.id'], ),
-    sa.PrimaryKeyConstraint('id')
-    )
+    if 'customer' not in existing:
+        op.create_table('customer',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'event_log' not in existing:
+        op.create_table('event_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ts', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('actor', sa.String(length=64), nullable=False),
+        sa.Column('event_type', sa.String(length=64), nullable=False),
+        sa.Column('payload_json', sa.JSON(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'item' not in existing:
+        op.create_table('item',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sku', sa.String(length=64), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('uom', sa.String(length=16), nullable=False),
+        sa.Column('reorder_point', sa.Integer(), nullable=False),
+        sa.Column('reorder_qty', sa.Integer(), nullable=False),
+        sa.Column('safety_stock', sa.Integer(), nullable=False),
+        sa.Column('lead_time_days', sa.Integer(), nullable=False),
+        sa.Column('on_hand', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'item' not in existing:
+        op.create_index(op.f('ix_item_sku'), 'item', ['sku'], unique=True)
+    if 'sim_state' not in existing:
+        op.create_table('sim_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('current_day', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'supplier' not in existing:
+        op.create_table('supplier',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('reliability', sa.Float(), nullable=False),
+        sa.Column('avg_lead_days', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'purchase_order' not in existing:
+        op.create_table('purchase_order',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('supplier_id', sa.Integer(), nullable=False),
+        sa.Column('expected_date', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.ForeignKeyConstraint(['supplier_id'], ['supplier.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'sales_order' not in existing:
+        op.create_table('sales_order',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=False),
+        sa.Column('order_date', sa.Date(), nullable=False),
+        sa.Column('ship_by', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.ForeignKeyConstraint(['customer_id'], ['customer.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'stock_movement' not in existing:
+        op.create_table('stock_movement',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=16), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.Column('ref', sa.String(length=64), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'purchase_order_line' not in existing:
+        op.create_table('purchase_order_line',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('po_id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.Column('received_qty', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+        sa.ForeignKeyConstraint(['po_id'], ['purchase_order.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'sales_order_line' not in existing:
+        op.create_table('sales_order_line',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('so_id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.Column('allocated_qty', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+        sa.ForeignKeyConstraint(['so_id'], ['sales_order.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
     # ### end Alembic commands ###
 
 
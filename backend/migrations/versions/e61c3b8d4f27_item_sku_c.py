@@ -0,0 +1,33 @@
+"""item_sku_c
+
+Revision ID: e61c3b8d4f27
+Revises: d28f4a6b9e15
+Create Date: 2026-10-19 14:22:45.903117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e61c3b8d4f27'
+down_revision: Union[str, None] = 'd28f4a6b9e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Postgres only: GET /items?sku_prefix= compares sku COLLATE "C" (see
+# routers/items.py), which the default-collation unique index can't serve.
+# SQLite compares in BINARY order already. Not in app/models.py: it is an
+# expression index on one dialect, which autogenerate skips.
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_index('ix_item_sku_c', 'item', [sa.text('sku COLLATE "C"')], unique=False)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index('ix_item_sku_c', table_name='item')
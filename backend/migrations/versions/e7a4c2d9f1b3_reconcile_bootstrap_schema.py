@@ -0,0 +1,99 @@
+"""reconcile bootstrap schema
+
+Brings databases created by `alembic upgrade` in line with the tables the
+app actually reads and writes (previously created by the import-time
+bootstrap in app/main.py): one-item purchase orders with a sim due_day,
+item_movement, and server-side defaults for the item master.
+
+Revision ID: e7a4c2d9f1b3
+Revises: b48a70b96315
+Create Date: 2026-10-18 18:05:41.302117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a4c2d9f1b3'
+down_revision: Union[str, None] = 'b48a70b96315'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ITEM_DEFAULTS = {
+    'uom': 'pcs',
+    'reorder_point': sa.text('0'),
+    'reorder_qty': sa.text('0'),
+    'safety_stock': sa.text('0'),
+    'lead_time_days': sa.text('7'),
+    'on_hand': sa.text('0'),
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    tables = set(insp.get_table_names())
+
+    if 'item_movement' not in tables:
+        op.create_table('item_movement',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('item_id', sa.Integer(), nullable=False),
+        sa.Column('ts', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('move_type', sa.String(length=16), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.Column('note', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['item_id'], ['item.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    po_columns = {c['name'] for c in insp.get_columns('purchase_order')}
+    if 'supplier_id' in po_columns:
+        # supplier-header shape from the initial migration; the app never wrote to it
+        if bind.execute(sa.text('SELECT COUNT(*) FROM purchase_order')).scalar_one():
+            raise RuntimeError('purchase_order has supplier-header rows; move them to item rows before upgrading')
+        with op.batch_alter_table('purchase_order', recreate='always') as batch_op:
+            batch_op.drop_column('supplier_id')
+            batch_op.drop_column('expected_date')
+            batch_op.add_column(sa.Column('item_id', sa.Integer(), nullable=False))
+            batch_op.add_column(sa.Column('qty', sa.Integer(), nullable=False))
+            batch_op.add_column(sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False))
+            batch_op.add_column(sa.Column('due_day', sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column('note', sa.Text(), nullable=True))
+            batch_op.alter_column('status', existing_type=sa.String(length=32), server_default='OPEN')
+            batch_op.create_foreign_key('fk_purchase_order_item_id_item', 'item', ['item_id'], ['id'])
+    elif 'due_day' not in po_columns:
+        op.add_column('purchase_order', sa.Column('due_day', sa.Integer(), nullable=True))
+
+    missing = {c['name']: c for c in insp.get_columns('item') if c['default'] is None and c['name'] in ITEM_DEFAULTS}
+    if missing:
+        with op.batch_alter_table('item') as batch_op:
+            for name, col in missing.items():
+                batch_op.alter_column(name, existing_type=col['type'], server_default=ITEM_DEFAULTS[name])
+
+    sim_state = {c['name']: c for c in insp.get_columns('sim_state')}
+    if sim_state['current_day']['default'] is None:
+        with op.batch_alter_table('sim_state') as batch_op:
+            batch_op.alter_column('current_day', existing_type=sa.Integer(), server_default=sa.text('1'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sim_state') as batch_op:
+        batch_op.alter_column('current_day', existing_type=sa.Integer(), server_default=None)
+    with op.batch_alter_table('item') as batch_op:
+        for name in ITEM_DEFAULTS:
+            batch_op.alter_column(name, existing_type=sa.Integer() if name != 'uom' else sa.String(length=16), server_default=None)
+    with op.batch_alter_table('purchase_order', recreate='always') as batch_op:
+        batch_op.drop_constraint('fk_purchase_order_item_id_item', type_='foreignkey')
+        batch_op.drop_column('note')
+        batch_op.drop_column('due_day')
+        batch_op.drop_column('created_at')
+        batch_op.drop_column('qty')
+        batch_op.drop_column('item_id')
+        batch_op.add_column(sa.Column('supplier_id', sa.Integer(), nullable=False))
+        batch_op.add_column(sa.Column('expected_date', sa.Date(), nullable=False))
+        batch_op.alter_column('status', existing_type=sa.String(length=32), server_default=None)
+        batch_op.create_foreign_key('fk_purchase_order_supplier_id_supplier', 'supplier', ['supplier_id'], ['id'])
+    op.drop_table('item_movement')
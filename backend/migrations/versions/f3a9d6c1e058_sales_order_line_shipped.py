@@ -0,0 +1,27 @@
+"""sales_order_line.shipped_qty for shipping allocated lines
+
+Revision ID: f3a9d6c1e058
+Revises: e61c3b8d4f27
+Create Date: 2026-10-20 09:12:31.402718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9d6c1e058'
+down_revision: Union[str, None] = 'e61c3b8d4f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('sales_order_line', sa.Column('shipped_qty', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('sales_order_line') as batch_op:
+        batch_op.drop_column('shipped_qty')
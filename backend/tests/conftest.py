@@ -0,0 +1,91 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Point the app at a throwaway SQLite file *before* app.db builds its engine,
+# so in-process tests never touch dev.db. TEST_DATABASE_URL runs the suite
+# against another database instead (e.g. the compose db-test Postgres); it is
+# wiped first, so its name must contain "test".
+_tmpdir = tempfile.mkdtemp(prefix="erp-test-")
+if os.getenv("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'test.db')}")
+
+
+def _disposable(url) -> None:
+    if "test" not in (url.database or ""):
+        raise pytest.UsageError(
+            f"TEST_DATABASE_URL points at database {url.database!r}; the suite wipes it, "
+            "so use one whose name contains 'test' (e.g. erp_test)"
+        )
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Migrate the throwaway database to head and load the demo items once."""
+    from sqlalchemy import text
+    from app.db import engine
+    from app.schema import ensure_schema
+    from app.seed import seed
+
+    if engine.dialect.name == "postgresql":
+        _disposable(engine.url)
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE"))
+            conn.execute(text("CREATE SCHEMA public"))
+    ensure_schema(auto_migrate=True)
+    with engine.begin() as conn:
+        seed(conn)
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    """
+    Factory for an empty database migrated to head, a new one per call, on
+    the suite's backend: a SQLite file under tmp_path, or on Postgres a
+    schema of its own in the TEST_DATABASE_URL database (dropped afterwards).
+    The schema goes in the URL, so process-pool workers rebuilding the
+    engine from bind.url land in it too.
+    """
+    from sqlalchemy import create_engine, text
+    from app.db import engine as app_engine
+    from app.schema import ensure_schema
+
+    made = []
+
+    def make():
+        if app_engine.dialect.name == "postgresql":
+            schema = f"t_{uuid.uuid4().hex[:12]}"
+            with app_engine.begin() as conn:
+                conn.execute(text(f"CREATE SCHEMA {schema}"))
+            eng = create_engine(app_engine.url.update_query_dict({"options": f"-csearch_path={schema}"}))
+        else:
+            schema = None
+            eng = create_engine(f"sqlite:///{tmp_path / f'db{len(made)}.sqlite'}", connect_args={"timeout": 30})
+        made.append((eng, schema))
+        ensure_schema(eng, auto_migrate=True)
+        return eng
+
+    yield make
+    for eng, schema in made:
+        eng.dispose()
+        if schema:
+            with app_engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+
+
+@pytest.fixture
+def eng(make_engine):
+    """One empty database migrated to head; a module overrides it (def eng(eng)) to seed rows."""
+    return make_engine()
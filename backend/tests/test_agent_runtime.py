@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from app import agents
+from app.agent_runtime import Agent, AgentBusy, AgentOutput, AgentRuntime
+from app.db import engine
+from app.event_writer import EventEmitter
+from app.llm import OpenAIChat, StubLLM
+
+
+def _sleeper(seconds, n=1):
+    async def run(ctx):
+        await asyncio.sleep(seconds)
+        return AgentOutput([{"kind": "NOTE", "reason": f"slept {seconds}"}] * n, rows_read=n)
+    return run
+
+
+def _runtime(*agents_, **opts):
+    return AgentRuntime({a.name: a for a in agents_}, llm=StubLLM(), **opts)
+
+
+def _open(agent):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM agent_proposal WHERE agent = :a AND status = 'OPEN'"),
+                            {"a": agent}).scalar_one()
+
+
+def test_agents_run_concurrently_with_per_agent_timeouts():
+    rt = _runtime(
+        Agent("t_a", _sleeper(0.2, 3)),
+        Agent("t_b", _sleeper(0.2, 2)),
+        Agent("t_slow", _sleeper(5), timeout_s=0.1),
+    )
+    t0 = time.perf_counter()
+    result = asyncio.run(rt.tick())
+    assert time.perf_counter() - t0 < 0.6
+
+    runs = {r["agent"]: r for r in result["runs"]}
+    assert runs["t_a"]["status"] == "ok" and runs["t_a"]["proposals"] == 3 and runs["t_a"]["duration_ms"] >= 150
+    assert runs["t_slow"]["status"] == "timeout" and runs["t_slow"]["proposals"] == 0
+    assert _open("t_a") == 3 and _open("t_b") == 2 and _open("t_slow") == 0
+    with engine.connect() as conn:
+        logged = conn.execute(text("SELECT agent, status, rows_read FROM agent_run WHERE tick_id = :t"),
+                              {"t": result["tick_id"]}).all()
+    assert sorted(logged) == [("t_a", "ok", 3), ("t_b", "ok", 2), ("t_slow", "timeout", 0)]
+
+
+def test_cache_supersede_and_backpressure():
+    calls = []
+
+    async def counting(ctx):
+        calls.append(ctx.tick_id)
+        await asyncio.sleep(0.05)
+        return AgentOutput([{"kind": "NOTE", "qty": len(calls)}])
+
+    rt = _runtime(Agent("t_count", counting), max_pending=1)
+
+    async def scenario():
+        first = await rt.tick()
+        second = await rt.tick()                    # same fingerprint: served from cache
+        assert [r["status"] for r in second["runs"]] == ["cached"]
+        assert len(calls) == 1
+
+        rt._cache.clear()                           # as if the state had changed
+        busy = asyncio.ensure_future(rt.tick())
+        await asyncio.sleep(0)
+        with pytest.raises(AgentBusy):
+            await rt.tick()
+        await busy
+        return first
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT qty, status FROM agent_proposal WHERE agent = 't_count' ORDER BY id")).all()
+    assert rows == [(1, "SUPERSEDED"), (2, "OPEN")]
+
+
+def test_queued_events_change_the_fingerprint():
+    calls = []
+
+    async def counting(ctx):
+        calls.append(ctx.fingerprint)
+        return AgentOutput()
+
+    em = EventEmitter(bind=engine, flush_ms=200)     # an event sits in the queue for a while
+    rt = _runtime(Agent("t_events", counting), events=em)
+    try:
+        asyncio.run(rt.tick())
+        em.emit("test", "E", {})
+        second = asyncio.run(rt.tick())
+    finally:
+        em.close()
+    assert [r["status"] for r in second["runs"]] == ["ok"]
+    assert len(calls) == 2 and calls[0] != calls[1]
+
+
+def test_aclose_releases_the_llm_client():
+    async def scenario():
+        llm = OpenAIChat(api_key="test")
+        rt = AgentRuntime({}, llm=llm)
+        client = llm._client = httpx.AsyncClient()
+        await rt.aclose()
+        assert client.is_closed and llm._client is None
+        await rt.aclose()                           # idempotent
+        await AgentRuntime({}).aclose()             # no backend made yet: nothing to close
+
+    asyncio.run(scenario())
+
+
+def test_failing_agent_is_isolated():
+    async def broken(ctx):
+        raise ValueError("boom")
+
+    rt = _runtime(Agent("t_broken", broken), Agent("t_ok", _sleeper(0)))
+    runs = {r["agent"]: r for r in asyncio.run(rt.tick())["runs"]}
+    assert runs["t_broken"]["status"] == "error" and "boom" in runs["t_broken"]["error"]
+    assert runs["t_ok"]["status"] == "ok"
+
+
+def test_builtin_agents_over_the_api(client):
+    client.post("/items/1/movements", json={"move_type": "ADJUST", "qty": 1})   # new fingerprint
+    r = client.post("/agents/tick", params=[("agent", "planner"), ("agent", "buyer")])
+    assert r.status_code == 200
+    runs = {x["agent"]: x for x in r.json()["runs"]}
+    assert runs["planner"]["status"] == "ok" and runs["buyer"]["status"] == "ok"
+    assert runs["planner"]["proposals"] == runs["buyer"]["proposals"] > 0
+
+    rfqs = client.get("/agents/proposals", params={"agent": "buyer"}).json()
+    assert rfqs[0]["kind"] == "RFQ" and rfqs[0]["payload_json"]["body"].startswith("[draft]")
+    assert client.get("/agents/runs", params={"agent": "planner", "limit": 1}).json()[0]["status"] == "ok"
+    listed = {a["name"]: a for a in client.get("/agents").json()["agents"]}
+    assert listed["planner"]["last_run"]["status"] == "ok"
+    assert client.post("/agents/tick", params={"agent": "nope"}).status_code == 404
+    assert agents.runtime.stats()["pending_ticks"] == 0
+
+
+def test_mrp_agent_leaves_planner_items_alone(client):
+    client.put("/items/1/bom", json=[{"component_id": 3, "qty_per": 0.06}])
+    client.post("/items/1/movements", json={"move_type": "ADJUST", "qty": 1})   # new fingerprint
+    r = client.post("/agents/tick", params=[("agent", "planner"), ("agent", "mrp")])
+    assert {x["agent"]: x["status"] for x in r.json()["runs"]} == {"planner": "ok", "mrp": "ok"}
+
+    def items(agent):
+        return [p["item_id"] for p in client.get("/agents/proposals", params={"agent": agent}).json()
+                if p["status"] == "OPEN"]
+    planner, mrp = items("planner"), items("mrp")
+    assert planner and not set(planner) & set(mrp)
+    client.put("/items/1/bom", json=[{"component_id": 3, "qty_per": 0.05}])
@@ -0,0 +1,181 @@
+import random
+import threading
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app import allocation
+
+ITEMS = (1, 2, 3)
+
+
+def _orders(conn, rng, n_orders, lines_per_order=3):
+    conn.execute(text("INSERT INTO customer (id, name, priority) VALUES (1, 'A', 1), (2, 'B', 2), (3, 'C', 3)"))
+    orders, lines = [], []
+    for so in range(1, n_orders + 1):
+        orders.append({"id": so, "c": rng.randint(1, 3), "d": date(2026, 1, 1),
+                       "s": date(2026, 1, 1) + timedelta(days=rng.randint(0, 30))})
+        lines += [{"so": so, "item": rng.choice(ITEMS), "q": rng.randint(1, 20)} for _ in range(lines_per_order)]
+    conn.execute(text("""
+        INSERT INTO sales_order (id, customer_id, order_date, ship_by, status)
+        VALUES (:id, :c, :d, :s, 'Open')
+    """), orders)
+    conn.execute(text("INSERT INTO sales_order_line (so_id, item_id, qty, allocated_qty) VALUES (:so, :item, :q, 0)"), lines)
+
+
+def _check_invariants(conn):
+    items = conn.execute(text("SELECT id, on_hand, allocated FROM item")).all()
+    for item_id, on_hand, allocated in items:
+        assert 0 <= allocated <= on_hand, (item_id, on_hand, allocated)
+    assert conn.execute(text(
+        "SELECT COUNT(*) FROM sales_order_line WHERE allocated_qty + shipped_qty > qty OR allocated_qty < 0"
+    )).scalar_one() == 0
+    per_line = dict(conn.execute(text("SELECT item_id, SUM(allocated_qty) FROM sales_order_line GROUP BY item_id")).all())
+    assert {i: a for i, _, a in items if a} == {i: s for i, s in per_line.items() if s}
+
+
+def test_allocates_by_priority_then_ship_by(eng):
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item (id, sku, name, on_hand) VALUES (1, 'A', 'A', 10)"))
+        conn.execute(text("INSERT INTO customer (id, name, priority) VALUES (1, 'gold', 1), (2, 'bronze', 3)"))
+        conn.execute(text("""
+            INSERT INTO sales_order (id, customer_id, order_date, ship_by, status) VALUES
+                (1, 2, '2026-01-01', '2026-01-02', 'Open'),
+                (2, 1, '2026-01-01', '2026-01-09', 'Open'),
+                (3, 1, '2026-01-01', '2026-01-05', 'Open'),
+                (4, 1, '2026-01-01', '2026-01-01', 'Closed')
+        """))
+        conn.execute(text("""
+            INSERT INTO sales_order_line (id, so_id, item_id, qty, allocated_qty) VALUES
+                (1, 1, 1, 5, 0), (2, 2, 1, 6, 0), (3, 3, 1, 6, 0), (4, 4, 1, 6, 0)
+        """))
+
+    totals = allocation.allocate(eng, batch=2)
+    assert totals["allocated_qty"] == 10 and totals["items"] == [1]
+    with eng.connect() as conn:
+        got = dict(conn.execute(text("SELECT id, allocated_qty FROM sales_order_line")).all())
+        assert got == {1: 0, 2: 4, 3: 6, 4: 0}
+        assert conn.execute(text("SELECT allocated FROM item WHERE id = 1")).scalar_one() == 10
+        # reserved stock can't be taken by an OUT movement
+        assert conn.execute(allocation.TAKE_AVAILABLE, {"id": 1, "q": 1}).rowcount == 0
+    assert allocation.allocate(eng)["allocated_qty"] == 0
+
+
+def test_ship_order_moves_allocated_stock_out(eng):
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item (id, sku, name, on_hand) VALUES (1, 'A', 'A', 10)"))
+        conn.execute(text("INSERT INTO customer (id, name, priority) VALUES (1, 'A', 1)"))
+        conn.execute(text("INSERT INTO sales_order (id, customer_id, order_date, ship_by, status) VALUES (1, 1, '2026-01-01', '2026-01-02', 'Open')"))
+        conn.execute(text("INSERT INTO sales_order_line (id, so_id, item_id, qty, allocated_qty) VALUES (1, 1, 1, 6, 0), (2, 1, 1, 8, 0)"))
+    allocation.allocate(eng)
+
+    with eng.begin() as conn:
+        r = allocation.ship_order(conn, 1)
+    assert r == {"so_id": 1, "status": "Open", "lines": 2, "shipped_qty": 10, "items": [1]}
+    with eng.begin() as conn:
+        assert conn.execute(text("SELECT on_hand, allocated FROM item")).one() == (0, 0)
+        assert conn.execute(text("SELECT id, allocated_qty, shipped_qty FROM sales_order_line ORDER BY id")).all() == [(1, 0, 6), (2, 0, 4)]
+        conn.execute(text("UPDATE item SET on_hand = 9"))
+
+    # the shipped part isn't allocated again; the rest of line 2 is, and shipping it closes the order
+    assert allocation.allocate(eng)["allocated_qty"] == 4
+    with eng.begin() as conn:
+        assert allocation.ship_order(conn, 1)["status"] == "Closed"
+    with eng.begin() as conn:
+        assert allocation.ship_order(conn, 2) is None
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT on_hand, allocated FROM item")).one() == (5, 0)
+        assert conn.execute(text("SELECT SUM(qty) FROM item_movement WHERE move_type = 'OUT'")).scalar_one() == 14
+        _check_invariants(conn)
+
+
+def test_concurrent_allocators_and_outs_never_oversell(eng):
+    rng = random.Random(13)
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item (id, sku, name, on_hand) VALUES (:id, :id, :id, 50)"),
+                     [{"id": i} for i in ITEMS])
+        _orders(conn, rng, 400)
+
+    errors = []
+
+    def allocator():
+        try:
+            for _ in range(5):
+                allocation.allocate(eng, batch=97)
+        except Exception as e:  # surfaced below
+            errors.append(e)
+
+    def shipper(seed):
+        r = random.Random(seed)
+        try:
+            for _ in range(60):
+                with eng.begin() as conn:
+                    item = r.choice(ITEMS)
+                    if r.random() < 0.4:
+                        conn.execute(text("UPDATE item SET on_hand = on_hand + :q WHERE id = :id"), {"id": item, "q": r.randint(1, 30)})
+                    else:
+                        conn.execute(allocation.TAKE_AVAILABLE, {"id": item, "q": r.randint(1, 15)})
+        except Exception as e:
+            errors.append(e)
+
+    def order_shipper(seed):
+        r = random.Random(seed)
+        try:
+            for _ in range(40):
+                with eng.begin() as conn:
+                    allocation.ship_order(conn, r.randint(1, 400))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=allocator) for _ in range(4)]
+    threads += [threading.Thread(target=shipper, args=(s,)) for s in range(4)]
+    threads += [threading.Thread(target=order_shipper, args=(s,)) for s in range(10, 12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors, errors
+    with eng.connect() as conn:
+        _check_invariants(conn)
+        assert conn.execute(text("SELECT SUM(allocated) FROM item")).scalar_one() > 0
+
+
+def test_out_movement_beyond_available_is_rejected(client):
+    item = client.get("/items").json()[0]["id"]
+    assert client.post(f"/items/{item}/movements", json={"move_type": "IN", "qty": 3}).status_code == 200
+    r = client.post(f"/items/{item}/movements", json={"move_type": "OUT", "qty": 10_000})
+    assert r.status_code == 409
+
+    r = client.post("/movements:batch", json=[
+        {"item_id": item, "move_type": "OUT", "qty": 10_000},
+        {"item_id": item, "move_type": "IN", "qty": 1},
+    ]).json()
+    assert r["accepted"] == 0
+    assert r["results"][0]["error"] == "insufficient available stock"
+    assert client.post("/sales-orders/allocate").status_code == 200
+
+
+def test_ship_endpoint_frees_reserved_stock(client):
+    from app.db import engine
+
+    item = client.get("/items").json()[0]["id"]
+    client.post(f"/items/{item}/movements", json={"move_type": "IN", "qty": 5})
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO customer (name, priority) VALUES ('ship test', 1)"))
+        cust = conn.execute(text("SELECT MAX(id) FROM customer")).scalar_one()
+        conn.execute(text("""
+            INSERT INTO sales_order (customer_id, order_date, ship_by, status)
+            VALUES (:c, '2000-01-01', '2000-01-01', 'Open')
+        """), {"c": cust})
+        so = conn.execute(text("SELECT MAX(id) FROM sales_order")).scalar_one()
+        conn.execute(text("INSERT INTO sales_order_line (so_id, item_id, qty, allocated_qty) VALUES (:so, :i, 2, 0)"),
+                     {"so": so, "i": item})
+    client.post("/sales-orders/allocate")
+    before = {i["id"]: i for i in client.get("/items", params={"fields": "id,on_hand,allocated"}).json()}[item]
+
+    r = client.post(f"/sales-orders/{so}/ship")
+    assert r.status_code == 200 and r.json()["shipped_qty"] == 2 and r.json()["status"] == "Closed"
+    after = {i["id"]: i for i in client.get("/items", params={"fields": "id,on_hand,allocated"}).json()}[item]
+    assert (after["on_hand"], after["allocated"]) == (before["on_hand"] - 2, before["allocated"] - 2)
+    assert client.post("/sales-orders/999999/ship").status_code == 404
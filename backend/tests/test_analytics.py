@@ -0,0 +1,70 @@
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app import analytics
+from tests.test_snapshots import DAY0, _insert, eng  # noqa: F401 (eng is a fixture)
+
+
+def _expected(rows, grain, start, end, item_ids=(1, 2)):
+    out = defaultdict(lambda: [0, 0, 0, 0])
+    col = {"IN": 0, "OUT": 1, "ADJUST": 2}
+    first, last = analytics.bucket_of(start, grain), analytics.bucket_of(end, grain)
+    for r in rows:
+        bucket = analytics.bucket_of(date.fromisoformat(r["ts"][:10]), grain)
+        if r["id"] in item_ids and first <= bucket <= last:
+            acc = out[(r["id"], bucket.isoformat())]
+            acc[col[r["t"]]] += r["q"]
+            acc[3] += 1
+    return {k: v for k, v in sorted(out.items())}
+
+
+def test_summary_matches_raw_rows_for_every_grain(eng):
+    rng = random.Random(8)
+    rows = _insert(eng, rng, 500, range(0, 120))
+    analytics.rollup(eng, chunk=123)
+    rows += _insert(eng, rng, 40, range(0, 130))  # tail, incl. backdated days
+
+    start, end = DAY0 + timedelta(days=9), DAY0 + timedelta(days=100)
+    with eng.connect() as conn:
+        for grain in analytics.GRAINS:
+            for item_ids in (None, [2]):
+                got = analytics.movement_summary(conn, grain, start, end, item_ids)
+                assert {(r["item_id"], r["bucket"]): [r["qty_in"], r["qty_out"], r["qty_adjust"], r["moves"]]
+                        for r in got} == _expected(rows, grain, start, end, item_ids or (1, 2)), (grain, item_ids)
+
+
+def test_late_commits_behind_the_checkpoint_are_counted_then_folded(eng):
+    rows = _insert(eng, random.Random(9), 300, range(0, 60))
+    with eng.begin() as conn:    # take some ids out, as if still in flight at rollup time
+        late = conn.execute(text("SELECT * FROM item_movement WHERE id % 7 = 3 AND id < 290")).mappings().all()
+        conn.execute(text("DELETE FROM item_movement WHERE id % 7 = 3 AND id < 290"))
+    assert analytics.rollup(eng)["movements"] == 300 - len(late)
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item_movement (id, item_id, ts, move_type, qty, note) "
+                          "VALUES (:id, :item_id, :ts, :move_type, :qty, :note)"), [dict(r) for r in late])
+
+    start, end = DAY0, DAY0 + timedelta(days=59)
+    for step in ("tail", "folded"):
+        with eng.connect() as conn:
+            got = analytics.movement_summary(conn, "week", start, end)
+        assert {(r["item_id"], r["bucket"]): [r["qty_in"], r["qty_out"], r["qty_adjust"], r["moves"]]
+                for r in got} == _expected(rows, "week", start, end), step
+        if step == "tail":
+            assert analytics.rollup(eng)["movements"] == len(late)
+
+
+def test_summary_endpoint(client):
+    client.post("/items/3/movements", json={"move_type": "IN", "qty": 4})
+    client.post("/items/3/movements", json={"move_type": "ADJUST", "qty": 1})
+    today = client.get("/items/3/balance").json()["at"]
+
+    r = client.get("/movements/summary", params={"start": today, "grain": "month", "item_id": [3]})
+    assert r.status_code == 200
+    body = r.json()
+    assert body["start"] == today[:8] + "01"
+    (row,) = body["rows"]
+    assert row["item_id"] == 3 and row["qty_in"] >= 4 and row["qty_adjust"] >= 1
+    assert client.get("/movements/summary", params={"start": today, "grain": "year"}).status_code == 422
@@ -0,0 +1,43 @@
+from datetime import date
+
+from sqlalchemy import text
+
+from app.datagen import Scale, generate
+
+SMALL = Scale(items=200, suppliers=5, customers=20, sales_orders=100, purchase_orders=30, days=20, events=300)
+
+
+def _generate(make_engine, seed):
+    eng = make_engine()
+    with eng.begin() as conn:
+        counts = generate(conn, SMALL, seed=seed, end=date(2026, 3, 31))
+    return eng, counts
+
+
+def _dump(eng):
+    with eng.connect() as conn:
+        return {t: conn.execute(text(f"SELECT * FROM {t} ORDER BY id")).all()
+                for t in ("item", "item_movement", "sales_order_line", "purchase_order", "event_log")}
+
+
+def test_same_seed_same_rows(make_engine):
+    a, counts = _generate(make_engine, 1)
+    b, _ = _generate(make_engine, 1)
+    c, _ = _generate(make_engine, 2)
+    assert _dump(a) == _dump(b) != _dump(c)
+    with a.connect() as conn:
+        for table, n in counts.items():
+            assert conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar_one() == n, table
+
+
+def test_on_hand_matches_movements_and_never_went_negative(make_engine):
+    eng, _ = _generate(make_engine, 3)
+    with eng.connect() as conn:
+        balances = {}
+        for item_id, move_type, qty in conn.execute(text("SELECT item_id, move_type, qty FROM item_movement ORDER BY ts, id")):
+            balances[item_id] = balances.get(item_id, 0) + {"IN": qty, "OUT": -qty}.get(move_type, 0)
+            assert balances[item_id] >= 0
+        on_hand = dict(conn.execute(text("SELECT id, on_hand FROM item")).all())
+        assert {i: balances.get(i, 0) for i in on_hand} == on_hand
+        lo, hi = conn.execute(text("SELECT MIN(ts), MAX(ts) FROM item_movement")).one()
+        assert lo >= "2026-03-12" and hi < "2026-04-01"
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import threading
+
+from app.event_writer import emitter
+from app.events import EventBus
+from app.routers import agents
+
+
+class _FakeRequest:
+    """Enough of starlette's Request for events_stream: headers and a disconnect after N polls."""
+
+    def __init__(self, polls: int, headers=None):
+        self.headers = headers or {}
+        self._polls = polls
+
+    async def is_disconnected(self) -> bool:
+        self._polls -= 1
+        return self._polls < 0
+
+
+def _frames(chunks):
+    return [json.loads(c.split("data: ", 1)[1]) for c in chunks if c.startswith("id: ")]
+
+
+def test_bus_delivers_across_threads():
+    async def go():
+        bus = EventBus()
+        sub = bus.subscribe()
+        threading.Thread(target=bus.publish, args=({"id": 1},)).start()
+        return await asyncio.wait_for(sub.queue.get(), timeout=2)
+
+    assert asyncio.run(go()) == {"id": 1}
+
+
+def test_bus_flags_overflow():
+    async def go():
+        bus = EventBus(queue_size=1)
+        sub = bus.subscribe()
+        bus.publish({"id": 1}, {"id": 2})
+        await asyncio.sleep(0)
+        return sub.overflowed
+
+    assert asyncio.run(go()) is True
+
+
+def test_stream_resumes_from_last_id_then_pushes(client, monkeypatch):
+    client.post("/items/1/movements", json={"move_type": "IN", "qty": 1})
+    emitter.flush()
+    last = client.get("/events").json()[0]["id"]
+    client.post("/items/2/movements", json={"move_type": "IN", "qty": 2})
+    emitter.flush()
+    monkeypatch.setattr(agents, "STREAM_KEEPALIVE_S", 0.05)
+
+    async def go():
+        resp = await agents.events_stream(_FakeRequest(polls=3, headers={"last-event-id": str(last)}), None)
+        chunks = []
+        async for chunk in resp.body_iterator:
+            chunks.append(chunk)
+            if len(chunks) == 1:
+                # pushed after the backlog was sent
+                agents.event_bus.publish({"id": 10**9, "actor": "test", "event_type": "PUSH"})
+        return chunks
+
+    events = _frames(asyncio.run(go()))
+    assert events[0]["event_type"] == "MOVEMENT"
+    assert events[0]["id"] > last
+    assert events[-1]["event_type"] == "PUSH"
+    assert agents.event_bus.subscribers == 0
@@ -0,0 +1,66 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import text
+
+from app.event_writer import EventEmitter, EventQueueFull
+
+
+def _rows(eng):
+    with eng.connect() as conn:
+        return conn.execute(text("SELECT id, ts, actor, event_type, payload_json FROM event_log ORDER BY id")).all()
+
+
+def test_group_commit_keeps_order_and_drains_on_close(eng):
+    em = EventEmitter(bind=eng, batch_size=100, flush_ms=50)
+    for i in range(1000):
+        em.emit("test", "E", {"i": i})
+    assert em.flush(timeout=10)
+    rows = _rows(eng)
+    assert [int(r.payload_json.split(":")[1].rstrip("}")) for r in rows] == list(range(1000))
+    assert all(r.ts for r in rows)
+    assert 10 <= em.stats()["batches"] < 1000
+
+    em.emit("test", "LAST", {})
+    em.close()
+    assert _rows(eng)[-1].event_type == "LAST" and em.stats()["queued"] == 0
+
+
+class _BlockingBind:
+    """Delegates to a real engine once `release` is set, so the flusher can be held mid-batch."""
+
+    def __init__(self, eng):
+        self.eng = eng
+        self.release = threading.Event()
+
+    @contextmanager
+    def begin(self):
+        self.release.wait(10)
+        with self.eng.begin() as conn:
+            yield conn
+
+
+def test_full_queue_pushes_back(eng):
+    bind = _BlockingBind(eng)
+    em = EventEmitter(bind=bind, queue_size=2, batch_size=1, flush_ms=0)
+    em.emit("test", "E", {"i": 0})          # taken by the flusher, which then blocks
+    deadline = time.monotonic() + 5
+    while em.stats()["queued"]:
+        assert time.monotonic() < deadline, "flusher never took the first event"
+        time.sleep(0.001)
+    em.emit("test", "E", {"i": 1})
+    em.emit("test", "E", {"i": 2})
+    with pytest.raises(EventQueueFull):
+        em.emit("test", "E", {"i": 3}, timeout=0.05)
+    bind.release.set()
+    assert em.flush(timeout=10)
+    assert len(_rows(eng)) == 3 and em.stats()["emitted"] == 3
+    em.close()
+
+
+def test_write_through_mode(eng):
+    em = EventEmitter(bind=eng, write_behind=False)
+    em.emit("test", "E", {"x": 1})
+    assert [(r.actor, r.payload_json) for r in _rows(eng)] == [("test", '{"x":1}')]
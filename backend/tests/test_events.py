@@ -0,0 +1,31 @@
+from app.event_writer import emitter
+
+
+def test_events_keyset_pagination_and_filters(client):
+    for q in range(5):
+        client.post("/items/1/movements", json={"move_type": "IN", "qty": q + 1})
+    client.post("/sim/tick")
+    emitter.flush()
+
+    r = client.get("/events", params={"actor": "items", "event_type": "MOVEMENT", "limit": 2})
+    assert r.status_code == 200
+    first = r.json()
+    assert len(first) == 2
+    assert first[0]["id"] > first[1]["id"]
+    assert all(e["actor"] == "items" for e in first)
+    before = int(r.headers["x-next-before-id"])
+    assert before == first[1]["id"]
+
+    second = client.get("/events", params={"actor": "items", "before_id": before, "limit": 2}).json()
+    assert all(e["id"] < before for e in second)
+
+    newer = client.get("/events", params={"after_id": second[-1]["id"], "limit": 3}).json()
+    assert [e["id"] for e in newer] == sorted(e["id"] for e in newer)
+    assert newer[0]["id"] > second[-1]["id"]
+
+    assert all(e["actor"] == "sim" for e in client.get("/events", params={"actor": "sim"}).json())
+
+
+def test_events_time_range(client):
+    assert client.get("/events", params={"since": "2999-01-01T00:00:00Z"}).json() == []
+    assert client.get("/events", params={"until": "2999-01-01T00:00:00"}).json()
@@ -0,0 +1,41 @@
+import asyncio
+import csv
+import io
+import json
+
+from app.streaming import keyset_pages
+
+
+def test_movement_export_ndjson_and_csv(client):
+    client.post("/movements:batch", json=[{"item_id": 3, "move_type": "IN", "qty": q} for q in range(1, 6)])
+
+    r = client.get("/items/3/movements/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["qty"] for row in rows][-5:] == [1, 2, 3, 4, 5]
+    assert all(row["item_id"] == 3 for row in rows)
+
+    r = client.get("/items/3/movements/export", params={"format": "csv", "after_id": rows[-3]["id"]})
+    assert r.status_code == 200
+    parsed = list(csv.DictReader(io.StringIO(r.text)))
+    assert [int(p["qty"]) for p in parsed] == [4, 5]
+
+
+def test_keyset_pages_walks_every_row(client):
+    client.post("/movements:batch", json=[{"item_id": 2, "move_type": "IN", "qty": 1}] * 7)
+
+    async def collect():
+        return [page async for page in keyset_pages(
+            "SELECT id FROM item_movement WHERE id > :after ORDER BY id LIMIT :limit", {}, page_size=3
+        )]
+
+    pages = asyncio.run(collect())
+    ids = [r["id"] for page in pages for r in page]
+    assert len(ids) >= 7
+    assert ids == sorted(set(ids))
+    assert all(len(page) <= 3 for page in pages)
+
+
+def test_events_export_rejects_unknown_format(client):
+    assert client.get("/events/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,161 @@
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from app import analytics, forecast, simulation
+from app.forecast import ForecastState, fold, recommend, refresh
+from app.planning import load_item_arrays, plan, to_proposals
+
+MONDAY = date(2026, 3, 2)
+
+
+def _reference(series, alpha):
+    """One item at a time, as the textbook writes it: what fold() must agree with."""
+    s = dict(buckets=0, nonzero=0, level=0.0, level_mad=0.0, size=0.0, interval=0.0, since=0, croston_mad=0.0)
+    for y in series:
+        if s["buckets"] == 0 and y == 0:
+            continue    # history starts at the first demand
+        if s["buckets"]:
+            e, ec = abs(y - s["level"]), abs(y - (1 - alpha / 2) * s["size"] / s["interval"])
+            first = s["buckets"] == 1
+            s["level_mad"] = e if first else s["level_mad"] + alpha * (e - s["level_mad"])
+            s["croston_mad"] = ec if first else s["croston_mad"] + alpha * (ec - s["croston_mad"])
+            s["level"] += alpha * (y - s["level"])
+        else:
+            s["level"] = y
+        if y > 0:
+            if s["nonzero"]:
+                s["size"] += alpha * (y - s["size"])
+                s["interval"] += alpha * (s["since"] + 1 - s["interval"])
+            else:
+                s["size"], s["interval"] = y, 1.0
+            s["since"] = 0
+            s["nonzero"] += 1
+        else:
+            s["since"] += 1
+        s["buckets"] += 1
+    return s
+
+
+def test_vectorized_fold_matches_item_at_a_time_reference():
+    rng = random.Random(5)
+    series = [[rng.choice((0, 0, 0, 3, 8, 20)) if k % 4 else rng.randint(0, 30) for _ in range(40)] for k in range(60)]
+    state = ForecastState.empty(range(1, 61))
+    for t in range(40):
+        fold(state, np.array([row[t] for row in series], dtype=float), alpha=0.3)
+    for i, row in enumerate(series):
+        ref = _reference(row, 0.3)
+        for name, value in ref.items():
+            assert np.isclose(getattr(state, name)[i], value), (i, name)
+
+
+def test_steady_and_intermittent_demand():
+    state = ForecastState.empty([1, 2, 3])
+    for t in range(12):
+        fold(state, np.array([14.0, 21.0 if t % 3 == 0 else 0.0, 5.0 if t < 2 else 0.0]))
+    rec = recommend(state, np.array([7, 7, 7]), bucket_days=7)
+    assert rec.croston.tolist() == [False, True, True]
+    assert (rec.per_day[0], rec.safety_stock[0], rec.reorder_point[0]) == (2.0, 0, 14)
+    assert 0.5 < rec.per_day[1] < 1.5 and rec.safety_stock[1] > 0
+    assert rec.valid.tolist() == [True, True, True] and state.buckets.tolist() == [12, 12, 12]
+
+
+@pytest.fixture
+def eng(eng):
+    with eng.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO item (id, sku, name, on_hand, reorder_point, reorder_qty, safety_stock, lead_time_days)
+            VALUES (:id, :sku, :sku, 0, 50, 10, 5, 7)
+        """), [{"id": i, "sku": f"I{i}"} for i in (1, 2, 3)])
+    return eng
+
+
+def _sell(eng, start: date, days: int, per_item: dict):
+    """OUT movements at noon of each day: per_item maps item_id -> f(day index) -> qty."""
+    rows = []
+    for d in range(days):
+        ts = datetime.combine(start + timedelta(days=d), datetime.min.time()) + timedelta(hours=12)
+        rows += [{"i": i, "q": q, "ts": ts.strftime("%Y-%m-%d %H:%M:%S")}
+                 for i, f in per_item.items() if (q := f(d))]
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item_movement (item_id, ts, move_type, qty) VALUES (:i, :ts, 'OUT', :q)"), rows)
+    return rows
+
+
+def _rows(eng):
+    with eng.connect() as conn:
+        return conn.execute(text("SELECT * FROM demand_forecast ORDER BY item_id")).all()
+
+
+def test_refresh_is_incremental_and_feeds_the_planner(eng):
+    weekly = {1: lambda d: 2, 2: lambda d: 21 if d % 21 == 0 else 0, 3: lambda d: 5 if d >= 56 else 0}
+    _sell(eng, MONDAY - timedelta(weeks=10), 70, weekly)
+
+    first = refresh(eng, today=MONDAY)
+    assert (first["buckets"], first["items"], first["recommended"], first["croston"]) == (52, 3, 2, 1)
+    assert [(r.item_id, r.method, r.reorder_point, r.safety_stock) for r in _rows(eng)][0] == (1, "SES", 14, 0)
+    assert refresh(eng, today=MONDAY + timedelta(days=3))["buckets"] == 0
+
+    _sell(eng, MONDAY, 7, weekly)
+    again = refresh(eng, today=MONDAY + timedelta(weeks=1))
+    assert (again["buckets"], again["through"]) == (1, MONDAY.isoformat())
+    incremental = _rows(eng)
+    refresh(eng, full=True, today=MONDAY + timedelta(weeks=1))
+    assert _rows(eng) == incremental
+
+    with eng.connect() as conn:
+        items = load_item_arrays(conn, use_forecast=True)
+        static = load_item_arrays(conn)
+    assert items.forecast.tolist() == [True, True, False] and static.forecast is None
+    assert items.reorder_point[0] == 14 and items.reorder_point[2] == static.reorder_point[2] == 50
+    assert to_proposals(items, plan(items))[0]["reason"].endswith("(forecast)")
+
+    forecast.FORECAST_PLANNING = False
+    try:
+        with eng.connect() as conn:
+            assert load_item_arrays(conn, use_forecast=True).reorder_point.tolist() == [50, 50, 50]
+    finally:
+        forecast.FORECAST_PLANNING = True
+
+
+def test_refresh_moves_every_workers_proposal_cache(eng):
+    from app.proposal_cache import ProposalCache
+
+    workers = [ProposalCache(), ProposalCache()]
+    with eng.connect() as conn:
+        for cache in workers:
+            cache.get(conn)
+    _sell(eng, MONDAY - timedelta(weeks=10), 70, {1: lambda d: 2})
+    refresh(eng, today=MONDAY)     # handled by neither of them
+
+    with eng.connect() as conn:
+        version = workers[0].current_version(conn)
+        assert [cache.fresh_etag(version) for cache in workers] == [None, None]
+        reasons = {p["item_id"]: p["reason"] for p in workers[1].get(conn)[0]}
+    assert reasons[1].endswith("(forecast)")
+
+
+def test_simulated_sales_are_not_demand_history(eng):
+    today = date.today()
+    with eng.begin() as conn:
+        conn.execute(text("UPDATE item SET on_hand = 100000"))
+    with eng.begin() as conn:
+        simulation.fast_forward(conn, 90)      # 90 days of sales booked now, one movement per item
+    _sell(eng, today - timedelta(weeks=3), 14, {1: lambda d: 3})
+
+    result = refresh(eng, today=today + timedelta(weeks=1))
+    assert [r.item_id for r in _rows(eng)] == [1] and result["items"] == 1
+    with eng.connect() as conn:
+        week = analytics.movement_summary(conn, "week", today, today)
+        sim_out = conn.execute(text("SELECT SUM(qty) FROM item_movement WHERE note LIKE 'SIM%'")).scalar()
+        assert sum(r["qty_out"] for r in week) == sim_out > 0    # still there for the dashboards
+
+
+def test_item_forecast_api(client):
+    assert client.post("/agents/planner/forecast").json()["status"] == "ok"
+    body = client.get("/items/1/forecast").json()
+    assert body["sku"] == "FG-BOLT" and body["planner_uses"] in ("item", "forecast")
+    assert client.get("/items/999999/forecast").status_code == 404
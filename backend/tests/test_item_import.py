@@ -0,0 +1,72 @@
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import text
+
+from app.item_import import ImportFormatError, import_items
+
+
+@pytest.fixture
+def eng(eng):
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item (sku, name, uom, reorder_point, on_hand) VALUES ('A', 'old', 'box', 5, 7)"))
+    return eng
+
+
+def _items(eng):
+    with eng.connect() as conn:
+        return {r.sku: r for r in conn.execute(text("SELECT sku, name, uom, reorder_point, on_hand FROM item"))}
+
+
+def test_csv_upsert_rejects_and_chunks(eng):
+    body = "\n".join([
+        "sku,name,reorder_point",
+        "A,renamed,10",
+        "B,new item,3",
+        "C,,1",            # line 4: no name
+        "D,negative,-2",   # line 5
+        "E,not a number,x",
+        *(f"N-{i},bulk {i},0" for i in range(20)),
+        "B,new item v2,4",  # later row for the same sku wins
+    ]) + "\n"
+    result = import_items(io.BytesIO(body.encode()), "csv", chunk=10, bind=eng)
+
+    assert result["rows"] == 26 and result["rejected"] == 3 and result["chunks"] == 3
+    assert [(e["line"], e["sku"]) for e in result["errors"]] == [(4, "C"), (5, "D"), (6, "E")]
+    items = _items(eng)
+    assert len(items) == 22
+    # only the file's columns are updated: uom and on_hand are untouched
+    assert tuple(items["A"][1:]) == ("renamed", "box", 10, 7)
+    assert items["B"].name == "new item v2" and items["B"].reorder_point == 4
+    assert result["event"]["event_type"] == "ITEMS_IMPORTED"
+
+
+def test_bad_header_is_rejected(eng):
+    with pytest.raises(ImportFormatError, match="unknown: on_hand"):
+        import_items(io.BytesIO(b"sku,name,on_hand\nX,x,1\n"), "csv", bind=eng)
+    with pytest.raises(ImportFormatError, match="missing: name"):
+        import_items(io.BytesIO(b"sku\nX\n"), "csv", bind=eng)
+
+
+def test_parquet_import(eng):
+    buf = io.BytesIO()
+    pq.write_table(pa.table({"sku": ["A", "P-1"], "name": ["from parquet", "p"], "lead_time_days": [3, -1]}), buf)
+    buf.seek(0)
+    result = import_items(buf, "parquet", bind=eng)
+    assert (result["upserted"], result["rejected"]) == (1, 1)
+    assert result["errors"][0] == {"line": 2, "sku": "P-1", "error": "lead_time_days must be >= 0"}
+    assert _items(eng)["A"].name == "from parquet"
+
+
+def test_import_endpoint(client):
+    r = client.post("/items:import", content=b"sku,name,uom\nIMP-1,Imported,ea\nIMP-2,,ea\n",
+                    headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200
+    assert (r.json()["upserted"], r.json()["rejected"]) == (1, 1)
+    listed = client.get("/items", params={"sku_prefix": "IMP-", "fields": "sku,name,uom"}).json()
+    assert [(i["sku"], i["name"], i["uom"]) for i in listed] == [("IMP-1", "Imported", "ea")]
+
+    assert client.post("/items:import", content=b"nope\n1\n").status_code == 400
+    assert client.post("/items:import?format=parquet", content=b"not parquet").status_code == 400
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+
+from app.item_master import ItemMasterCache, bump_version
+
+
+@pytest.fixture
+def eng(eng):
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item (id, sku, name, reorder_point) VALUES (:id, :sku, :sku, :id)"),
+                     [{"id": i, "sku": f"S-{i}"} for i in range(1, 6)])
+    return eng
+
+
+def test_read_through_lru_and_ttl(eng):
+    cache = ItemMasterCache(max_items=3)
+    with eng.connect() as conn:
+        got = cache.get_many(conn, [1, 2, 99])
+        assert sorted(got) == [1, 2] and got[2]["sku"] == "S-2" and got[2]["reorder_point"] == 2
+        cache.get_many(conn, [1, 2])
+        assert (cache.hits, cache.misses) == (2, 3)
+
+        cache.get_many(conn, [3, 4])          # 1 is least recently used after 2 was read
+        assert cache.stats()["entries"] == 3 and cache.evictions == 1
+        misses = cache.misses
+        cache.get_many(conn, [2, 3, 4])
+        assert cache.misses == misses
+
+    stale = ItemMasterCache(ttl_s=0)
+    with eng.connect() as conn:
+        stale.get_many(conn, [1])
+        stale.get_many(conn, [1])
+    assert stale.hits == 0 and stale.misses == 2
+
+
+def test_version_bump_from_another_worker_invalidates(eng):
+    cache = ItemMasterCache()
+    with eng.connect() as conn:
+        assert cache.get_many(conn, [1])[1]["name"] == "S-1"
+    with eng.begin() as conn:
+        # another process renames the item without touching our cache object
+        conn.execute(text("UPDATE item SET name = 'renamed' WHERE id = 1"))
+    with eng.connect() as conn:
+        assert cache.get_many(conn, [1])[1]["name"] == "S-1"    # still cached
+    with eng.begin() as conn:
+        bump_version(conn)
+    with eng.connect() as conn:
+        assert cache.get_many(conn, [1])[1]["name"] == "renamed"
+
+
+def test_patch_item_is_visible_in_listing(client):
+    before = {i["id"]: i for i in client.get("/items").json()}
+    r = client.patch("/items/1", json={"name": "Hex Bolt M8", "reorder_point": before[1]["reorder_point"] + 1})
+    assert r.status_code == 200
+    after = {i["id"]: i for i in client.get("/items").json()}
+    assert after[1]["name"] == "Hex Bolt M8" and after[1]["reorder_point"] == before[1]["reorder_point"] + 1
+    assert after[1]["on_hand"] == before[1]["on_hand"]
+
+    assert client.patch("/items/1", json={"on_hand": 5}).status_code == 400
+    assert client.patch("/items/2", json={"sku": after[1]["sku"]}).status_code == 409
+    assert client.patch("/items/999999", json={"name": "x"}).status_code == 404
+    assert client.get("/items/cache").json()["entries"] >= 3
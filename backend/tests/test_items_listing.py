@@ -0,0 +1,64 @@
+from sqlalchemy import text
+
+from app.db import engine
+from app.item_master import bump_version
+from app.routers.items import _sku_range_clause
+
+
+def _add_items():
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT COUNT(*) FROM item WHERE sku LIKE 'PG-%'")).scalar_one():
+            return
+        conn.execute(text("""
+            INSERT INTO item (id, sku, name, uom, on_hand, reorder_point)
+            VALUES (:id, :sku, :sku, :uom, :oh, 0)
+        """), [{"id": 1000 + i, "sku": f"PG-{i:03d}", "uom": "kg" if i % 2 else "pcs", "oh": i} for i in range(250)])
+        bump_version(conn)
+
+
+def test_keyset_pages_cover_everything_once(client):
+    _add_items()
+    seen, after, pages = [], 0, 0
+    while True:
+        r = client.get("/items", params={"after_id": after, "limit": 40, "sku_prefix": "PG-"})
+        assert r.status_code == 200
+        seen += [row["id"] for row in r.json()]
+        pages += 1
+        if "x-next-after-id" not in r.headers:
+            break
+        after = int(r.headers["x-next-after-id"])
+    assert seen == list(range(1000, 1250)) and pages == 7
+
+
+def test_filters_and_sparse_fields(client):
+    _add_items()
+    rows = client.get("/items", params={"fields": "sku,on_hand", "sku_prefix": "PG-1", "uom": "kg", "limit": 1000}).json()
+    assert rows[0] == {"id": 1101, "sku": "PG-101", "on_hand": 101}
+    assert len(rows) == 50 and all(r["sku"].startswith("PG-1") and r["on_hand"] % 2 for r in rows)
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE item SET reorder_point = 5 WHERE id IN (1000, 1010)"))
+        bump_version(conn)
+    below = client.get("/items", params={"below_reorder_point": True, "sku_prefix": "PG-",
+                                         "fields": "id,reorder_point"}).json()
+    assert below == [{"id": 1000, "reorder_point": 5}]
+
+    default = client.get("/items", params={"limit": 1}).json()[0]
+    assert set(default) == {"id", "sku", "name", "on_hand", "reorder_point"}
+    assert client.get("/items", params={"fields": "id,price"}).status_code == 400
+
+
+def test_sku_prefix_is_a_code_point_prefix(client):
+    _add_items()
+    with engine.begin() as conn:
+        # a linguistic collation would sort these between 'PG-' and 'PG.'
+        conn.execute(text("INSERT INTO item (id, sku, name) VALUES (1300, 'PG1-X', 'x'), (1301, 'pg-x', 'x')"))
+        bump_version(conn)
+    try:
+        rows = client.get("/items", params={"sku_prefix": "PG-", "fields": "sku", "limit": 1000}).json()
+        assert len(rows) == 250 and all(r["sku"].startswith("PG-") for r in rows)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM item WHERE id IN (1300, 1301)"))
+            bump_version(conn)
+    assert 'COLLATE "C"' in _sku_range_clause("postgresql") and "COLLATE" not in _sku_range_clause("sqlite")
@@ -0,0 +1,59 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app import metrics
+
+
+def _app(registry, eng):
+    app = FastAPI()
+
+    @app.get("/things/{thing_id}")
+    def thing(thing_id: int):
+        with eng.connect() as conn:
+            conn.execute(text("SELECT :a"), {"a": thing_id}).scalar_one()
+            conn.execute(text("SELECT 1 WHERE 1 IN (:a, :b, :c)"), {"a": 1, "b": 2, "c": 3}).all()
+        return {"id": thing_id}
+
+    app.add_middleware(metrics.MetricsMiddleware, registry=registry)
+    metrics.instrument_engine(eng, registry)
+    return app
+
+
+def test_routes_and_statements_are_recorded(caplog):
+    registry = metrics.Registry(slow_query_ms=0)
+    eng = create_engine("sqlite://")
+    client = TestClient(_app(registry, eng))
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        for i in range(3):
+            assert client.get(f"/things/{i}").status_code == 200
+    client.get("/nowhere")
+
+    body = registry.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/things/{thing_id}",status="2xx"} 3' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="unmatched",status="4xx",le="+Inf"} 1' in body
+    assert 'db_statement_calls_total{statement="SELECT ?"} 3' in body
+    assert 'db_statement_calls_total{statement="SELECT 1 WHERE 1 IN (?)"} 3' in body
+    assert "db_query_duration_seconds_count 6" in body
+    assert "db_slow_queries_total 6" in body
+    assert any("slow query" in r.message and "params=" in r.message for r in caplog.records)
+
+
+def test_statement_shapes_fold_lists_and_cap_cardinality():
+    assert metrics.statement_shape("INSERT INTO t (a, b)\n VALUES (?, ?), (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?)"
+    assert metrics.statement_shape("SELECT * FROM t WHERE id IN ($1, $2)") == "SELECT * FROM t WHERE id IN (?)"
+    registry = metrics.Registry(max_statements=2, slow_query_ms=10_000)
+    for sql in ("SELECT 1", "SELECT 2", "SELECT 3", "SELECT 4"):
+        registry.observe_query(sql, 0.001, ())
+    assert set(registry.statements) == {"SELECT 1", "SELECT 2", "other"}
+    assert registry.statements["other"][0] == 2
+
+
+def test_disabled_installs_nothing():
+    app = FastAPI()
+    eng = create_engine("sqlite://")
+    assert metrics.install(app, [eng], enabled=False) is False
+    assert not app.user_middleware
+    assert "/metrics" not in {r.path for r in app.routes}
@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _on_hand(client, item_id):
+    return next(i["on_hand"] for i in client.get("/items").json() if i["id"] == item_id)
+
+
+def test_batch_movements_json(client):
+    before = _on_hand(client, 1)
+    rows = [
+        {"item_id": 1, "move_type": "IN", "qty": 10},
+        {"item_id": 1, "move_type": "OUT", "qty": 3, "note": "pick"},
+        {"item_id": 1, "move_type": "ADJUST", "qty": 5},
+        {"item_id": 1, "move_type": "BOGUS", "qty": 1},
+        {"item_id": 999999, "move_type": "IN", "qty": 1},
+    ]
+    r = client.post("/movements:batch", json=rows)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["accepted"] == 3
+    assert body["rejected"] == 2
+    assert [x["ok"] for x in body["results"]] == [True, True, True, False, False]
+    assert body["results"][4]["error"] == "unknown item_id"
+    assert _on_hand(client, 1) == before + 7
+
+
+def test_batch_movements_ndjson(client):
+    before = _on_hand(client, 2)
+    body = "\n".join([
+        '{"item_id": 2, "move_type": "IN", "qty": 4}',
+        '{"item_id": 2, "move_type": "IN", "qty": 6}',
+        "",
+    ])
+    r = client.post("/movements:batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert r.status_code == 200
+    assert r.json()["accepted"] == 2
+    assert _on_hand(client, 2) == before + 10
+
+
+def test_batch_movements_rejects_non_array(client):
+    r = client.post("/movements:batch", json={"item_id": 1})
+    assert r.status_code == 400
+
+
+def test_single_movement_rejects_bad_input(client):
+    for body, error in [({"move_type": "IN", "qty": "abc"}, "item_id and qty must be integers"),
+                        ({"move_type": "IN", "qty": None}, "item_id and qty must be integers"),
+                        ({"move_type": "IN", "qty": 0}, "invalid qty"),
+                        ({"move_type": "MOVE", "qty": 1}, "invalid move_type"),
+                        ({"qty": 1}, "invalid move_type")]:
+        r = client.post("/items/1/movements", json=body)
+        assert (r.status_code, r.json()["detail"]) == (400, error), body
+    assert client.post("/items/0/movements", json={"move_type": "IN", "qty": 1}).status_code == 400
+
+
+def test_single_movements_concurrently_and_rejected_out(client):
+    before = _on_hand(client, 3)
+    with ThreadPoolExecutor(8) as pool:
+        codes = list(pool.map(lambda _: client.post("/items/3/movements", json={"move_type": "IN", "qty": 1}).status_code,
+                              range(40)))
+    assert codes == [200] * 40 and _on_hand(client, 3) == before + 40
+
+    moves = len(client.get("/items/3/movements", params={"days": 1}).json())
+    r = client.post("/items/3/movements", json={"move_type": "OUT", "qty": 10**9})
+    assert r.status_code == 409
+    assert _on_hand(client, 3) == before + 40 and len(client.get("/items/3/movements", params={"days": 1}).json()) == moves
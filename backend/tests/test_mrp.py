@@ -0,0 +1,149 @@
+import math
+import random
+import threading
+
+import numpy as np
+import pytest
+from sqlalchemy import text
+
+from app.mrp import BomCycleError, compile_bom, explode, planned_orders, replace_components
+from app.planning import ItemArrays
+
+
+def _items(on_hand, lead, reorder_qty=None, safety=None) -> ItemArrays:
+    n = len(on_hand)
+    col = lambda v: np.asarray(v if v is not None else [0] * n, dtype=np.int64)  # noqa: E731
+    return ItemArrays(ids=np.arange(1, n + 1), sku=[f"I{i}" for i in range(1, n + 1)], name=[""] * n,
+                      on_hand=col(on_hand), reorder_point=col(None), reorder_qty=col(reorder_qty),
+                      safety_stock=col(safety), lead_time_days=col(lead), on_order=col(None))
+
+
+def test_three_level_explosion_by_hand():
+    # 1 = 2 x item 2 + 1 x item 3; item 2 = 0.5 x item 3
+    bom = compile_bom([1, 2, 1], [2, 3, 3], [2, 0.5, 1])
+    items = _items(on_hand=[0, 5, 10, 0], lead=[1, 2, 1, 0])
+    demand = np.zeros((4, 5))
+    demand[0, 3] = 10
+    receipts = np.zeros((4, 5))
+    result = explode(items, bom, demand, receipts)
+
+    assert result.llc.tolist() == [0, 1, 2, 0]
+    assert result.gross[2].tolist() == [7.5, 0, 10, 0, 0]   # from item 2's release at 0 and item 1's at 2
+    assert [(o["item_id"], o["qty"], o["release_in_days"], o["due_in_days"]) for o in planned_orders(items, result)] \
+        == [(2, 15, 0, 2), (3, 8, 1, 2), (1, 10, 2, 3)]
+
+
+def test_lots_receipts_and_late_releases():
+    bom = compile_bom([1], [2], [3])
+    items = _items(on_hand=[0, 0], lead=[0, 3], reorder_qty=[0, 25], safety=[0, 4])
+    demand = np.zeros((2, 4))
+    demand[0, 1] = 10
+    receipts = np.zeros((2, 4))
+    receipts[1, 1] = 20
+    orders = planned_orders(items, explode(items, bom, demand, receipts))
+    # component: 4 short of safety stock today, so a lot of 25 (released 3 days late);
+    # the 30 needed in bucket 1 come from the 21 left and the 20 received
+    assert [(o["item_id"], o["qty"], o["due_in_days"], o["late"]) for o in orders] \
+        == [(2, 25, 0, True), (1, 10, 1, False)]
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(BomCycleError) as e:
+        compile_bom([1, 2, 3, 3], [2, 3, 1, 4], [1, 1, 1, 1])
+    assert e.value.item_ids == [1, 2, 3, 4]
+
+
+def _reference_mrp(n, lines, on_hand, lead, lot, demand):
+    """Item at a time, parents before components: what explode() must agree with."""
+    parents = {i: [] for i in range(n)}
+    for p, c, q in lines:
+        parents[c].append((p, q))
+
+    depth = {}
+
+    def llc(i):
+        if i not in depth:
+            depth[i] = max((llc(p) + 1 for p, _ in parents[i]), default=0)
+        return depth[i]
+
+    buckets = len(demand[0])
+    gross = [list(map(float, row)) for row in demand]
+    releases = [[0.0] * buckets for _ in range(n)]
+    planned = [[0.0] * buckets for _ in range(n)]
+    for i in sorted(range(n), key=llc):
+        for p, q in parents[i]:
+            for t in range(buckets):
+                gross[i][t] += releases[p][t] * q
+        avail = float(on_hand[i])
+        for t in range(buckets):
+            avail -= gross[i][t]
+            if avail < 0:
+                need = -avail
+                qty = math.ceil(need / lot[i] - 1e-9) * lot[i] if lot[i] else math.ceil(need - 1e-9)
+                planned[i][t] = qty
+                avail += qty
+                releases[i][max(t - lead[i], 0)] += qty
+    return planned
+
+
+def test_concurrent_bom_writers_cannot_close_a_cycle_together(make_engine):
+    eng = make_engine()
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item (id, sku, name) VALUES (1, 'A', 'A'), (2, 'B', 'B')"))
+    outcome = []
+
+    def second_writer():
+        try:
+            with eng.begin() as conn:
+                replace_components(conn, 2, {1: 1.0})
+            outcome.append("written")
+        except BomCycleError:
+            outcome.append("cycle")
+
+    with eng.begin() as conn:
+        replace_components(conn, 1, {2: 1.0})
+        other = threading.Thread(target=second_writer)
+        other.start()
+        other.join(0.5)
+        assert other.is_alive()     # queued behind the open transaction, not reading its old BOM
+    other.join(10)
+    assert outcome == ["cycle"]
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT parent_id, component_id FROM bom_line")).all() == [(1, 2)]
+
+
+def test_matches_item_at_a_time_reference_on_a_random_dag():
+    rng = random.Random(3)
+    n, buckets = 80, 12
+    level = [min(k // 10, 6) for k in range(n)]
+    # one parent on the level above (so levels are exact), another anywhere above
+    lines = {(p, c): rng.choice((0.5, 1, 2, 3)) for c in range(10, n)
+             for p in (rng.randrange((level[c] - 1) * 10, level[c] * 10), rng.randrange(0, level[c] * 10))}
+    on_hand = [rng.randint(0, 30) for _ in range(n)]
+    lead = [rng.randint(0, 4) for _ in range(n)]
+    lot = [rng.choice((0, 0, 5, 12)) for _ in range(n)]
+    demand = [[rng.choice((0, 0, 0, 4, 9)) if level[i] == 0 else 0 for _ in range(buckets)] for i in range(n)]
+
+    bom = compile_bom([p + 1 for p, _ in lines], [c + 1 for _, c in lines], list(lines.values()))
+    result = explode(_items(on_hand, lead, lot), bom, np.array(demand, dtype=float), np.zeros((n, buckets)))
+    assert result.llc.tolist() == level
+    assert result.planned.tolist() == _reference_mrp(n, [(p, c, q) for (p, c), q in lines.items()],
+                                                     on_hand, lead, lot, demand)
+
+
+def test_bom_api_and_plan(client):
+    bom = client.get("/items/3/bom").json()
+    assert {p["sku"] for p in bom["used_in"]} == {"FG-BOLT", "FG-NUT"} and bom["components"] == []
+
+    assert client.put("/items/3/bom", json=[{"component_id": 1, "qty_per": 1}]).status_code == 409
+    assert client.put("/items/1/bom", json=[{"component_id": 1, "qty_per": 1}]).status_code == 400
+    assert client.put("/items/1/bom", json=[{"component_id": 999999, "qty_per": 1}]).status_code == 404
+    r = client.put("/items/1/bom", json=[{"component_id": 3, "qty_per": 0.06}])
+    assert r.status_code == 200 and r.json()["components"] == 1
+    assert client.get("/items/1/bom").json()["components"][0]["qty_per"] == 0.06
+
+    plan = client.get("/agents/mrp/plan", params={"horizon_days": 60, "bucket_days": 7}).json()
+    assert plan["levels"] == 2 and plan["bucket_days"] == 7
+    steel = [o for o in plan["planned_orders"] if o["sku"] == "RM-STEEL"]
+    assert steel and all(o["level"] == 1 and o["due_in_days"] % 7 == 0 for o in steel)
+    client.put("/items/1/bom", json=[{"component_id": 3, "qty_per": 0.05}])
@@ -0,0 +1,52 @@
+import numpy as np
+
+from app.planning import ItemArrays, plan
+
+
+def _items(**cols):
+    n = len(cols["on_hand"])
+    base = dict(
+        ids=np.arange(1, n + 1),
+        sku=[f"S{i}" for i in range(n)],
+        name=[f"N{i}" for i in range(n)],
+        reorder_point=np.zeros(n, dtype=np.int64),
+        reorder_qty=np.zeros(n, dtype=np.int64),
+        safety_stock=np.zeros(n, dtype=np.int64),
+        lead_time_days=np.full(n, 7),
+        on_order=np.zeros(n, dtype=np.int64),
+    )
+    base.update({k: np.asarray(v) for k, v in cols.items()})
+    return ItemArrays(**base)
+
+
+def test_plan_matches_reorder_point_rule():
+    items = _items(
+        on_hand=[30, 100, 0],
+        reorder_point=[60, 50, 200],
+        reorder_qty=[80, 80, 100],
+        safety_stock=[20, 10, 50],
+    )
+    result = plan(items)
+    assert result.idx.tolist() == [0, 2]
+    # item 0: max(80, 30 + 20); item 2: max(100, 200 + 50)
+    assert result.qty.tolist() == [80, 250]
+
+
+def test_plan_counts_open_purchase_orders():
+    items = _items(
+        on_hand=[30, 30],
+        reorder_point=[60, 60],
+        reorder_qty=[80, 80],
+        on_order=[80, 10],
+    )
+    result = plan(items)
+    assert result.idx.tolist() == [1]
+
+
+def test_planner_endpoint_shape(client):
+    r = client.get("/agents/planner/proposals")
+    assert r.status_code == 200
+    for p in r.json():
+        assert p["proposal_id"] is None or isinstance(p["proposal_id"], int)   # the persisted agent_proposal
+        assert p["suggested_qty"] > 0
+        assert "reorder_point" in p["reason"]
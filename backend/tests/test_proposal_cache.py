@@ -0,0 +1,76 @@
+from sqlalchemy import text
+
+from app.proposal_cache import proposal_cache
+
+
+def test_unchanged_poll_returns_304(client):
+    r = client.get("/agents/planner/proposals")
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+
+    r = client.get("/agents/planner/proposals", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+
+
+def test_movement_marks_only_that_item_dirty(client):
+    client.get("/agents/planner/proposals")
+    before = proposal_cache.stats()
+
+    client.post("/items/1/movements", json={"move_type": "IN", "qty": 1000})
+    assert proposal_cache.stats()["dirty_items"] == 1
+
+    r = client.get("/agents/planner/proposals")
+    after = proposal_cache.stats()
+    assert after["recomputed_items"] == before["recomputed_items"] + 1
+    assert after["full_rebuilds"] == before["full_rebuilds"]
+    assert all(p["item_id"] != 1 for p in r.json())
+
+    client.post("/items/1/movements", json={"move_type": "OUT", "qty": 1000})
+    assert any(p["item_id"] == 1 for p in client.get("/agents/planner/proposals").json())
+
+
+def test_listing_serves_persisted_ids_and_approve_invalidates_etag(client):
+    client.post("/items/3/movements", json={"move_type": "ADJUST", "qty": 1})   # new agent fingerprint
+    etag = client.get("/agents/planner/proposals").headers["etag"]
+    client.post("/agents/tick", params={"agent": "planner"})
+    r = client.get("/agents/planner/proposals", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag     # the new ids are served
+    listed = {p["item_id"]: p["proposal_id"] for p in r.json()}
+    open_ids = {p["item_id"]: p["id"] for p in client.get("/agents/proposals", params={"agent": "planner"}).json()}
+    assert 3 in listed and listed == open_ids
+
+    etag = r.headers["etag"]
+    act = client.post("/agents/proposals:act", json=[{"proposal_id": listed[3], "action": "APPROVE", "qty": 10_000}])
+    assert act.json()["applied"] == 1
+    r = client.get("/agents/planner/proposals", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert all(p["item_id"] != 3 for p in r.json())
+
+
+def test_writes_on_another_worker_invalidate(client):
+    from app.db import engine
+    from app.proposal_cache import ProposalCache
+
+    other = ProposalCache()  # a second uvicorn worker's copy
+    with engine.connect() as conn:
+        other.get(conn)
+    etag = client.get("/agents/planner/proposals").headers["etag"]
+
+    # this worker's write: the other one sees the version move and rebuilds
+    client.post("/items/2/movements", json={"move_type": "IN", "qty": 5})
+    with engine.connect() as conn:
+        assert other.fresh_etag(other.current_version(conn)) is None
+        listing, other_etag = other.get(conn)
+    r = client.get("/agents/planner/proposals", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] == other_etag and r.json() == listing
+
+    # a write this worker never heard about: the next conditional poll isn't a 304
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE item SET on_hand = on_hand + 100000 WHERE id = 3"))
+        proposal_cache.touch(conn)
+    before = proposal_cache.stats()["full_rebuilds"]
+    r = client.get("/agents/planner/proposals", headers={"If-None-Match": other_etag})
+    assert r.status_code == 200 and all(p["item_id"] != 3 for p in r.json())
+    assert proposal_cache.stats()["full_rebuilds"] == before + 1
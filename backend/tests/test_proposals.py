@@ -0,0 +1,69 @@
+from sqlalchemy import text
+
+from app.db import engine
+
+
+def _proposals(kinds):
+    """Insert one agent_run plus OPEN proposals of the given kinds for item 1; returns their ids."""
+    with engine.begin() as conn:
+        run_id = conn.execute(text("""
+            INSERT INTO agent_run (tick_id, agent, status) VALUES ('test', 'planner', 'ok') RETURNING id
+        """)).scalar_one()
+        return [conn.execute(text("""
+            INSERT INTO agent_proposal (run_id, agent, kind, item_id, qty, reason)
+            VALUES (:r, 'planner', :k, 1, 10, 'test') RETURNING id
+        """), {"r": run_id, "k": k}).scalar_one() for k in kinds]
+
+
+def _po_count():
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM purchase_order WHERE proposal_id IS NOT NULL")).scalar_one()
+
+
+def test_bulk_act_is_idempotent(client):
+    a, b, c, rfq, stale = _proposals(["REORDER", "REORDER", "REORDER", "RFQ", "REORDER"])
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE agent_proposal SET status = 'SUPERSEDED' WHERE id = :id"), {"id": stale})
+    before = _po_count()
+    body = [
+        {"proposal_id": a, "action": "APPROVE", "qty": 7},
+        {"proposal_id": b, "action": "APPROVE"},
+        {"proposal_id": c, "action": "REJECT"},
+        {"proposal_id": rfq, "action": "APPROVE"},
+        {"proposal_id": stale, "action": "APPROVE"},
+        {"proposal_id": 10_000_000, "action": "APPROVE"},
+        {"proposal_id": a, "action": "REJECT"},
+        {"proposal_id": b, "action": "ORDER"},
+    ]
+    r = client.post("/agents/proposals:act", json=body).json()
+    assert (r["applied"], r["replayed"], r["rejected"]) == (4, 0, 4)
+    res = r["results"]
+    assert res[0]["status"] == "APPROVED" and res[0]["po_id"] and not res[0]["replayed"]
+    assert res[2]["status"] == "REJECTED" and res[2]["po_id"] is None
+    assert res[3]["status"] == "APPROVED" and res[3]["po_id"] is None      # RFQs don't order
+    assert [x.get("error") for x in res[4:]] == [
+        "proposal is SUPERSEDED", "unknown proposal_id", "duplicate proposal_id", "invalid action"]
+    assert _po_count() == before + 2
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT qty FROM purchase_order WHERE id = :id"), {"id": res[0]["po_id"]}).scalar_one() == 7
+        events = conn.execute(text("SELECT event_type FROM event_log WHERE payload_json LIKE :p"),
+                              {"p": f'%"proposal_id":{a},%'}).scalars().all()
+    assert events == ["PO_CREATED"]
+
+    # a retry of the same request orders nothing new and reports the original POs
+    again = client.post("/agents/proposals:act", json=body[:4]).json()
+    assert (again["applied"], again["replayed"]) == (0, 4)
+    assert again["results"][0]["po_id"] == res[0]["po_id"]
+    assert _po_count() == before + 2
+
+    # a conflicting action on an acted proposal is an error, not a flip
+    flip = client.post("/agents/proposals:act", json=[{"proposal_id": c, "action": "APPROVE"}]).json()
+    assert flip["results"][0]["error"] == "proposal is REJECTED"
+
+
+def test_bulk_act_thousands_in_one_request(client):
+    ids = _proposals(["REORDER"] * 2500)
+    before = _po_count()
+    r = client.post("/agents/proposals:act", json=[{"proposal_id": i, "action": "APPROVE"} for i in ids]).json()
+    assert r["applied"] == 2500 and _po_count() == before + 2500
+    assert len({x["po_id"] for x in r["results"]}) == 2500
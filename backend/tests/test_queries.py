@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg, psycopg
+from sqlalchemy.dialects.sqlite import pysqlite
+
+from app import queries
+from app.events import write_events
+
+STATEMENTS = {
+    "RECEIVE": queries.RECEIVE,
+    "INSERT_MOVEMENT": queries.INSERT_MOVEMENT,
+    "MOVEMENTS_SINCE": queries.MOVEMENTS_SINCE,
+    "MOVEMENT_PAGE": queries.MOVEMENT_PAGE,
+    "INSERT_PO_DUE_AFTER_LEAD_TIME": queries.INSERT_PO_DUE_AFTER_LEAD_TIME,
+    "INSERT_EVENT": queries.INSERT_EVENT,
+    "EVENTS": select(*queries.EVENT_COLUMNS).where(*queries.event_filters("planner", "PO_CREATED", "2026-01-01", "2026-02-01")),
+}
+POSTGRES = [psycopg.dialect(), asyncpg.dialect()]
+
+
+@pytest.mark.parametrize("dialect", POSTGRES, ids=lambda d: d.driver)
+@pytest.mark.parametrize("name", STATEMENTS)
+def test_statements_compile_for_postgres(name, dialect):
+    # no server needed: compiling is where SQLite-only SQL would show up
+    sql = str(STATEMENTS[name].compile(dialect=dialect)).lower()
+    for sqlite_only in ("json(", "datetime(", "last_insert_rowid", "insert or ignore", "printf("):
+        assert sqlite_only not in sql, (name, sqlite_only)
+
+
+def test_insert_event_casts_payload_and_returns_row_on_postgres():
+    sql = str(queries.INSERT_EVENT.compile(dialect=psycopg.dialect()))
+    assert "AS JSON)" in sql and "RETURNING event_log.id" in sql
+
+
+@pytest.mark.parametrize("dialect", [pysqlite.dialect(), *POSTGRES], ids=lambda d: d.name + "+" + d.driver)
+def test_timestamp_binds_utc_and_reads_back_as_text(dialect):
+    ts = queries.Timestamp()
+    bind = ts.process_bind_param(datetime(2026, 3, 1, 14, 30, tzinfo=timezone(timedelta(hours=2))), dialect)
+    if dialect.name == "sqlite":
+        assert bind == "2026-03-01 12:30:00"
+    else:
+        assert bind == datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    assert ts.process_bind_param("2026-03-01 12:30:00", dialect) == ts.process_bind_param(datetime(2026, 3, 1, 12, 30), dialect)
+    assert ts.process_result_value(datetime(2026, 3, 1, 13, 30, tzinfo=timezone(timedelta(hours=1))), dialect) \
+        == "2026-03-01 12:30:00"
+    assert ts.process_result_value("2026-03-01 12:30:00", dialect) == "2026-03-01 12:30:00"
+
+
+def test_write_events_returns_inserted_rows(make_engine):
+    eng = make_engine()
+    with eng.begin() as conn:
+        rows = write_events(conn, [
+            {"ts": datetime(2026, 3, 1, 12, 30), "actor": "a", "event_type": "E", "payload_json": '{"n":1}'},
+            {"actor": "b", "event_type": "F", "payload_json": "{}"},
+        ])
+        listed = conn.execute(select(*queries.EVENT_COLUMNS).where(*queries.event_filters(actor="a"))).all()
+    assert [r["id"] for r in rows] == [1, 2]
+    assert rows[0]["ts"] == "2026-03-01 12:30:00" and len(rows[1]["ts"]) == 19
+    assert [tuple(r) for r in listed] == [(1, "2026-03-01 12:30:00", "a", "E", '{"n":1}')]
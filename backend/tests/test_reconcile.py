@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import text
+
+from app.reconcile import partitions, reconcile
+
+
+@pytest.fixture
+def eng(eng):
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item (id, sku, name, on_hand) VALUES (:id, :sku, :sku, 0)"),
+                     [{"id": i, "sku": f"I{i}"} for i in range(1, 21)])
+    return eng
+
+
+def _move(eng, rows, drift=0):
+    """Insert (item_id, move_type, qty) movements, keeping on_hand in step (plus `drift` on each moved item)."""
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item_movement (item_id, move_type, qty) VALUES (:i, :t, :q)"),
+                     [{"i": i, "t": t, "q": q} for i, t, q in rows])
+        conn.execute(text("UPDATE item SET on_hand = on_hand + :d WHERE id = :i"),
+                     [{"i": i, "d": {"IN": q, "OUT": -q}.get(t, 0) + drift} for i, t, q in rows])
+
+
+def _on_hand(eng):
+    with eng.connect() as conn:
+        return dict(conn.execute(text("SELECT id, on_hand FROM item")).all())
+
+
+def test_reports_and_repairs_drift_then_replays_only_new_movements(eng):
+    _move(eng, [(i, "IN", 10 * i) for i in range(1, 21)] + [(i, "OUT", i) for i in range(1, 21)])
+    _move(eng, [(3, "ADJUST", 5), (7, "IN", 4)], drift=2)
+
+    first = reconcile(eng, chunk=7)
+    assert first["replayed"] == 42 and first["last_id"] == 42
+    assert [(m["item_id"], m["diff"]) for m in first["first_mismatches"]] == [(3, -2), (7, -2)]
+
+    fixed = reconcile(eng, repair=True)
+    assert fixed["replayed"] == 0 and fixed["repaired"] == 2
+    assert _on_hand(eng) == {i: 9 * i + (4 if i == 7 else 0) for i in range(1, 21)}
+
+    _move(eng, [(5, "OUT", 3)])
+    again = reconcile(eng)
+    assert (again["after"], again["replayed"], again["mismatches"]) == (42, 1, 0)
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT balance, moves FROM ledger_balance WHERE item_id = 5")).one() == (42, 3)
+        assert conn.execute(text("SELECT COUNT(*) FROM event_log WHERE actor = 'reconcile'")).scalar_one() == 2
+
+
+def test_partitioned_process_pool_matches_in_process_replay(eng):
+    _move(eng, [(1 + k % 20, ("IN", "IN", "OUT", "ADJUST")[k % 4], 1 + k % 9) for k in range(500)])
+    with eng.begin() as conn:
+        conn.execute(text("UPDATE item SET on_hand = on_hand + 1 WHERE id IN (4, 17)"))
+
+    pooled = reconcile(eng, full=True, workers=2, chunk=64, parallel_min=0)
+    with eng.connect() as conn:
+        balances = conn.execute(text("SELECT * FROM ledger_balance ORDER BY item_id")).all()
+    single = reconcile(eng, full=True, workers=1)
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT * FROM ledger_balance ORDER BY item_id")).all() == balances
+    assert pooled["partitions"] == 8 and single["partitions"] == 1
+    assert pooled["replayed"] == single["replayed"] == 500
+    assert [m["item_id"] for m in pooled["first_mismatches"]] == [4, 17] == [m["item_id"] for m in single["first_mismatches"]]
+
+
+def test_ids_committed_behind_the_checkpoint_are_replayed_late(eng):
+    _move(eng, [(1 + k % 20, ("IN", "OUT")[k % 2], 1 + k % 5) for k in range(100)])
+    with eng.begin() as conn:    # take out movements and their on_hand update, as if still in flight
+        late = conn.execute(text("SELECT * FROM item_movement WHERE id IN (10, 11, 57)")).mappings().all()
+        conn.execute(text("DELETE FROM item_movement WHERE id IN (10, 11, 57)"))
+        conn.execute(text("UPDATE item SET on_hand = on_hand - :d WHERE id = :i"),
+                     [{"i": r["item_id"], "d": r["qty"] if r["move_type"] == "IN" else -r["qty"]} for r in late])
+
+    first = reconcile(eng, chunk=16)
+    assert (first["replayed"], first["last_id"], first["mismatches"]) == (97, 100, 0)
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT lo, hi FROM rollup_gap ORDER BY lo")).all() == [(10, 11), (57, 57)]
+
+    with eng.begin() as conn:    # two of them commit, 11 was rolled back
+        conn.execute(text("INSERT INTO item_movement (id, item_id, ts, move_type, qty, note) "
+                          "VALUES (:id, :item_id, :ts, :move_type, :qty, :note)"), [dict(r) for r in late if r["id"] != 11])
+        conn.execute(text("UPDATE item SET on_hand = on_hand + :d WHERE id = :i"),
+                     [{"i": r["item_id"], "d": r["qty"] if r["move_type"] == "IN" else -r["qty"]}
+                      for r in late if r["id"] != 11])
+    again = reconcile(eng)
+    assert (again["replayed"], again["late"], again["mismatches"]) == (2, 2, 0)
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT lo, hi FROM rollup_gap")).all() == [(11, 11)]
+        incremental = conn.execute(text("SELECT * FROM ledger_balance ORDER BY item_id")).all()
+    reconcile(eng, full=True, workers=2, chunk=8, parallel_min=0)
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT * FROM ledger_balance ORDER BY item_id")).all() == incremental
+        assert conn.execute(text("SELECT lo, hi FROM rollup_gap")).all() == [(11, 11)]
+
+
+def test_partitions_cover_the_id_range():
+    assert partitions(0, 10, 4) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    assert partitions(5, 6, 8) == [(5, 6)]
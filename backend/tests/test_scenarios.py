@@ -0,0 +1,64 @@
+import os
+import time
+
+import numpy as np
+
+from app.planning import ItemArrays
+from app.scenarios import ScenarioParams, Snapshot, run_scenarios
+
+
+def _snapshot(n=20):
+    items = ItemArrays(
+        ids=np.arange(1, n + 1),
+        sku=[f"S{i}" for i in range(n)],
+        name=[f"N{i}" for i in range(n)],
+        on_hand=np.full(n, 100),
+        reorder_point=np.full(n, 60),
+        reorder_qty=np.full(n, 80),
+        safety_stock=np.full(n, 20),
+        lead_time_days=np.full(n, 5),
+        on_order=np.zeros(n, dtype=np.int64),
+    )
+    return Snapshot(items=items, reliability=np.full(n, 0.8))
+
+
+def test_more_safety_stock_improves_fill_rate():
+    base = run_scenarios(_snapshot(), ScenarioParams(seeds=8, days=120, workers=1))
+    generous = run_scenarios(_snapshot(), ScenarioParams(seeds=8, days=120, workers=1, rp_scale=2.0, ss_scale=2.0))
+    assert base["runs"] == 8
+    assert len(base["items"]) == 20
+    assert generous["fill_rate"] > base["fill_rate"]
+    assert generous["avg_units_held_per_day"] > base["avg_units_held_per_day"]
+
+
+def test_process_pool_matches_serial():
+    serial = run_scenarios(_snapshot(), ScenarioParams(seeds=6, days=60, workers=1))
+    pooled = run_scenarios(_snapshot(), ScenarioParams(seeds=6, days=60, workers=2))
+    assert serial["fill_rate"] == pooled["fill_rate"]
+    assert serial["items"] == pooled["items"]
+
+
+def test_scenario_job_api(client):
+    r = client.post("/sim/scenarios", json={"seeds": 4, "days": 30, "workers": 1})
+    assert r.status_code == 200
+    job_id = r.json()["job_id"]
+    for _ in range(100):
+        job = client.get(f"/sim/scenarios/{job_id}").json()
+        if job["status"] in ("DONE", "FAILED"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "DONE", job
+    assert "items" not in job["result"]
+    assert client.get(f"/sim/scenarios/{job_id}", params={"items": True}).json()["result"]["items"]
+
+    assert client.post("/sim/scenarios", json={"bogus": 1}).status_code == 400
+    for bad in ({"seeds": "4"}, {"days": 1.5}, {"rp_scale": "x"}, {"ss_scale": -1}, {"workers": True}, {"seeds": None}):
+        assert client.post("/sim/scenarios", json=bad).status_code == 400, bad
+    clamped = client.post("/sim/scenarios", json={"seeds": 1, "days": 5, "workers": 10_000}).json()["job_id"]
+    for _ in range(200):
+        job = client.get(f"/sim/scenarios/{clamped}").json()
+        if job["status"] in ("DONE", "FAILED"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "DONE" and job["result"]["workers"] <= (os.cpu_count() or 1)
+    assert client.get("/sim/scenarios/nope").status_code == 404
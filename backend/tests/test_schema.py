@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.schema import SCHEMA_HEAD, SchemaOutOfDate, current_revisions, ensure_schema, head_revisions
+
+
+def _engine():
+    path = os.path.join(tempfile.mkdtemp(prefix="erp-schema-"), "s.db")
+    return create_engine(f"sqlite:///{path}", future=True)
+
+
+def test_pinned_head_matches_migrations():
+    assert head_revisions() == {SCHEMA_HEAD}
+
+
+def test_fresh_database_migrates_once_then_is_current():
+    eng = _engine()
+    assert ensure_schema(eng, auto_migrate=True) == "upgraded"
+    assert ensure_schema(eng, auto_migrate=False) == "current"
+    with eng.connect() as conn:
+        assert current_revisions(conn) == head_revisions()
+    cols = {c["name"] for c in inspect(eng).get_columns("purchase_order")}
+    assert {"item_id", "qty", "due_day"} <= cols and "supplier_id" not in cols
+
+
+def test_behind_without_auto_migrate_refuses_to_start():
+    with pytest.raises(SchemaOutOfDate):
+        ensure_schema(_engine(), auto_migrate=False)
+
+
+def test_legacy_bootstrap_database_is_adopted():
+    eng = _engine()
+    with eng.begin() as conn:
+        # what the old import-time bootstrap in app/main.py created
+        conn.execute(text("CREATE TABLE sim_state (id INTEGER PRIMARY KEY, current_day INTEGER DEFAULT 1)"))
+        conn.execute(text("""
+            CREATE TABLE item (id INTEGER PRIMARY KEY, sku TEXT UNIQUE, name TEXT, uom TEXT DEFAULT 'pcs',
+                reorder_point INTEGER DEFAULT 0, reorder_qty INTEGER DEFAULT 0, safety_stock INTEGER DEFAULT 0,
+                lead_time_days INTEGER DEFAULT 7, on_hand INTEGER DEFAULT 0)
+        """))
+        conn.execute(text("""
+            CREATE TABLE item_movement (id INTEGER PRIMARY KEY, item_id INTEGER NOT NULL,
+                ts DATETIME DEFAULT (CURRENT_TIMESTAMP), move_type TEXT NOT NULL, qty INTEGER NOT NULL, note TEXT)
+        """))
+        conn.execute(text("""
+            CREATE TABLE purchase_order (id INTEGER PRIMARY KEY, item_id INTEGER NOT NULL, qty INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'OPEN', created_at DATETIME DEFAULT (CURRENT_TIMESTAMP), note TEXT)
+        """))
+        conn.execute(text("""
+            CREATE TABLE event_log (id INTEGER PRIMARY KEY, ts DATETIME DEFAULT (CURRENT_TIMESTAMP),
+                actor TEXT, event_type TEXT, payload_json TEXT)
+        """))
+        conn.execute(text("CREATE INDEX ix_event_log_ts ON event_log (ts)"))
+        conn.execute(text("INSERT INTO item (id, sku, name, on_hand) VALUES (1, 'OLD-1', 'Old item', 42)"))
+        conn.execute(text("INSERT INTO purchase_order (item_id, qty) VALUES (1, 5)"))
+
+    assert ensure_schema(eng, auto_migrate=True) == "upgraded"
+    with eng.connect() as conn:
+        assert current_revisions(conn) == head_revisions()
+        assert conn.execute(text("SELECT on_hand FROM item WHERE id = 1")).scalar_one() == 42
+        assert conn.execute(text("SELECT qty, due_day FROM purchase_order")).one() == (5, None)
+    assert inspect(eng).has_table("supplier")
@@ -0,0 +1,101 @@
+import numpy as np
+from sqlalchemy import text
+
+from app import allocation, simulation
+from app.planning import ItemArrays
+from app.simulation import SimModel
+
+
+def _items(n=3, on_hand=100):
+    return ItemArrays(
+        ids=np.arange(1, n + 1),
+        sku=[f"S{i}" for i in range(n)],
+        name=[f"N{i}" for i in range(n)],
+        on_hand=np.full(n, on_hand),
+        reorder_point=np.full(n, 60),
+        reorder_qty=np.full(n, 80),
+        safety_stock=np.full(n, 20),
+        lead_time_days=np.full(n, 4),
+        on_order=np.zeros(n, dtype=np.int64),
+    )
+
+
+def test_step_receives_due_pos_and_ships_demand():
+    model = SimModel(_items(), po_id=[11], po_item_idx=[0], po_qty=[50], po_due=[1], reliability=1.0)
+    r = model.step(1)
+    assert r.received == 1
+    assert r.late == 0
+    assert (r.shipped <= r.demand).all()
+    assert model.on_hand[0] == 150 - r.shipped[0]
+    assert model.closed.po_id.tolist() == [11]
+
+
+def test_allocated_stock_is_not_shipped():
+    items = _items(on_hand=30)
+    items.allocated = np.array([30, 25, 0])
+    model = SimModel(items, seed=1)
+    model.run(1, 20)
+    assert model.shipped_total[0] == 0
+    assert model.shipped_total[1] <= 5
+    assert (model.on_hand >= items.allocated).all()
+
+
+def test_unreliable_supplier_leaves_po_late():
+    model = SimModel(_items(), po_id=[11], po_item_idx=[0], po_qty=[50], po_due=[1], reliability=0.0)
+    model.step(1)
+    assert model.step(2).late == 1
+
+
+def test_same_seed_same_day_is_deterministic():
+    a = SimModel(_items(), seed=3).step(5)
+    b = SimModel(_items(), seed=3).step(5)
+    assert a.demand.tolist() == b.demand.tolist()
+
+
+def test_auto_reorder_keeps_stock_flowing():
+    model = SimModel(_items(n=50, on_hand=0), auto_reorder=True, reliability=1.0)
+    totals = model.run(1, 120)
+    assert totals["pos_ordered"] > 0
+    assert totals["pos_received"] > 0
+    assert model.shipped_total.sum() > 0
+    assert (model.on_hand >= 0).all()
+
+
+def test_tick_and_run_endpoints(client):
+    day = client.get("/sim/day").json()["day"]
+    client.post("/movements:batch", json=[{"item_id": i, "move_type": "IN", "qty": 500} for i in (1, 2, 3)])
+
+    r = client.post("/sim/tick")
+    assert r.status_code == 200
+    body = r.json()
+    assert body["day"] == day + 1
+    assert {"new_sos", "pos_received", "pos_late", "units_shipped"} <= body.keys()
+
+    r = client.post("/sim/run", params={"days": 30, "auto_reorder": True})
+    assert r.status_code == 200
+    assert r.json()["day"] == day + 31
+    assert all(i["on_hand"] >= 0 for i in client.get("/items").json())
+
+
+def test_tick_and_run_leave_allocated_stock(eng):
+    with eng.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO item (id, sku, name, on_hand, reorder_point, reorder_qty, safety_stock, lead_time_days)
+            VALUES (1, 'A', 'A', 20, 200, 50, 0, 2)
+        """))
+        conn.execute(text("INSERT INTO customer (id, name, priority) VALUES (1, 'A', 1)"))
+        conn.execute(text("""
+            INSERT INTO sales_order (id, customer_id, order_date, ship_by, status)
+            VALUES (1, 1, '2026-01-01', '2026-01-02', 'Open')
+        """))
+        conn.execute(text("INSERT INTO sales_order_line (so_id, item_id, qty, allocated_qty) VALUES (1, 1, 20, 0)"))
+    assert allocation.allocate(eng)["allocated_qty"] == 20
+
+    with eng.begin() as conn:
+        summary, touched = simulation.tick(conn)
+        assert summary["units_shipped"] == 0 and summary["stockouts"] == 1 and touched == []
+    with eng.begin() as conn:
+        summary, _ = simulation.fast_forward(conn, 10)
+        assert summary["units_shipped"] == 0
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT on_hand, allocated FROM item WHERE id = 1")).one() == (20, 20)
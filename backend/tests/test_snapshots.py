@@ -0,0 +1,117 @@
+import json
+import random
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import snapshots
+
+SIGN = {"IN": 1, "OUT": -1, "ADJUST": 0}
+DAY0 = date(2026, 1, 1)
+
+
+@pytest.fixture
+def eng(eng):
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item (id, sku, name) VALUES (1, 'A', 'A'), (2, 'B', 'B')"))
+    return eng
+
+
+def _insert(eng, rng, n, days):
+    rows = [
+        {"id": rng.choice((1, 2)), "t": rng.choice(("IN", "IN", "OUT", "ADJUST")), "q": rng.randint(1, 9),
+         "ts": f"{DAY0 + timedelta(days=rng.choice(days))} {rng.randint(0, 23):02d}:30:00"}
+        for _ in range(n)
+    ]
+    with eng.begin() as conn:
+        conn.execute(text("INSERT INTO item_movement (item_id, move_type, qty, ts) VALUES (:id, :t, :q, :ts)"), rows)
+    return rows
+
+
+def _replay(rows, item_id, day):
+    return sum(SIGN[r["t"]] * r["q"] for r in rows
+               if r["id"] == item_id and r["ts"][:10] <= day.isoformat())
+
+
+def test_balance_matches_full_replay_with_tail_and_backdated_rows(eng):
+    rng = random.Random(3)
+    rows = _insert(eng, rng, 400, range(0, 60, 3))       # sparse days
+    assert snapshots.rollup(eng, chunk=97)["movements"] == 400
+    rows += _insert(eng, rng, 50, range(0, 60))           # includes days before the latest snapshot
+    assert snapshots.rollup(eng)["movements"] == 50
+    rows += _insert(eng, rng, 30, range(40, 70))          # tail: not rolled up yet
+
+    with eng.connect() as conn:
+        for item_id in (1, 2):
+            for offset in (-1, 0, 5, 31, 59, 65, 80):
+                day = DAY0 + timedelta(days=offset)
+                got = snapshots.balance_at(conn, item_id, day)
+                assert got["on_hand"] == _replay(rows, item_id, day), (item_id, day)
+
+            history = snapshots.balance_range(conn, item_id, DAY0 + timedelta(days=10), DAY0 + timedelta(days=75))
+            assert [d["on_hand"] for d in history] == [
+                _replay(rows, item_id, date.fromisoformat(d["date"])) for d in history
+            ]
+            day = DAY0 + timedelta(days=45)
+            assert history[35]["qty_in"] == sum(r["q"] for r in rows if r["id"] == item_id and r["t"] == "IN"
+                                                and r["ts"][:10] == day.isoformat())
+
+
+def test_rollup_is_idempotent(eng):
+    rows = _insert(eng, random.Random(5), 100, range(10))
+    snapshots.rollup(eng)
+    assert snapshots.rollup(eng)["movements"] == 0
+    with eng.connect() as conn:
+        assert snapshots.balance_at(conn, 1, DAY0 + timedelta(days=9))["tail_movements"] == 0
+        assert snapshots.balance_at(conn, 1, DAY0 + timedelta(days=9))["on_hand"] == _replay(rows, 1, DAY0 + timedelta(days=9))
+
+
+def test_ids_committed_out_of_order_are_folded_late(eng):
+    ts = f"{DAY0} 12:00:00"
+
+    def insert(*ids):
+        with eng.begin() as conn:
+            conn.execute(text("INSERT INTO item_movement (id, item_id, move_type, qty, ts) VALUES (:i, 1, 'IN', :i, :ts)"),
+                         [{"i": i, "ts": ts} for i in ids])
+
+    def on_hand():
+        with eng.connect() as conn:
+            return snapshots.balance_at(conn, 1, DAY0)
+
+    insert(1, 2, 4)                  # 3 still in flight
+    assert snapshots.rollup(eng) == {"movements": 3, "last_id": 4}
+    insert(3)                        # commits behind the checkpoint
+    assert on_hand()["on_hand"] == 10 and on_hand()["tail_movements"] == 1
+    assert snapshots.rollup(eng)["movements"] == 1
+    assert on_hand() == {**on_hand(), "on_hand": 10, "tail_movements": 0}
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM rollup_gap")).scalar() == 0
+
+    insert(6)                        # 5 never commits
+    snapshots.rollup(eng)
+    grace, snapshots.ROLLUP_GAP_GRACE_S = snapshots.ROLLUP_GAP_GRACE_S, -1
+    try:
+        assert snapshots.rollup(eng)["movements"] == 0
+    finally:
+        snapshots.ROLLUP_GAP_GRACE_S = grace
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM rollup_gap")).scalar() == 0
+    assert on_hand()["on_hand"] == 16
+
+
+def test_balance_endpoints(client):
+    client.post("/items/2/movements", json={"move_type": "IN", "qty": 7})
+    client.post("/sim/tick")  # rolls up
+    client.post("/items/2/movements", json={"move_type": "OUT", "qty": 2})
+
+    ledger = client.get("/items/2/movements/export").text.splitlines()
+    expected = sum(SIGN[m["move_type"]] * m["qty"] for m in map(json.loads, ledger))
+    r = client.get("/items/2/balance")
+    assert r.status_code == 200 and r.json()["on_hand"] == expected
+    assert r.json()["snapshot_date"] is not None and r.json()["tail_movements"] >= 1
+
+    today = r.json()["at"]
+    r = client.get("/items/2/balance/history", params={"start": today, "end": today})
+    assert r.json()["days"][-1]["on_hand"] == expected
+    assert client.get("/items/2/balance/history", params={"start": "2026-02-01", "end": "2026-01-01"}).status_code == 400
@@ -1,16 +1,41 @@
-import { useQuery } from "@tanstack/react-query";
-import { apiGet } from "../lib/api";
+import { useQuery, useQueryClient } from "@tanstack/react-query";
+import { API_BASE, apiGetBE } from "../lib/api";
 import type { EventRow } from "../types";
 import { ChevronDown, ChevronUp } from "lucide-react";
-import { useState } from "react";
+import { useEffect, useState } from "react";
+
+const MAX_EVENTS = 100;
+
+// Backend event_log rows have no display text; derive one.
+function toEventRow(ev: any): EventRow {
+  return { id: ev.id, ts: ev.ts, text: ev.text ?? `${ev.actor}: ${ev.event_type}` };
+}
 
 export default function EventFeed() {
   const [isExpanded, setIsExpanded] = useState(false);
-  
+  const [streaming, setStreaming] = useState(false);
+  const qc = useQueryClient();
+
+  // Server push: new rows arrive over SSE; polling only runs while the stream is down.
+  // Both go to the backend (API_BASE), so streamed and polled rows share ids.
+  useEffect(() => {
+    if (typeof EventSource === "undefined") return;
+    const es = new EventSource(`${API_BASE}/events/stream`);
+    es.onopen = () => setStreaming(true);
+    es.onerror = () => setStreaming(false);
+    es.addEventListener("event_log", (msg) => {
+      const row = toEventRow(JSON.parse((msg as MessageEvent).data));
+      qc.setQueryData<EventRow[]>(["events"], (prev = []) =>
+        prev.some((e) => e.id === row.id) ? prev : [row, ...prev].slice(0, MAX_EVENTS)
+      );
+    });
+    return () => es.close();
+  }, [qc]);
+
   const { data } = useQuery<EventRow[]>({
     queryKey: ["events"],
-    queryFn: () => apiGet("/events"),
-    refetchInterval: 2000,
+    queryFn: () => apiGetBE<any[]>("/events").then((rows) => rows.map(toEventRow)),
+    refetchInterval: streaming ? false : 2000,
   });
 
   const eventCount = (data ?? []).length;
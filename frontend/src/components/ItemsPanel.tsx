@@ -14,7 +14,8 @@ type Item = {
 export default function ItemsPanel() {
   const { data = [], isLoading, isError, error } = useQuery<Item[]>({
     queryKey: ["items"],
-    queryFn: () => apiGetBE("/items"),
+    // only the columns this table renders; first page (by id) of the catalog
+    queryFn: () => apiGetBE("/items?fields=id,sku,name,on_hand,reorder_point&limit=500"),
     staleTime: 5_000, // feel snappy but not too chatty
   });
 
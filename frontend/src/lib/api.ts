@@ -15,7 +15,7 @@ export async function apiPost<T>(url: string, body?: any): Promise<T> {
 }
 
 // added these ↓↓↓
-const API_BASE = "http://localhost:8000";
+export const API_BASE = "http://localhost:8000";
 
 /** Absolute-URL helpers to hit the REAL backend (bypass MSW) */
 export async function apiGetBE<T>(path: string): Promise<T> {